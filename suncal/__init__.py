@@ -1 +1,19 @@
+import importlib
+from typing import TYPE_CHECKING
+from typing import Any
+
 __version__ = "0.1.0"
+
+if TYPE_CHECKING:
+    from suncal.batch import compute
+    from suncal.batch import location_of
+
+# the library entry points are imported on first use, so that 'import suncal' (every start of the command line tool
+# and of the worker) does not load the batch, pool and progress modules that it might not need
+_LAZY = {'compute': 'suncal.batch', 'location_of': 'suncal.batch'}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name]), name)
+    raise AttributeError(f"module 'suncal' has no attribute {name!r}")
@@ -0,0 +1,465 @@
+"""
+Accuracy regression harness: every alternative engine (batched, approximate, cached, ...) is compared with the
+reference, the per-day calculations of CALC with the full precision of skyfield, on a set of cases that cover polar,
+equatorial and date line locations, DST transitions and long ranges, optionally extended by random samples. The report
+contains the deltas of the event times and the events that are missing or extra per engine, and fails if they exceed
+the thresholds. New engines are added to ENGINES.
+"""
+
+import datetime as dt
+import math
+import os
+import random
+import tempfile
+import time
+from typing import Callable
+
+import numpy as np
+from pydantic import BaseModel  # pylint: disable=E0611
+
+from suncal.almanac import Almanac
+from suncal.almanac import build_almanac
+from suncal.batch import location_of
+from suncal.models.astro import CALC
+from suncal.models.astro import EVENT_KINDS
+from suncal.models.astro import PRECISIONS
+from suncal.models.astro import EventTable
+from suncal.models.astro import Location
+from suncal.models.astro import MagicHour
+from suncal.models.astro import calculate_events
+from suncal.utils import iter_date_range
+
+# start and end (UTC, naive) of the events per event kind and local date
+Results = dict[str, dict[dt.date, tuple[dt.datetime, dt.datetime]]]
+
+# max number of individual deviations that are listed per engine
+MAX_LISTED_DEVIATIONS = 10
+
+
+class Case(BaseModel):
+    """All events at [location] on every date from [from_date] to [to_date]."""
+
+    name: str
+    location: Location
+    from_date: dt.date
+    to_date: dt.date
+
+
+def case(
+    name: str,
+    latitude: float,
+    longitude: float,
+    timezone: str,
+    from_date: dt.date,
+    to_date: dt.date,
+) -> Case:
+    return Case(
+        name=name,
+        location=Location(
+            timezone=timezone, latitude=latitude, longitude=longitude
+        ),
+        from_date=from_date,
+        to_date=to_date,
+    )
+
+
+CASES = [
+    # DST transitions
+    case(
+        'berlin_dst_spring',
+        52.52,
+        13.41,
+        'Europe/Berlin',
+        dt.date(2025, 3, 27),
+        dt.date(2025, 4, 2),
+    ),
+    case(
+        'berlin_dst_autumn',
+        52.52,
+        13.41,
+        'Europe/Berlin',
+        dt.date(2025, 10, 23),
+        dt.date(2025, 10, 29),
+    ),
+    case(
+        'new_york_dst',
+        40.71,
+        -74.01,
+        'America/New_York',
+        dt.date(2025, 3, 6),
+        dt.date(2025, 3, 12),
+    ),
+    case(
+        'sydney_dst',
+        -33.87,
+        151.21,
+        'Australia/Sydney',
+        dt.date(2025, 4, 3),
+        dt.date(2025, 4, 9),
+    ),
+    # polar: the sun stops setting or rising
+    case(
+        'tromso_midnight_sun',
+        69.65,
+        18.96,
+        'Europe/Oslo',
+        dt.date(2025, 5, 15),
+        dt.date(2025, 5, 24),
+    ),
+    case(
+        'longyearbyen_polar_night',
+        78.22,
+        15.65,
+        'Arctic/Longyearbyen',
+        dt.date(2025, 2, 10),
+        dt.date(2025, 2, 19),
+    ),
+    case(
+        'mcmurdo_polar_night',
+        -77.85,
+        166.67,
+        'Antarctica/McMurdo',
+        dt.date(2025, 4, 20),
+        dt.date(2025, 4, 29),
+    ),
+    # equatorial
+    case(
+        'quito_equator',
+        -0.18,
+        -78.47,
+        'America/Guayaquil',
+        dt.date(2025, 6, 17),
+        dt.date(2025, 6, 23),
+    ),
+    case(
+        'singapore_equator',
+        1.35,
+        103.82,
+        'Asia/Singapore',
+        dt.date(2025, 9, 19),
+        dt.date(2025, 9, 25),
+    ),
+    # date line: Samoa skipped 2011-12-30 when it moved to the other side, Kiritimati is 14 hours ahead of UTC
+    case(
+        'apia_date_line',
+        -13.83,
+        -171.76,
+        'Pacific/Apia',
+        dt.date(2011, 12, 26),
+        dt.date(2012, 1, 3),
+    ),
+    case(
+        'kiritimati_date_line',
+        1.87,
+        -157.36,
+        'Pacific/Kiritimati',
+        dt.date(2025, 1, 1),
+        dt.date(2025, 1, 7),
+    ),
+    # long range
+    case(
+        'berlin_year',
+        52.52,
+        13.41,
+        'Europe/Berlin',
+        dt.date(2025, 1, 1),
+        dt.date(2025, 12, 31),
+    ),
+]
+
+
+def random_cases(n: int, seed: int = 0, days: int = 7) -> list[Case]:
+    """
+    [n] cases of [days] days each at random locations (uniformly distributed on the globe, without the polar caps
+    beyond 80°) and random dates from 1950 to 2049.
+    """
+    rng = random.Random(seed)
+    cases = []
+    for i in range(n):
+        latitude = math.degrees(math.asin(rng.uniform(-1, 1)))
+        latitude = max(-80.0, min(80.0, latitude))
+        longitude = rng.uniform(-180, 180)
+        try:
+            location = location_of(round(latitude, 4), round(longitude, 4))
+        except AssertionError:
+            # no timezone at sea: nautical timezone of the longitude (the sign of Etc/GMT is inverted)
+            offset = round(longitude / 15)
+            location = Location(
+                timezone=f'Etc/GMT{-offset:+}' if offset else 'Etc/GMT',
+                latitude=round(latitude, 4),
+                longitude=round(longitude, 4),
+            )
+        from_date = dt.date(1950, 1, 1) + dt.timedelta(
+            days=rng.randrange(100 * 365)
+        )
+        cases.append(
+            Case(
+                name=f'random_{i}',
+                location=location,
+                from_date=from_date,
+                to_date=from_date + dt.timedelta(days=days - 1),
+            )
+        )
+    return cases
+
+
+# engines --------------------------------------------------------------------------------------------------------------
+def to_utc(time: dt.datetime) -> dt.datetime:
+    return time.astimezone(dt.timezone.utc).replace(tzinfo=None)
+
+
+def per_day_engine(
+    precision: str | None,
+) -> Callable[[list[str], Case], Results]:
+    """Engine that calculates every date on its own with CALC and the given [precision]."""
+
+    def engine(events: list[str], case: Case) -> Results:
+        results: Results = {event: {} for event in events}
+        for event in events:
+            for date in iter_date_range(case.from_date, case.to_date):
+                c_event = CALC[event](date, case.location, precision)
+                if c_event is None:
+                    continue
+                if isinstance(c_event, MagicHour):
+                    times = to_utc(c_event.start), to_utc(c_event.end)
+                else:
+                    times = (to_utc(c_event.event_time),) * 2
+                results[event][date] = times
+        return results
+
+    return engine
+
+
+def table_results(events: list[str], table: EventTable) -> Results:
+    results: Results = {event: {} for event in events}
+    for kind, date, start, end in zip(
+        table.kind.tolist(),
+        table.date.astype(dt.date).tolist(),
+        table.start.astype(dt.datetime).tolist(),
+        table.end.astype(dt.datetime).tolist(),
+    ):
+        results[EVENT_KINDS[kind]][date] = (start, end)
+    return results
+
+
+def batch_engine(precision: str | None) -> Callable[[list[str], Case], Results]:
+    """Engine that calculates the whole range at once with calculate_events and the given [precision]."""
+
+    def engine(events: list[str], case: Case) -> Results:
+        table = calculate_events(
+            events,
+            case.from_date,
+            case.to_date,
+            case.location,
+            precision=precision,
+        )
+        return table_results(events, table)
+
+    return engine
+
+
+def almanac_engine(events: list[str], case: Case) -> Results:
+    """Engine that writes the case to an almanac file and reads the events back from it (the runtime includes both)."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'case.almanac')
+        build_almanac(
+            [case.location], case.from_date, case.to_date, filename, events
+        )
+        almanac = Almanac(filename)
+        table = EventTable.concatenate(
+            [
+                almanac.table(event, 0, case.from_date, case.to_date)
+                for event in events
+            ],
+            [case.location],
+        )
+        # release the memory map before the file is deleted
+        del almanac
+    return table_results(events, table)
+
+
+class Engine(BaseModel):
+    """Alternative engine [calculate] and the max delta of its event times from the reference in seconds."""
+
+    calculate: Callable[[list[str], Case], Results]
+    tolerance: float
+
+
+REFERENCE = per_day_engine(None)
+
+ENGINES = {
+    'batch': Engine(calculate=batch_engine(None), tolerance=1.0),
+    'batch_minute': Engine(calculate=batch_engine('minute'), tolerance=30.0),
+    # the almanac stores whole seconds
+    'almanac': Engine(calculate=almanac_engine, tolerance=1.0),
+    **{
+        precision: Engine(
+            calculate=per_day_engine(precision), tolerance=seconds / 2
+        )
+        for precision, seconds in PRECISIONS.items()
+        if seconds
+    },
+}
+
+
+# comparison -----------------------------------------------------------------------------------------------------------
+class Thresholds(BaseModel):
+    """
+    An engine fails if the max delta or the 99th percentile of the deltas of its event times exceed [max_delta] or
+    [max_p99] (seconds, default: the tolerance of the engine) or if more than [max_missing] events are missing or more
+    than [max_extra] events are extra.
+    """
+
+    max_delta: float | None = None
+    max_p99: float | None = None
+    max_missing: int = 0
+    max_extra: int = 0
+
+
+class EngineReport(BaseModel):
+    """
+    Result of one engine: number of [compared] events, statistics of the absolute deltas of their start and end times
+    in seconds, [missing] and [extra] events (some of them are listed in [deviations]) and the [runtime] in seconds.
+    """
+
+    engine: str
+    compared: int = 0
+    max_delta: float = 0.0
+    p50_delta: float = 0.0
+    p95_delta: float = 0.0
+    p99_delta: float = 0.0
+    missing: int = 0
+    extra: int = 0
+    deviations: list[str] = []
+    runtime: float = 0.0
+    passed: bool = True
+    failures: list[str] = []
+
+
+class AccuracyReport(BaseModel):
+    cases: list[str]
+    events: list[str]
+    reference_runtime: float
+    engines: list[EngineReport]
+    passed: bool
+
+
+def compare(
+    engine: str,
+    reference: dict[str, Results],
+    results: dict[str, Results],
+    runtime: float,
+    tolerance: float,
+    thresholds: Thresholds,
+) -> EngineReport:
+    """
+    Compare the [results] of [engine] with the [reference] results (both per case name) and check the [thresholds]
+    ([tolerance] is the default max delta).
+    """
+    report = EngineReport(engine=engine, runtime=round(runtime, 3))
+    deltas: list[float] = []
+    worst: list[tuple[float, str]] = []
+    for case_name, expected_events in reference.items():
+        for event, expected in expected_events.items():
+            calculated = results[case_name][event]
+            for date in sorted(expected.keys() - calculated.keys()):
+                report.missing += 1
+                worst.append((math.inf, f"{case_name} {event} {date}: missing"))
+            for date in sorted(calculated.keys() - expected.keys()):
+                report.extra += 1
+                worst.append((math.inf, f"{case_name} {event} {date}: extra"))
+            for date in sorted(expected.keys() & calculated.keys()):
+                delta = max(
+                    abs((c - e).total_seconds())
+                    for c, e in zip(calculated[date], expected[date])
+                )
+                deltas.append(delta)
+                worst.append(
+                    (delta, f"{case_name} {event} {date}: {delta:.6f} s")
+                )
+
+    report.compared = len(deltas)
+    if deltas:
+        report.max_delta = round(max(deltas), 6)
+        report.p50_delta, report.p95_delta, report.p99_delta = (
+            round(float(value), 6)
+            for value in np.percentile(deltas, [50, 95, 99])
+        )
+    report.deviations = [
+        description
+        for _, description in sorted(worst, key=lambda item: -item[0])[
+            :MAX_LISTED_DEVIATIONS
+        ]
+    ]
+
+    max_delta = (
+        tolerance if thresholds.max_delta is None else thresholds.max_delta
+    )
+    max_p99 = tolerance if thresholds.max_p99 is None else thresholds.max_p99
+    if report.max_delta > max_delta:
+        report.failures.append(
+            f"max delta {report.max_delta} s > {max_delta} s"
+        )
+    if report.p99_delta > max_p99:
+        report.failures.append(f"p99 delta {report.p99_delta} s > {max_p99} s")
+    if report.missing > thresholds.max_missing:
+        report.failures.append(
+            f"{report.missing} missing events > {thresholds.max_missing}"
+        )
+    if report.extra > thresholds.max_extra:
+        report.failures.append(
+            f"{report.extra} extra events > {thresholds.max_extra}"
+        )
+    report.passed = not report.failures
+    return report
+
+
+def run_accuracy(
+    engines: list[str] | None = None,
+    cases: list[Case] | None = None,
+    events: list[str] | None = None,
+    thresholds: Thresholds | None = None,
+) -> AccuracyReport:
+    """
+    Calculate [events] (default: all) for all [cases] (default: CASES) with the reference and each of the [engines]
+    (names of ENGINES, default: all) and compare the results.
+    """
+    engines = list(ENGINES) if engines is None else engines
+    cases = CASES if cases is None else cases
+    events = EVENT_KINDS if events is None else events
+    thresholds = thresholds or Thresholds()
+    for name in engines:
+        assert (
+            name in ENGINES
+        ), f"Unknown engine {name!r}, choose any of {list(ENGINES)}."
+    for event in events:
+        assert event in EVENT_KINDS, f"Unknown event {event!r}."
+
+    def run(
+        calculate: Callable[[list[str], Case], Results],
+    ) -> tuple[dict[str, Results], float]:
+        start = time.perf_counter()
+        results = {c.name: calculate(events, c) for c in cases}
+        return results, time.perf_counter() - start
+
+    reference, reference_runtime = run(REFERENCE)
+    reports = []
+    for name in engines:
+        results, runtime = run(ENGINES[name].calculate)
+        reports.append(
+            compare(
+                name,
+                reference,
+                results,
+                runtime,
+                ENGINES[name].tolerance,
+                thresholds,
+            )
+        )
+    return AccuracyReport(
+        cases=[c.name for c in cases],
+        events=events,
+        reference_runtime=round(reference_runtime, 3),
+        engines=reports,
+        passed=all(report.passed for report in reports),
+    )
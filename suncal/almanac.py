@@ -0,0 +1,281 @@
+"""
+Precomputed almanac files: the event times of a fixed set of locations and dates in a compact binary format that is
+memory-mapped and answers range queries by slicing, without parsing or calculating anything. suncal consults the
+almanac files (ALMANAC_FILE and the files in the environment variable SUNCAL_ALMANAC) before it calculates calendar
+events, so calendars of known places are created without any astronomy.
+
+Layout of an almanac file (all numbers little endian):
+
+    0   magic b'SUNCALAL'
+    8   format version (uint32), see ALMANAC_VERSION
+    12  length of the index in bytes (uint32)
+    16  index: json of AlmanacIndex (utf-8), padded with spaces to a multiple of 8 bytes
+    ... times: int64[locations][events][days][2], UTC seconds since 1970-01-01 of the start and end of the event on
+        every local date (start == end for all but Golden/Blue Hour), MISSING if the event does not exist on that date
+    ... phases: int8[locations][days], moon phase index (see MoonPhase), -1 on dates without a moon phase
+"""
+
+import datetime as dt
+import functools
+import os
+import struct
+from typing import Callable
+from typing import Iterable
+
+import numpy as np
+from pydantic import BaseModel  # pylint: disable=E0611
+
+from suncal.batch import compute
+from suncal.models.astro import EVENT_KINDS
+from suncal.models.astro import PRECISIONS
+from suncal.models.astro import Event
+from suncal.models.astro import EventTable
+from suncal.models.astro import Location
+from suncal.models.astro import MagicHour
+from suncal.models.astro import MoonPhase
+from suncal.models.astro import RiseSet
+from suncal.progress import ProgressCallback
+
+ALMANAC_FILE = 'suncal.almanac'  # written by 'suncal almanac build'
+# more almanac files, separated by os.pathsep
+ALMANAC_ENV_VAR = 'SUNCAL_ALMANAC'
+
+ALMANAC_MAGIC = b'SUNCALAL'
+ALMANAC_VERSION = 1
+HEADER = struct.Struct('<8sII')
+MISSING = np.iinfo(np.int64).min
+
+# the times are stored in whole seconds (rounded down), so almanacs only serve calculations with this precision or less
+ALMANAC_PRECISION = 'second'
+
+
+class AlmanacIndex(BaseModel):
+    """Index of an almanac file: all [events] at all [locations] on [days] local dates from [from_date]."""
+
+    events: list[str]
+    locations: list[Location]
+    from_date: dt.date
+    days: int
+    created: dt.datetime
+
+    @property
+    def to_date(self) -> dt.date:
+        return self.from_date + dt.timedelta(days=self.days - 1)
+
+
+def location_matches(a: Location, b: Location) -> bool:
+    """Same place and timezone (the local dates of the events depend on the timezone)."""
+    return (
+        a.timezone.lower() == b.timezone.lower()
+        and round(a.latitude, 6) == round(b.latitude, 6)
+        and round(a.longitude, 6) == round(b.longitude, 6)
+    )
+
+
+class Almanac:
+    """Memory-mapped almanac file [filename], see open_almanac."""
+
+    def __init__(self, filename: str):
+        with open(filename, 'rb') as f:
+            magic, version, index_length = HEADER.unpack(f.read(HEADER.size))
+            if magic != ALMANAC_MAGIC:
+                raise ValueError(f"{filename} is not an almanac file.")
+            if version != ALMANAC_VERSION:
+                raise ValueError(
+                    f"{filename} has version {version} of the almanac format, this version of suncal reads version "
+                    f"{ALMANAC_VERSION}. Rebuild it with 'suncal almanac build'."
+                )
+            self.index = AlmanacIndex.model_validate_json(f.read(index_length))
+        shape = (len(self.index.locations), len(self.index.events))
+        offset = HEADER.size + padded(index_length)
+        self.times = np.memmap(
+            filename,
+            dtype='<i8',
+            mode='r',
+            offset=offset,
+            shape=(*shape, self.index.days, 2),
+        )
+        self.phases = np.memmap(
+            filename,
+            dtype=np.int8,
+            mode='r',
+            offset=offset + self.times.nbytes,
+            shape=(shape[0], self.index.days),
+        )
+        self.filename = filename
+
+    def location_index(self, location: Location) -> int | None:
+        for i, known in enumerate(self.index.locations):
+            if location_matches(known, location):
+                return i
+        return None
+
+    def covers(self, event: str, from_date: dt.date, to_date: dt.date) -> bool:
+        return (
+            event in self.index.events
+            and self.index.from_date <= from_date
+            and to_date <= self.index.to_date
+        )
+
+    def table(
+        self,
+        event: str,
+        location_idx: int,
+        from_date: dt.date,
+        to_date: dt.date,
+    ) -> EventTable:
+        """Events of kind [event] at the location [location_idx] on the local dates from [from_date] to [to_date]."""
+        assert self.covers(
+            event, from_date, to_date
+        ), f"{self.filename} does not contain {event} from {from_date} to {to_date}."
+        first = (from_date - self.index.from_date).days
+        last = (to_date - self.index.from_date).days + 1
+        times = self.times[
+            location_idx, self.index.events.index(event), first:last
+        ]
+        days = np.flatnonzero(times[:, 0] != MISSING)
+        times = times[days]
+        is_moon_phase = event == Event.MOONPHASE.value
+        return EventTable(
+            locations=[self.index.locations[location_idx]],
+            kind=np.full(len(days), EVENT_KINDS.index(event), dtype=np.int8),
+            location_idx=np.zeros(len(days), dtype=np.int32),
+            date=np.datetime64(from_date, 'D') + days,
+            start=times[:, 0].astype('datetime64[s]').astype('datetime64[us]'),
+            end=times[:, 1].astype('datetime64[s]').astype('datetime64[us]'),
+            phase_idx=(
+                np.array(self.phases[location_idx, first:last][days])
+                if is_moon_phase
+                else np.full(len(days), -1, dtype=np.int8)
+            ),
+        )
+
+
+def padded(length: int) -> int:
+    return -(-length // 8) * 8
+
+
+def build_almanac(
+    locations: Iterable[Location],
+    from_date: dt.date,
+    to_date: dt.date,
+    filename: str = ALMANAC_FILE,
+    events: Iterable[str] | None = None,
+    workers: int = 1,
+    progress: ProgressCallback | None = None,
+) -> AlmanacIndex:
+    """
+    Calculate [events] (default: all) at [locations] on all local dates from [from_date] to [to_date] (like compute,
+    with [workers] processes) and write them to the almanac file [filename]. The file is replaced at once when it is
+    complete, so readers never see a partial file.
+    """
+    location_list = list(locations)
+    event_names = EVENT_KINDS if events is None else list(events)
+    index = AlmanacIndex(
+        events=event_names,
+        locations=location_list,
+        from_date=from_date,
+        days=(to_date - from_date).days + 1,
+        created=dt.datetime.now(dt.timezone.utc),
+    )
+    table = compute(
+        event_names,
+        location_list,
+        from_date,
+        to_date,
+        workers=workers,
+        progress=progress,
+    )
+
+    times = np.full(
+        (len(location_list), len(event_names), index.days, 2),
+        MISSING,
+        dtype='<i8',
+    )
+    phases = np.full((len(location_list), index.days), -1, dtype=np.int8)
+    event_idx = np.array(
+        [
+            event_names.index(event) if event in event_names else -1
+            for event in EVENT_KINDS
+        ]
+    )[table.kind]
+    day = (table.date - np.datetime64(from_date, 'D')).astype(np.int64)
+    # rounded down to whole seconds, so the times stay in the same minute as the exact times
+    times[table.location_idx, event_idx, day, 0] = table.start.astype(
+        'datetime64[s]'
+    ).astype(np.int64)
+    times[table.location_idx, event_idx, day, 1] = table.end.astype(
+        'datetime64[s]'
+    ).astype(np.int64)
+    moon_phase = table.phase_idx >= 0
+    phases[table.location_idx[moon_phase], day[moon_phase]] = table.phase_idx[
+        moon_phase
+    ]
+
+    index_bytes = index.model_dump_json().encode()
+    index_bytes += b' ' * (padded(len(index_bytes)) - len(index_bytes))
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'wb') as f:
+        f.write(HEADER.pack(ALMANAC_MAGIC, ALMANAC_VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        f.write(times.tobytes())
+        f.write(phases.tobytes())
+    os.replace(tmp_filename, filename)
+    return index
+
+
+@functools.lru_cache(maxsize=None)
+def open_almanac(filename: str, mtime: float) -> Almanac:
+    """Open [filename] once per process and modification time [mtime], a rebuilt file is opened again."""
+    return Almanac(filename)
+
+
+def available_almanacs() -> list[Almanac]:
+    """ALMANAC_FILE and the files in SUNCAL_ALMANAC that exist."""
+    filenames = [ALMANAC_FILE] + [
+        filename
+        for filename in os.environ.get(ALMANAC_ENV_VAR, '').split(os.pathsep)
+        if filename
+    ]
+    return [
+        open_almanac(os.path.abspath(filename), os.path.getmtime(filename))
+        for filename in filenames
+        if os.path.exists(filename)
+    ]
+
+
+def almanac_lookup(
+    almanac: Almanac, event: str, location_idx: int, location: Location
+) -> Callable[[dt.date], RiseSet | MoonPhase | MagicHour | None]:
+    """Lookup of the events of kind [event] at [location] (with index [location_idx] in [almanac]) by local date."""
+
+    def lookup(date: dt.date) -> RiseSet | MoonPhase | MagicHour | None:
+        table = almanac.table(event, location_idx, date, date)
+        table.locations = [location]
+        return next(table.celestial_events(), None)
+
+    return lookup
+
+
+def almanac_events(
+    event: str,
+    location: Location,
+    from_date: dt.date,
+    to_date: dt.date,
+    precision: str | None,
+) -> Callable[[dt.date], RiseSet | MoonPhase | MagicHour | None] | None:
+    """
+    Lookup of the events of kind [event] at [location] by local date (None on dates without the event) in the first
+    almanac that contains all of them from [from_date] to [to_date]. Only the dates that are looked up are read from
+    the memory-mapped almanac and converted to events, so the range is streamed and a selection of dates only pays for
+    the selected dates. None if no almanac contains them or if the [precision] is finer than that of the almanacs.
+    """
+    if PRECISIONS[precision or 'exact'] < PRECISIONS[ALMANAC_PRECISION]:
+        return None
+    for almanac in available_almanacs():
+        location_idx = almanac.location_index(location)
+        if location_idx is not None and almanac.covers(
+            event, from_date, to_date
+        ):
+            return almanac_lookup(almanac, event, location_idx, location)
+    return None
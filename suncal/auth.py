@@ -1,3 +1,4 @@
+import hashlib
 import os
 import sys
 
@@ -5,6 +6,17 @@ from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 
+SCOPES = [
+    "https://www.googleapis.com/auth/calendar",
+    "https://www.googleapis.com/auth/calendar.events",
+]
+
+TOKEN_FILE = "token.json"
+# local cache of the ids of Google calendars (account -> calendar title -> calendar id), stored next to the token
+CALENDAR_CACHE_FILE = os.path.join(
+    os.path.dirname(TOKEN_FILE), "calendars.json"
+)
+
 
 def get_credentials(scopes: list[str]) -> Credentials:
     """
@@ -24,8 +36,8 @@ def get_credentials(scopes: list[str]) -> Credentials:
     # The file token.pickle stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
     # time.
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", scopes)
+    if os.path.exists(TOKEN_FILE):
+        creds = Credentials.from_authorized_user_file(TOKEN_FILE, scopes)
     # If there are no (valid) credentials available, let the user log in.
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
@@ -39,7 +51,19 @@ def get_credentials(scopes: list[str]) -> Credentials:
             creds = flow.run_local_server(port=0)
         # Save the credentials for the next run
         print("save token")
-        with open("token.json", "w") as token:
+        with open(TOKEN_FILE, "w") as token:
             token.write(creds.to_json())
 
     return creds
+
+
+def account_key(creds: Credentials) -> str:
+    """
+    Key that identifies the Google account of [creds] without an API request: the account name if it is known,
+    otherwise a hash of the client id and refresh token (which change when a different account is authorized).
+    """
+    if creds.account:
+        return creds.account
+    return hashlib.sha256(
+        f"{creds.client_id}:{creds.refresh_token}".encode()
+    ).hexdigest()[:16]
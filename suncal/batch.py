@@ -0,0 +1,92 @@
+import datetime as dt
+from typing import Iterable
+
+from suncal.ephemeris import split_by_kernel
+from suncal.models.astro import EVENT_KINDS
+from suncal.models.astro import EventTable
+from suncal.models.astro import Location
+from suncal.models.astro import calculate_events
+from suncal.pool import WarmPool
+from suncal.progress import Progress
+from suncal.progress import ProgressCallback
+from suncal.utils import timezone_finder
+
+
+def location_of(
+    latitude: float, longitude: float, timezone: str | None = None
+) -> Location:
+    """Location at [latitude]/[longitude]. If no [timezone] is provided, it is determined from the coordinates."""
+    timezone = timezone or timezone_finder().timezone_at(
+        lng=longitude, lat=latitude
+    )
+    assert timezone is not None, "Timezone could not be determined."
+    return Location(timezone=timezone, longitude=longitude, latitude=latitude)
+
+
+def calculate_location(
+    task: tuple[list[str], Location, dt.date, dt.date, int, str | None],
+) -> EventTable:
+    """All events of one location of compute (module-level, so that it can be sent to worker processes)."""
+    events, location, start, end, location_idx, precision = task
+    return calculate_events(
+        events,
+        start,
+        end,
+        location,
+        location_idx=location_idx,
+        precision=precision,
+    )
+
+
+def compute(
+    events: str | Iterable[str],
+    locations: Location | Iterable[Location],
+    start: dt.date,
+    end: dt.date,
+    workers: int = 1,
+    precision: str | None = None,
+    progress: ProgressCallback | None = None,
+) -> EventTable:
+    """
+    Library entry point: calculate all [events] (values of suncal.models.astro.Event) for all [locations] on every
+    date from [start] to [end] and return the results as one EventTable (sorted by location, then event). Nothing is
+    printed or written. Ephemeris kernels and the timescale are loaded once and reused by later calls. With
+    [workers] > 1, the locations are calculated in parallel by a suncal.pool.WarmPool. The event times are calculated
+    with the given [precision] ("second", "minute" or "5min", see suncal.models.astro.find_discrete), by default as
+    exact as skyfield calculates them. Snapshots of the progress (suncal.progress.ProgressSnapshot) are passed to the
+    [progress] callback whenever a location is done, at most once per second.
+    """
+    event_names = [events] if isinstance(events, str) else list(events)
+    location_list = (
+        [locations] if isinstance(locations, Location) else list(locations)
+    )
+    for event in event_names:
+        assert event in EVENT_KINDS, f"Unknown event {event}."
+    assert end >= start, "end must be >= start."
+    # fail early if the range is not covered by any ephemeris
+    split_by_kernel(start, end)
+
+    tasks = [
+        (event_names, location, start, end, i, precision)
+        for i, location in enumerate(location_list)
+    ]
+    days = (end - start).days + 1
+    run_progress = Progress(total_days=days * len(tasks), callback=progress)
+
+    def collect(results: Iterable[EventTable]) -> list[EventTable]:
+        tables = []
+        for table in results:
+            tables.append(table)
+            run_progress.add_days(days, len(table))
+        return tables
+
+    if workers == 1 or len(tasks) <= 1:
+        tables = collect(map(calculate_location, tasks))
+    else:
+        with WarmPool(
+            min(workers, len(tasks)), from_date=start, to_date=end
+        ) as pool:
+            tables = collect(pool.map(calculate_location, tasks))
+    run_progress.finish()
+
+    return EventTable.concatenate(tables, location_list)
@@ -0,0 +1,370 @@
+"""
+Benchmarks for capacity planning: standard scenarios (events x length of the range x number of locations x engine x
+workers) are run with the real CALC functions, the batched engine and the ics renderer. Every scenario runs in a fresh
+process, once cold (including loading the ephemeris, the timescale and the timezone data) and once warm, and reports
+throughput, latency percentiles and the peak memory of that process and its workers.
+"""
+
+import datetime as dt
+import itertools
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from multiprocessing.connection import Connection
+from typing import Callable
+
+import numpy as np
+from pydantic import BaseModel  # pylint: disable=E0611
+from pydantic import Field
+
+from suncal import __version__
+from suncal.accuracy import CASES
+from suncal.accuracy import random_cases
+from suncal.models.astro import CALC
+from suncal.models.astro import EVENT_KINDS
+from suncal.models.astro import Location
+from suncal.models.astro import MagicHour
+from suncal.models.astro import MoonPhase
+from suncal.models.astro import RiseSet
+from suncal.models.astro import calculate_events
+from suncal.models.calendar import CalendarEvent
+from suncal.models.icalendar import iter_ics_content
+from suncal.pool import WarmPool
+
+try:
+    import resource
+except (
+    ImportError
+):  # not available on Windows, the peak memory is not reported there
+    resource = None  # type: ignore
+
+CelestialEvent = RiseSet | MoonPhase | MagicHour
+
+# first date of the range of every scenario
+BENCH_START = dt.date(2025, 1, 1)
+
+# event sets of the scenarios: a single event or all events
+EVENT_SETS = {'sunrise': ['sunrise'], 'all': EVENT_KINDS}
+
+
+class Scenario(BaseModel):
+    """
+    Calculate the events of [event_set] (a key of EVENT_SETS) for [locations] locations on [days] days with [engine]
+    (a key of ENGINES) in [workers] worker processes with the given [precision] and render them as ics, if [ics].
+    """
+
+    event_set: str
+    days: int = Field(ge=1)
+    locations: int = Field(ge=1)
+    engine: str
+    workers: int = Field(default=1, ge=1)
+    precision: str | None = None
+    ics: bool = True
+
+    @property
+    def name(self) -> str:
+        return (
+            f"{self.engine}/{self.event_set}/{self.days}d/{self.locations}loc/{self.workers}w"
+            f"/{self.precision or 'exact'}"
+        )
+
+
+def scenarios(
+    event_sets: list[str],
+    days: list[int],
+    locations: list[int],
+    engines: list[str],
+    workers: list[int],
+    precisions: list[str | None],
+    ics: bool = True,
+) -> list[Scenario]:
+    """All combinations of the given dimensions, without those with more workers than locations."""
+    return [
+        Scenario(
+            event_set=event_set,
+            days=n_days,
+            locations=n_locations,
+            engine=engine,
+            workers=n_workers,
+            precision=precision,
+            ics=ics,
+        )
+        for event_set, n_days, n_locations, engine, n_workers, precision in itertools.product(
+            event_sets, days, locations, engines, workers, precisions
+        )
+        if n_workers == 1 or n_workers <= n_locations
+    ]
+
+
+def bench_locations(n: int) -> list[Location]:
+    """
+    [n] locations: the distinct locations of the accuracy cases (mid latitudes, polar, equatorial, date line), then
+    random locations.
+    """
+    locations: list[Location] = []
+    for c in CASES:
+        if c.location not in locations:
+            locations.append(c.location)
+    locations = locations[:n]
+    locations += [c.location for c in random_cases(n - len(locations))]
+    return locations
+
+
+# engines --------------------------------------------------------------------------------------------------------------
+# events and the latencies of its work items in seconds
+Work = tuple[list[CelestialEvent], list[float]]
+Task = tuple[list[str], Location, dt.date, dt.date, str | None]
+
+
+def per_day_location(task: Task) -> Work:
+    """
+    Calculate every event on every date on its own with CALC, like suncal ics. A work item is one event on one day.
+    """
+    events, location, from_date, to_date, precision = task
+    c_events: list[CelestialEvent] = []
+    latencies = []
+    for event in events:
+        for i in range((to_date - from_date).days + 1):
+            start = time.perf_counter()
+            c_event = CALC[event](
+                from_date + dt.timedelta(days=i), location, precision
+            )
+            latencies.append(time.perf_counter() - start)
+            if c_event is not None:
+                c_events.append(c_event)
+    return c_events, latencies
+
+
+def batch_location(task: Task) -> Work:
+    """Calculate the whole range at once with calculate_events, like compute. A work item is one location."""
+    events, location, from_date, to_date, precision = task
+    start = time.perf_counter()
+    table = calculate_events(
+        events, from_date, to_date, location, precision=precision
+    )
+    c_events = list(table.celestial_events())
+    return c_events, [time.perf_counter() - start]
+
+
+ENGINES: dict[str, Callable[[Task], Work]] = {
+    'per_day': per_day_location,
+    'batch': batch_location,
+}
+
+
+# measurement ----------------------------------------------------------------------------------------------------------
+class Run(BaseModel):
+    """One run of a scenario: wall time of the calculation and of the rendering in seconds, events and ics size."""
+
+    seconds: float
+    calc_seconds: float
+    render_seconds: float
+    events: int
+    ics_bytes: int
+    latencies: list[float]
+
+
+def run_scenario(scenario: Scenario, locations: list[Location]) -> Run:
+    """Run [scenario] for [locations] in this process."""
+    start = time.perf_counter()
+    to_date = BENCH_START + dt.timedelta(days=scenario.days - 1)
+    tasks = [
+        (
+            EVENT_SETS[scenario.event_set],
+            location,
+            BENCH_START,
+            to_date,
+            scenario.precision,
+        )
+        for location in locations
+    ]
+    engine = ENGINES[scenario.engine]
+    if scenario.workers == 1 or len(tasks) <= 1:
+        works = [engine(task) for task in tasks]
+    else:
+        with WarmPool(
+            min(scenario.workers, len(tasks)),
+            from_date=BENCH_START,
+            to_date=to_date,
+        ) as pool:
+            works = list(pool.map(engine, tasks))
+    c_events = [c_event for events, _ in works for c_event in events]
+    calculated = time.perf_counter()
+
+    ics_bytes = 0
+    if scenario.ics:
+        for line in iter_ics_content(
+            CalendarEvent.from_celestial_event(c_event) for c_event in c_events
+        ):
+            ics_bytes += len(line) + 2
+    end = time.perf_counter()
+    return Run(
+        seconds=end - start,
+        calc_seconds=calculated - start,
+        render_seconds=end - calculated,
+        events=len(c_events),
+        ics_bytes=ics_bytes,
+        latencies=[latency for _, latencies in works for latency in latencies],
+    )
+
+
+def peak_rss_mb() -> tuple[float | None, float | None]:
+    """Peak resident memory of this process and of its largest terminated child process in MB."""
+    if sys.platform == 'win32':
+        return None, None
+    # kilobytes on Linux, bytes on macOS
+    unit = 1 if sys.platform == 'darwin' else 1024
+    peak_self, peak_children = (
+        round(resource.getrusage(who).ru_maxrss * unit / 2**20, 1)
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    )
+    return peak_self, peak_children
+
+
+class ScenarioResult(BaseModel):
+    """
+    Result of a [scenario]: [startup_seconds] to start the process and import suncal, [cold_seconds] of the first run
+    (including the location lookup and loading the ephemeris, the timescale and the timezone data) and [warm_seconds]
+    of the second run. The throughput, the latencies of the work items (one event on one day for per_day, one
+    location for batch) and the split into calculation and rendering are those of the warm run. [peak_rss_mb] is the
+    peak memory of the process, [peak_worker_rss_mb] that of its largest worker (if any).
+    """
+
+    scenario: Scenario
+    name: str
+    location_days: int
+    events: int
+    ics_bytes: int
+    startup_seconds: float
+    cold_seconds: float
+    warm_seconds: float
+    calc_seconds: float
+    render_seconds: float
+    days_per_second: float
+    events_per_second: float
+    latency_unit: str
+    latency_p50_ms: float
+    latency_p95_ms: float
+    latency_p99_ms: float
+    latency_max_ms: float
+    peak_rss_mb: float | None
+    peak_worker_rss_mb: float | None
+
+
+def measure_scenario(scenario: Scenario, started: float) -> ScenarioResult:
+    """Run [scenario] cold and warm in this process, which was started at [started] (time.time())."""
+    startup = time.time() - started
+    cold_start = time.perf_counter()
+    locations = bench_locations(scenario.locations)
+    cold = run_scenario(scenario, locations)
+    cold_seconds = time.perf_counter() - cold_start
+    warm = run_scenario(scenario, locations)
+    peak_rss, peak_worker_rss = peak_rss_mb()
+
+    p50, p95, p99 = (
+        float(value) * 1000
+        for value in np.percentile(warm.latencies, [50, 95, 99])
+    )
+    location_days = scenario.days * scenario.locations
+    return ScenarioResult(
+        scenario=scenario,
+        name=scenario.name,
+        location_days=location_days,
+        events=warm.events,
+        ics_bytes=warm.ics_bytes,
+        startup_seconds=round(startup, 3),
+        cold_seconds=round(cold_seconds, 3),
+        warm_seconds=round(warm.seconds, 3),
+        calc_seconds=round(warm.calc_seconds, 3),
+        render_seconds=round(warm.render_seconds, 3),
+        days_per_second=round(location_days / warm.seconds, 1),
+        events_per_second=round(warm.events / warm.seconds, 1),
+        latency_unit=(
+            'event and day' if scenario.engine == 'per_day' else 'location'
+        ),
+        latency_p50_ms=round(p50, 3),
+        latency_p95_ms=round(p95, 3),
+        latency_p99_ms=round(p99, 3),
+        latency_max_ms=round(max(warm.latencies) * 1000, 3),
+        peak_rss_mb=peak_rss,
+        peak_worker_rss_mb=peak_worker_rss if scenario.workers > 1 else None,
+    )
+
+
+def measure_in_process(
+    scenario: Scenario, started: float, connection: Connection
+) -> None:
+    """Entry point of the benchmark process: send the result (or the error) of measure_scenario to the parent."""
+    try:
+        connection.send(measure_scenario(scenario, started))
+    except Exception as e:  # pylint: disable=W0718
+        connection.send(e)
+    finally:
+        connection.close()
+
+
+def bench_scenario(scenario: Scenario) -> ScenarioResult:
+    """
+    Measure [scenario] in a new (spawned) process, so that the cold start is really cold and the peak memory is that
+    of the scenario alone.
+    """
+    assert (
+        scenario.event_set in EVENT_SETS
+    ), f"Unknown event set {scenario.event_set!r}."
+    assert (
+        scenario.engine in ENGINES
+    ), f"Unknown engine {scenario.engine!r}, choose any of {list(ENGINES)}."
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=measure_in_process, args=(scenario, time.time(), sender)
+    )
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = RuntimeError(
+            f"Benchmark process of {scenario.name} exited with code {process.exitcode}."
+        )
+    process.join()
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+class Machine(BaseModel):
+    platform: str
+    processor: str
+    cpus: int | None
+    python: str
+    suncal: str
+
+
+class BenchReport(BaseModel):
+    machine: Machine
+    scenarios: list[ScenarioResult]
+
+
+def run_bench(
+    scenario_list: list[Scenario],
+    progress: Callable[[Scenario], None] | None = None,
+) -> BenchReport:
+    """Measure all scenarios one after the other, [progress] is called before each scenario."""
+    results = []
+    for scenario in scenario_list:
+        if progress is not None:
+            progress(scenario)
+        results.append(bench_scenario(scenario))
+    return BenchReport(
+        machine=Machine(
+            platform=platform.platform(),
+            processor=platform.processor() or platform.machine(),
+            cpus=os.cpu_count(),
+            python=platform.python_version(),
+            suncal=__version__,
+        ),
+        scenarios=results,
+    )
@@ -5,6 +5,9 @@ import pytz
 from click.core import Context as ClickContext
 from click.core import Parameter as ClickParameter
 
+from suncal.dates import Recurrence
+from suncal.dates import parse_weekdays
+from suncal.models.astro import PRECISIONS
 from suncal.models.astro import Event
 
 
@@ -52,6 +55,75 @@ class ClickDate(click.ParamType):
             )
 
 
+class ClickWeekdays(click.ParamType):
+    name = "Weekdays"
+
+    def convert(
+        self,
+        value: str,
+        param: ClickParameter | None,
+        ctx: ClickContext | None,
+    ):
+
+        try:
+            return parse_weekdays(value)
+
+        except ValueError as e:
+            self.fail(str(e), param, ctx)
+
+
+class ClickCoordinates(click.ParamType):
+    """Location given as "LAT,LONG" or "LAT,LONG,TIMEZONE", converted to (latitude, longitude, timezone or None)."""
+
+    name = "LAT,LONG[,TIMEZONE]"
+
+    def convert(
+        self,
+        value: str,
+        param: ClickParameter | None,
+        ctx: ClickContext | None,
+    ):
+
+        parts = [part.strip() for part in value.split(',')]
+        try:
+            assert len(parts) in (2, 3)
+            latitude, longitude = float(parts[0]), float(parts[1])
+        except (AssertionError, ValueError):
+            self.fail(
+                f"{value!r} is not a location, use LAT,LONG or LAT,LONG,TIMEZONE (e.g. 52.52,13.41).",
+                param,
+                ctx,
+            )
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            self.fail(f"{value!r} is out of range.", param, ctx)
+        timezone = (
+            IANATimeZoneString().convert(parts[2], param, ctx)
+            if len(parts) == 3
+            else None
+        )
+        return latitude, longitude, timezone
+
+
+class ClickRecurrence(click.ParamType):
+    """Validate an RRULE, the rule itself is passed on as string."""
+
+    name = "RRULE"
+
+    def convert(
+        self,
+        value: str,
+        param: ClickParameter | None,
+        ctx: ClickContext | None,
+    ):
+
+        try:
+            Recurrence.from_rrule(value)
+            return value
+
+        except (ValueError, AssertionError) as e:
+            self.fail(f"{value!r} is not a supported RRULE: {e}", param, ctx)
+
+
 def common_suncal_options(function):
     """Create decorator for click sub-commands that holds all options that are common to the
     api and ics subcommands."""
@@ -72,6 +144,46 @@ def common_suncal_options(function):
         required=True,
     )(function)
 
+    function = date_selection_options(function)
+
+    return event_location_options(function)
+
+
+def date_selection_options(function):
+    """Create decorator for click sub-commands that select the dates of the range for which events are created."""
+
+    function = click.option(
+        "--weekdays",
+        "weekdays",
+        type=ClickWeekdays(),
+        required=False,
+        help="Only create events on these weekdays, e.g. 'sa,su'. Optional.",
+    )(function)
+
+    function = click.option(
+        "--rrule",
+        "rrule",
+        type=ClickRecurrence(),
+        required=False,
+        help="Only create events on the dates of this recurrence rule (RFC 5545 RRULE with FREQ, INTERVAL, BYDAY, "
+        "BYMONTHDAY and BYMONTH), e.g. 'FREQ=MONTHLY;BYMONTHDAY=1'. The rule starts on --from. Optional.",
+    )(function)
+
+    function = click.option(
+        "--dates-file",
+        "dates_file",
+        type=click.Path(exists=True, dir_okay=False),
+        required=False,
+        help="Only create events on the dates listed in this file (one date YYYY-MM-DD per line). Optional.",
+    )(function)
+
+    return function
+
+
+def event_location_options(function):
+    """Create decorator for click sub-commands that holds the event and location options (all common options except
+    the date range)."""
+
     function = click.option(
         "--event",
         "event_name",
@@ -105,6 +217,15 @@ def common_suncal_options(function):
         required=False,
     )(function)
 
+    function = click.option(
+        "--precision",
+        "precision",
+        type=click.Choice(list(PRECISIONS), case_sensitive=False),
+        required=False,
+        help="Precision of the event times. Default: minute for calendars (their events only show hours and minutes), "
+        "exact for exports.",
+    )(function)
+
     function = click.option('--dev/--no-dev', 'dev_mode', default=False)(
         function
     )
@@ -0,0 +1,257 @@
+"""
+Selection of the dates within a range for which events are calculated: a weekday filter, a recurrence rule (a subset
+of the RRULE of RFC 5545) and/or an explicit list of dates. The selection is applied to the dates before any astronomy
+runs, so sparse calendars (e.g. only weekends or the first day of every month) only cost the selected days.
+"""
+
+import calendar
+import datetime as dt
+from typing import Iterator
+
+from pydantic import BaseModel  # pylint: disable=E0611
+from pydantic import Field
+
+from suncal.utils import iter_date_range
+
+# two-letter weekday codes of RFC 5545, index = dt.date.weekday()
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+FREQUENCIES = ['DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY']
+
+
+def parse_weekday(value: str) -> int:
+    """Weekday (0 = Monday) of a two-letter code (e.g. "SA") or an english name (e.g. "sat", "Saturday")."""
+    code = value.strip().upper()[:2]
+    if code not in WEEKDAYS:
+        raise ValueError(
+            f"{value!r} is not a weekday, use any of {', '.join(WEEKDAYS)}."
+        )
+    return WEEKDAYS.index(code)
+
+
+def parse_weekdays(value: str) -> set[int]:
+    """Weekdays of a comma-separated list, e.g. "sa,su" or "Sat,Sun"."""
+    return {parse_weekday(day) for day in value.split(',') if day.strip()}
+
+
+class WeekdayRule(BaseModel):
+    """
+    BYDAY entry of a recurrence rule: [weekday] (0 = Monday) and optionally its [ordinal] within the month or year
+    (1 = first, -1 = last), e.g. "1SA" is the first Saturday.
+    """
+
+    weekday: int = Field(ge=0, le=6)
+    ordinal: int | None = None
+
+
+class Recurrence(BaseModel):
+    """
+    Recurrence rule with the parts FREQ, INTERVAL, BYDAY, BYMONTHDAY and BYMONTH of an RFC 5545 RRULE. Like DTSTART,
+    the first date of the range anchors the rule: it is the first occurrence of an INTERVAL and provides the day that
+    is used if the rule does not say otherwise (e.g. the weekday of FREQ=WEEKLY).
+    """
+
+    freq: str
+    interval: int = Field(default=1, ge=1)
+    by_day: list[WeekdayRule] | None = None
+    by_month_day: list[int] | None = None
+    by_month: list[int] | None = None
+
+    @staticmethod
+    def from_rrule(rule: str) -> 'Recurrence':
+        """Parse an RRULE, e.g. "FREQ=MONTHLY;BYDAY=1SA" or "RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=SA,SU"."""
+        parts: dict[str, str] = {}
+        for part in rule.strip().removeprefix('RRULE:').split(';'):
+            if not part:
+                continue
+            key, sep, value = part.partition('=')
+            if not sep:
+                raise ValueError(f"{part!r} is not a KEY=VALUE rule part.")
+            parts[key.strip().upper()] = value.strip().upper()
+
+        unsupported = set(parts) - {
+            'FREQ',
+            'INTERVAL',
+            'BYDAY',
+            'BYMONTHDAY',
+            'BYMONTH',
+        }
+        if unsupported:
+            raise ValueError(
+                f"Unsupported rule parts {sorted(unsupported)}, only FREQ, INTERVAL, BYDAY, BYMONTHDAY and BYMONTH "
+                f"are supported (the range is set by --from and --to)."
+            )
+        if parts.get('FREQ') not in FREQUENCIES:
+            raise ValueError(
+                f"The rule requires FREQ with any of {', '.join(FREQUENCIES)}."
+            )
+
+        def integers(value: str) -> list[int]:
+            return [int(item) for item in value.split(',')]
+
+        by_day = None
+        if 'BYDAY' in parts:
+            by_day = []
+            for item in parts['BYDAY'].split(','):
+                ordinal = item[:-2]
+                by_day.append(
+                    WeekdayRule(
+                        weekday=parse_weekday(item[-2:]),
+                        ordinal=int(ordinal) if ordinal else None,
+                    )
+                )
+
+        recurrence = Recurrence(
+            freq=parts['FREQ'],
+            interval=int(parts.get('INTERVAL', 1)),
+            by_day=by_day,
+            by_month_day=(
+                integers(parts['BYMONTHDAY']) if 'BYMONTHDAY' in parts else None
+            ),
+            by_month=(
+                integers(parts['BYMONTH']) if 'BYMONTH' in parts else None
+            ),
+        )
+        if recurrence.freq not in ('MONTHLY', 'YEARLY') and any(
+            rule.ordinal for rule in recurrence.by_day or []
+        ):
+            raise ValueError(
+                "BYDAY with an ordinal (e.g. 1SA) requires FREQ=MONTHLY or FREQ=YEARLY."
+            )
+        if not all(
+            1 <= abs(day) <= 31 for day in recurrence.by_month_day or []
+        ):
+            raise ValueError("BYMONTHDAY must be within 1..31 or -31..-1.")
+        if not all(1 <= month <= 12 for month in recurrence.by_month or []):
+            raise ValueError("BYMONTH must be within 1..12.")
+        return recurrence
+
+    def period(self, date: dt.date, start: dt.date) -> int:
+        """Number of periods (days, weeks starting on Monday, months or years) between [start] and [date]."""
+        if self.freq == 'DAILY':
+            return (date - start).days
+        if self.freq == 'WEEKLY':
+            return (
+                (date - dt.timedelta(days=date.weekday()))
+                - (start - dt.timedelta(days=start.weekday()))
+            ).days // 7
+        if self.freq == 'MONTHLY':
+            return (date.year - start.year) * 12 + date.month - start.month
+        return date.year - start.year
+
+    def matches_weekday(self, date: dt.date) -> bool:
+        assert self.by_day is not None
+        # the ordinals count within the month, or within the year for yearly rules without BYMONTH
+        if self.freq == 'YEARLY' and not self.by_month:
+            day, days = (
+                date.timetuple().tm_yday,
+                366 if calendar.isleap(date.year) else 365,
+            )
+        else:
+            day, days = (
+                date.day,
+                calendar.monthrange(date.year, date.month)[1],
+            )
+        nth, nth_last = (day - 1) // 7 + 1, -((days - day) // 7 + 1)
+        return any(
+            rule.weekday == date.weekday()
+            and rule.ordinal in (None, nth, nth_last)
+            for rule in self.by_day
+        )
+
+    def matches(self, date: dt.date, start: dt.date) -> bool:
+        """Whether [date] is an occurrence of the rule that starts on [start]."""
+        if date < start or self.period(date, start) % self.interval:
+            return False
+        if self.by_month and date.month not in self.by_month:
+            return False
+        if self.by_month_day:
+            days = calendar.monthrange(date.year, date.month)[1]
+            if not any(
+                date.day == (day if day > 0 else days + day + 1)
+                for day in self.by_month_day
+            ):
+                return False
+        if self.by_day and not self.matches_weekday(date):
+            return False
+
+        # without BY* parts, the rule repeats the day of the start date
+        if self.freq == 'WEEKLY' and not self.by_day:
+            return date.weekday() == start.weekday()
+        if self.freq in ('MONTHLY', 'YEARLY') and not (
+            self.by_day or self.by_month_day
+        ):
+            if self.freq == 'YEARLY' and not self.by_month:
+                return (date.month, date.day) == (start.month, start.day)
+            return date.day == start.day
+        return True
+
+
+def read_dates_file(filename: str) -> set[dt.date]:
+    """Dates of a text file with one date (YYYY-MM-DD) per line. Empty lines and lines starting with # are ignored."""
+    dates = set()
+    with open(filename) as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                dates.add(dt.date.fromisoformat(line))
+            except ValueError as e:
+                raise ValueError(
+                    f"{filename}, line {number}: {line!r} is not a date in the format YYYY-MM-DD."
+                ) from e
+    return dates
+
+
+class DateSelection(BaseModel):
+    """
+    Dates of a range for which events are calculated. A date is selected if it matches all provided criteria: one of
+    the [weekdays] (0 = Monday), the recurrence [rule] and one of the explicit [dates].
+    """
+
+    weekdays: set[int] | None = None
+    rule: Recurrence | None = None
+    dates: set[dt.date] | None = None
+
+    @staticmethod
+    def from_options(
+        weekdays: set[int] | None = None,
+        rrule: str | None = None,
+        dates_file: str | None = None,
+    ) -> 'DateSelection | None':
+        """Selection of the command line options, None if no dates are selected (i.e. all dates of the range)."""
+        if weekdays is None and rrule is None and dates_file is None:
+            return None
+        return DateSelection(
+            weekdays=weekdays,
+            rule=Recurrence.from_rrule(rrule) if rrule else None,
+            dates=read_dates_file(dates_file) if dates_file else None,
+        )
+
+    def matches(self, date: dt.date, start: dt.date) -> bool:
+        """Whether [date] is selected in a range that starts on [start]."""
+        return (
+            (self.weekdays is None or date.weekday() in self.weekdays)
+            and (self.rule is None or self.rule.matches(date, start))
+            and (self.dates is None or date in self.dates)
+        )
+
+    def iter_dates(
+        self,
+        from_date: dt.date,
+        to_date: dt.date,
+        start: dt.date | None = None,
+    ) -> Iterator[dt.date]:
+        """
+        Lazily yield the selected dates from [from_date] to [to_date] in ascending order. [start] is the first date of
+        the whole range (default: [from_date]) if only a part of it is iterated.
+        """
+        start = start or from_date
+        dates = (
+            sorted(date for date in self.dates if from_date <= date <= to_date)
+            if self.dates is not None
+            else iter_date_range(from_date, to_date)
+        )
+        for date in dates:
+            if self.matches(date, start):
+                yield date
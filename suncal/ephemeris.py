@@ -0,0 +1,222 @@
+import datetime as dt
+import functools
+import os
+
+from jplephem.calendar import compute_calendar_date
+from jplephem.calendar import compute_julian_date
+from jplephem.daf import DAF
+from jplephem.excerpter import write_excerpt
+from jplephem.spk import SPK
+from pydantic import BaseModel  # pylint: disable=E0611
+from skyfield import api as skyfield_api
+from skyfield.jpllib import SpiceKernel
+from skyfield.timelib import Timescale
+
+FULL_EPHEMERIS = 'de421.bsp'  # covers 1900-2050 and all planets
+TRIMMED_EPHEMERIS = 'suncal-excerpt.bsp'  # written by 'suncal ephem build'
+
+# NAIF ids of the only segments suncal needs: Earth-Moon barycenter, Sun, Moon and Earth as well as the barycenters of
+# Jupiter and Saturn, which skyfield uses for the gravitational deflection of light in apparent positions
+REQUIRED_TARGETS = (3, 5, 6, 10, 301, 399)
+
+# local dates can start up to 14h before and end up to 12h after the corresponding UTC date, so the excerpt gets some
+# extra days on both ends
+MARGIN_DAYS = 2
+
+
+class Kernel(BaseModel):
+    """
+    JPL ephemeris kernel and the first and last local date that can be calculated with it.
+    """
+
+    filename: str
+    first_date: dt.date
+    last_date: dt.date
+
+    def covers(self, from_date: dt.date, to_date: dt.date) -> bool:
+        """Check if all dates from [from_date] to [to_date] can be calculated with this kernel."""
+        return self.first_date <= from_date and to_date <= self.last_date
+
+
+# kernels in order of preference: the small kernels first, the large de441 parts (1.6 GB each) only for dates that are
+# not covered otherwise. Kernels are downloaded by skyfield when they are needed for the first time.
+KERNELS = [
+    Kernel(
+        filename=FULL_EPHEMERIS,
+        first_date=dt.date(1900, 1, 1),
+        last_date=dt.date(2050, 12, 31),
+    ),
+    Kernel(
+        filename='de440s.bsp',
+        first_date=dt.date(1850, 1, 1),
+        last_date=dt.date(2149, 12, 31),
+    ),
+    Kernel(
+        filename='de441_part-1.bsp',
+        first_date=dt.date(1, 1, 2),
+        last_date=dt.date(1969, 7, 26),
+    ),
+    Kernel(
+        filename='de441_part-2.bsp',
+        first_date=dt.date(1969, 8, 1),
+        # the end of the last date has to be representable as datetime
+        last_date=dt.date(9999, 12, 30),
+    ),
+]
+
+
+def julian_date(date: dt.date) -> float:
+    """Julian date of midnight (UTC) at the beginning of [date]."""
+    return compute_julian_date(date.year, date.month, date.day) - 0.5
+
+
+def date_of_julian_date(jd: float) -> dt.date:
+    """UTC date of the Julian date [jd]."""
+    return dt.date(*compute_calendar_date(int(jd + 0.5)))
+
+
+@functools.lru_cache(maxsize=None)
+def load_kernel(filename: str) -> SpiceKernel:
+    """
+    Load the ephemeris in [filename] once per process. Only the header of the file is read here: jplephem
+    memory-maps the segments when they are used for the first time, so only the pages for the dates that are actually
+    calculated are ever read into memory.
+    """
+    return skyfield_api.load(filename)
+
+
+@functools.lru_cache(maxsize=None)
+def kernel_coverage(filename: str) -> tuple[float, float]:
+    """Julian dates (start, end) that are covered by all segments of the kernel in [filename]."""
+    segments = load_kernel(filename).spk.segments
+    return (
+        max(segment.start_jd for segment in segments),
+        min(segment.end_jd for segment in segments),
+    )
+
+
+def kernel_of_file(filename: str) -> Kernel:
+    """Kernel with the range of local dates that can be calculated with the (excerpt) file [filename]."""
+    start_jd, end_jd = kernel_coverage(filename)
+    return Kernel(
+        filename=filename,
+        first_date=date_of_julian_date(start_jd) + dt.timedelta(days=1),
+        last_date=date_of_julian_date(end_jd) - dt.timedelta(days=2),
+    )
+
+
+def covers(filename: str, from_date: dt.date, to_date: dt.date) -> bool:
+    """Check if the kernel in [filename] covers all dates from [from_date] to [to_date]."""
+    return kernel_of_file(filename).covers(from_date, to_date)
+
+
+def available_kernels() -> list[Kernel]:
+    """All kernels in order of preference, starting with the trimmed excerpt if it exists."""
+    if os.path.exists(TRIMMED_EPHEMERIS):
+        return [kernel_of_file(TRIMMED_EPHEMERIS)] + KERNELS
+    return KERNELS
+
+
+def kernel_for_date(date: dt.date) -> Kernel:
+    """Preferred kernel for the calculation of events on [date]."""
+    for kernel in available_kernels():
+        if kernel.covers(date, date):
+            return kernel
+
+    first_date = min(kernel.first_date for kernel in KERNELS)
+    last_date = max(kernel.last_date for kernel in KERNELS)
+    raise ValueError(
+        f"No ephemeris covers {date.isoformat()}. Events can be calculated from {first_date.isoformat()} to "
+        f"{last_date.isoformat()}."
+    )
+
+
+def split_by_kernel(
+    from_date: dt.date, to_date: dt.date
+) -> list[tuple[dt.date, dt.date, str]]:
+    """
+    Split the range of dates from [from_date] to [to_date] into chunks (first date, last date, kernel filename) at the
+    boundaries of the kernels, so that every chunk can be calculated with one (preferably small) kernel. The kernel of
+    a chunk is the preferred kernel (kernel_for_date) of every date in it, so the per-day calculations, which load the
+    kernel of their date, and the batched calculations of the chunk use the same kernel. Raise a ValueError before
+    anything is calculated if a part of the range is not covered by any kernel.
+    """
+    kernels = available_kernels()
+    chunks = []
+    date = from_date
+    while date <= to_date:
+        kernel = kernel_for_date(date)
+        # a preferred kernel that starts within the range of this kernel takes over from its first date
+        takeovers = [
+            preferred.first_date - dt.timedelta(days=1)
+            for preferred in kernels[: kernels.index(kernel)]
+            if preferred.first_date > date
+        ]
+        last_date = min([kernel.last_date, to_date, *takeovers])
+        chunks.append((date, last_date, kernel.filename))
+        date = last_date + dt.timedelta(days=1)
+
+    return chunks
+
+
+def load_ephemeris(
+    from_date: dt.date | None = None, to_date: dt.date | None = None
+) -> SpiceKernel:
+    """
+    Load the ephemeris for calculations between [from_date] and [to_date]. A trimmed excerpt created with
+    'suncal ephem build' is preferred whenever it exists and covers the requested dates, otherwise the first kernel in
+    KERNELS that covers all dates is used (de421 if no dates are provided).
+    """
+    if from_date is None:
+        return load_kernel(available_kernels()[0].filename)
+
+    to_date = to_date or from_date
+    for kernel in available_kernels():
+        if kernel.covers(from_date, to_date):
+            return load_kernel(kernel.filename)
+
+    raise ValueError(
+        f"No single ephemeris covers all dates from {from_date.isoformat()} to {to_date.isoformat()}. Use "
+        f"split_by_kernel to calculate the range in chunks."
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def load_timescale() -> Timescale:
+    """Load the skyfield timescale once per process."""
+    return skyfield_api.load.timescale()
+
+
+def build_trimmed_ephemeris(
+    from_date: dt.date,
+    to_date: dt.date,
+    filename: str = TRIMMED_EPHEMERIS,
+    source: str = FULL_EPHEMERIS,
+) -> str:
+    """
+    Write an excerpt of the ephemeris in [source] to [filename] that only contains the segments in REQUIRED_TARGETS
+    for the dates from [from_date] to [to_date]. Return the name of the written file.
+    """
+    assert to_date >= from_date, "to_date must be >= from_date."
+
+    # make sure that the source kernel is available (skyfield downloads it if necessary)
+    load_kernel(source)
+
+    start_jd = julian_date(from_date - dt.timedelta(days=MARGIN_DAYS))
+    end_jd = julian_date(to_date + dt.timedelta(days=MARGIN_DAYS + 1))
+
+    with open(source, 'rb') as f:
+        spk = SPK(DAF(f))
+        summaries = [
+            summary
+            for summary, segment in zip(spk.daf.summaries(), spk.segments)
+            if segment.target in REQUIRED_TARGETS
+        ]
+        with open(filename, 'w+b') as output_file:
+            write_excerpt(spk, output_file, start_jd, end_jd, summaries)
+
+    # a cached kernel with the same name is outdated now
+    load_kernel.cache_clear()
+    kernel_coverage.cache_clear()
+
+    return filename
@@ -0,0 +1,98 @@
+"""
+The event pipeline from the calculation to the sinks: celestial events are calculated (or read from an almanac) lazily
+date by date and converted to sink-neutral calendar events.
+"""
+
+import datetime as dt
+from typing import Iterator
+
+from suncal.almanac import almanac_events
+from suncal.dates import DateSelection
+from suncal.ephemeris import split_by_kernel
+from suncal.models.astro import CALC
+from suncal.models.astro import Event
+from suncal.models.astro import Location
+from suncal.models.astro import MagicHour
+from suncal.models.astro import MoonPhase
+from suncal.models.astro import RiseSet
+from suncal.models.calendar import CalendarEvent
+from suncal.progress import Progress
+from suncal.utils import iter_date_range
+
+
+def iter_celestial_events(
+    event: str,
+    from_date: dt.date,
+    to_date: dt.date,
+    location: Location,
+    dates: DateSelection | None = None,
+    precision: str | None = None,
+    progress: Progress | None = None,
+) -> Iterator[RiseSet | MoonPhase | MagicHour]:
+    """
+    Lazily calculate event times for any of the events of type suncal.models.astro.Event between [from_date] and
+    [to_date]. Dates on which the event does not exist are skipped. The range is processed in chunks that can each be
+    calculated with a single ephemeris kernel. If a selection of [dates] is provided, only the selected dates are
+    calculated. The event times are calculated with the given [precision] (see suncal.models.astro.find_discrete).
+    The calculated days and the days without the event are counted in [progress]. Events that are contained in an
+    almanac file (see suncal.almanac) are read from it instead of being calculated.
+    """
+    lookup = almanac_events(event, location, from_date, to_date, precision)
+    for chunk_from, chunk_to, _ in split_by_kernel(from_date, to_date):
+        for date in (
+            iter_date_range(chunk_from, chunk_to)
+            if dates is None
+            else dates.iter_dates(chunk_from, chunk_to, start=from_date)
+        ):
+            celestial_event = (
+                lookup(date)
+                if lookup is not None
+                else CALC[event](date, location, precision)
+            )
+            if progress is not None:
+                progress.add_days(1, 1 if celestial_event else 0)
+                # moon phases only exist on a few days per month
+                if not celestial_event and event != Event.MOONPHASE.value:
+                    progress.no_event(event, date)
+            if celestial_event:
+                yield celestial_event
+
+
+def iter_calendar_events(
+    event: str,
+    from_date: dt.date,
+    to_date: dt.date,
+    location: Location,
+    dates: DateSelection | None = None,
+    precision: str | None = None,
+    progress: Progress | None = None,
+) -> Iterator[CalendarEvent]:
+    """
+    Lazily export the celestial events between [from_date] and [to_date] (only the selected [dates], if provided) to
+    CalendarEvents. Events are only calculated when the consumer (sink) asks for them, so memory does not grow with
+    the length of the range.
+    """
+    for celestial_event in iter_celestial_events(
+        event, from_date, to_date, location, dates, precision, progress
+    ):
+        yield CalendarEvent.from_celestial_event(celestial_event)
+
+
+def create_calendar_events(
+    event: str,
+    from_date: dt.date,
+    to_date: dt.date,
+    location: Location,
+    dates: DateSelection | None = None,
+    precision: str | None = None,
+) -> list[CalendarEvent]:
+    """
+    Calculate event times for any of the events of type suncal.models.astro.Event between [from_date] and [to_date]
+    (only the selected [dates], if provided) with the given [precision]. If the events exist, export them to a
+    CalendarEvent and append them to the list of calendar events.
+    """
+    return list(
+        iter_calendar_events(
+            event, from_date, to_date, location, dates, precision
+        )
+    )
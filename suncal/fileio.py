@@ -1,25 +1,55 @@
+import csv
 import datetime as dt
+import gzip
+import itertools
+import json
+import os
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
 
-from suncal.models.googlecal import GoogleCalEvent
-from suncal.models.icalendar import create_ics_content
+from suncal.models.astro import Location
+from suncal.models.calendar import CalendarEvent
+from suncal.models.icalendar import iter_ics_content
+from suncal.models.records import RECORD_FIELDS
+from suncal.models.records import EventRecord
+from suncal.utils import iter_batches
 
 
-def list_to_file(lines: list[str], filename: str) -> None:
-    with open(filename, 'a') as f:
-        f.writelines([line + '\n' for line in lines])
+def list_to_file(
+    lines: Iterable[str], filename: str, overwrite: bool = False
+) -> None:
+    """
+    Append [lines] to [filename] (replace its content if [overwrite]). Lines are written as they come, so [lines] may be
+    a generator.
+    """
+    with open(filename, 'w' if overwrite else 'a') as f:
+        f.writelines(line + '\n' for line in lines)
+
+
+def export_filename(
+    event_name: str, local_time_now: dt.datetime, extension: str
+) -> str:
+    return f"{event_name.title()}_{local_time_now.strftime('%Y%m%d_%H%M%S')}.{extension}"
 
 
 def ics_filename(event_name: str, local_time_now: dt.datetime) -> str:
-    return (
-        f"{event_name.title()}_{local_time_now.strftime('%Y%m%d_%H%M%S')}.ics"
-    )
+    return export_filename(event_name, local_time_now, 'ics')
 
 
 def export_events_to_ics(
-    events: list[GoogleCalEvent],
+    events: Iterable[CalendarEvent],
     event_name: str,
     filename: str | None,
+    overwrite: bool = False,
 ) -> None:
+    """
+    Write [events] to the ics file [filename] (default: ics_filename). An existing file is appended to, unless
+    [overwrite] is set.
+    """
     filename = filename or ics_filename(
         event_name=event_name,
         local_time_now=dt.datetime.now(),
@@ -27,9 +57,238 @@ def export_events_to_ics(
     # check that filename provided by user has .ics ending, if not, add it
     if not filename.endswith('.ics'):
         filename += '.ics'
-    # create ics content as list of strings
-    ics_content = create_ics_content(events)
+    # create ics content lazily, events are only rendered when they are written
+    ics_content = iter_ics_content(events)
     print(f"Exporting events to {filename} ...")
     # write to file
-    list_to_file(ics_content, filename)
+    list_to_file(ics_content, filename, overwrite=overwrite)
+    print("... Done.")
+
+
+def event_year(event: CalendarEvent) -> int:
+    """Local year in which the calendar [event] starts."""
+    return event.date.year
+
+
+def location_key(location: Location) -> str:
+    """Name of the shard with all events of [location]."""
+    return f"{location.latitude:.4f}_{location.longitude:.4f}"
+
+
+def export_marker(event_name: str, location: Location) -> str:
+    """
+    Marker of the events of [event_name] at [location], e.g. "sunrise_52.5200_13.4100", in Google calendars and
+    maintained ics files. Events of other locations in the same calendar have other markers, so replacing the events
+    of one location never deletes those of another.
+    """
+    return f"{event_name}_{location_key(location)}"
+
+
+def iter_year_shards(
+    events: Iterable[CalendarEvent],
+) -> Iterator[tuple[str, list[CalendarEvent]]]:
+    """
+    Lazily group chronologically ordered [events] into shards (year, events of that year). Only the events of one
+    year are held in memory at a time.
+    """
+    for year, shard in itertools.groupby(events, key=event_year):
+        yield str(year), list(shard)
+
+
+def write_ics_shard(
+    events: Iterable[CalendarEvent], filename: str, compress: bool
+) -> int:
+    """
+    Render [events] to a complete ics file [filename] (gzip-compressed if [compress]). The events are written as they
+    come, so [events] may be a generator. Return the number of events.
+    """
+    n_events = 0
+
+    def counted() -> Iterator[CalendarEvent]:
+        nonlocal n_events
+        for event in events:
+            n_events += 1
+            yield event
+
+    opener = gzip.open if compress else open
+    with opener(filename, 'wt') as f:  # type: ignore
+        f.writelines(line + '\n' for line in iter_ics_content(counted()))
+    return n_events
+
+
+def export_events_to_ics_shards(
+    shards: Iterable[tuple[str, Iterable[CalendarEvent]]],
+    event_name: str,
+    directory: str,
+    workers: int = 1,
+    compress: bool = False,
+    write_index: bool = False,
+) -> list[str]:
+    """
+    Write one ics file per shard (shard name, events of the shard) to [directory], e.g. one file per year
+    (iter_year_shards) or per location. With [workers] > 1, shards are rendered and written by a pool of processes
+    while the next shards are still being calculated (the events of a shard are then collected to be sent to a
+    worker, without workers they are streamed into the file). Optionally, all files are gzip-compressed and an
+    index.json with the name, file and number of events of every shard is written. Return the names of the written
+    files.
+    """
+    os.makedirs(directory, exist_ok=True)
+    extension = '.ics.gz' if compress else '.ics'
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    # limit the number of shards that wait for a worker, so that memory stays bounded
+    pending: deque[tuple[str, str, Future]] = deque()
+    index: list[dict[str, str | int]] = []
+
+    def collect(shard_name: str, filename: str, n_events: int) -> None:
+        index.append(
+            {
+                'shard': shard_name,
+                'filename': os.path.basename(filename),
+                'events': n_events,
+            }
+        )
+
+    print(f"Exporting events to {directory} ...")
+    try:
+        for shard_name, events in shards:
+            filename = os.path.join(
+                directory, f"{event_name.title()}_{shard_name}{extension}"
+            )
+            if executor is None:
+                collect(
+                    shard_name,
+                    filename,
+                    write_ics_shard(events, filename, compress),
+                )
+                continue
+
+            pending.append(
+                (
+                    shard_name,
+                    filename,
+                    executor.submit(
+                        write_ics_shard, list(events), filename, compress
+                    ),
+                )
+            )
+            while len(pending) > 2 * workers:
+                shard_name, filename, future = pending.popleft()
+                collect(shard_name, filename, future.result())
+
+        while pending:
+            shard_name, filename, future = pending.popleft()
+            collect(shard_name, filename, future.result())
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if write_index:
+        with open(os.path.join(directory, 'index.json'), 'w') as f:
+            json.dump(index, f, indent=2)
+    print("... Done.")
+
+    return [os.path.join(directory, str(entry['filename'])) for entry in index]
+
+
+def write_ndjson(records: Iterable[EventRecord], filename: str) -> int:
+    """Write one json object per line and record. Return the number of written records."""
+    n_records = 0
+    with open(filename, 'w') as f:
+        for record in records:
+            f.write(record.model_dump_json() + '\n')
+            n_records += 1
+    return n_records
+
+
+def write_csv(records: Iterable[EventRecord], filename: str) -> int:
+    """Write records as csv with a header line. Return the number of written records."""
+    n_records = 0
+    with open(filename, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record.row())
+            n_records += 1
+    return n_records
+
+
+def write_parquet(
+    records: Iterable[EventRecord], filename: str, row_group_size: int = 65536
+) -> int:
+    """
+    Write records to a parquet file, one row group of max [row_group_size] records at a time. UTC times are stored as
+    timestamps, local times as ISO 8601 strings (parquet does not support a timezone per row). Return the number of
+    written records.
+    """
+    # optional dependency, imported on use because it is slow to import
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "The parquet export requires the optional dependency pyarrow. Install suncal with the 'parquet' extra."
+        ) from e
+
+    schema = pa.schema(
+        [
+            ('kind', pa.dictionary(pa.int8(), pa.string())),
+            ('start_utc', pa.timestamp('us', tz='UTC')),
+            ('start_local', pa.string()),
+            ('end_utc', pa.timestamp('us', tz='UTC')),
+            ('end_local', pa.string()),
+            ('timezone', pa.string()),
+            ('latitude', pa.float64()),
+            ('longitude', pa.float64()),
+            ('phase_idx', pa.int8()),
+        ]
+    )
+
+    n_records = 0
+    with pq.ParquetWriter(filename, schema) as writer:
+        for batch in iter_batches(records, batch_size=row_group_size):
+            columns: dict[str, list] = {field: [] for field in RECORD_FIELDS}
+            for record in batch:
+                # parquet stores the UTC times as timestamps instead of strings
+                row = {
+                    **record.row(),
+                    'start_utc': record.start_utc,
+                    'end_utc': record.end_utc,
+                }
+                for field in RECORD_FIELDS:
+                    columns[field].append(row[field])
+            writer.write_table(
+                pa.Table.from_pydict(columns, schema=schema),
+                row_group_size=row_group_size,
+            )
+            n_records += len(batch)
+    return n_records
+
+
+RECORD_WRITERS: dict[str, Callable[[Iterable[EventRecord], str], int]] = {
+    'ndjson': write_ndjson,
+    'csv': write_csv,
+    'parquet': write_parquet,
+}
+
+
+def export_records(
+    records: Iterable[EventRecord],
+    event_name: str,
+    filename: str | None,
+    file_format: str,
+) -> None:
+    """
+    Stream [records] into a file of [file_format] (any of the keys in RECORD_WRITERS). An existing file with the
+    same name is overwritten.
+    """
+    filename = filename or export_filename(
+        event_name=event_name,
+        local_time_now=dt.datetime.now(),
+        extension=file_format,
+    )
+    # check that filename provided by user has the right ending, if not, add it
+    if not filename.endswith(f'.{file_format}'):
+        filename += f'.{file_format}'
+    print(f"Exporting events to {filename} ...")
+    RECORD_WRITERS[file_format](records, filename)
     print("... Done.")
@@ -0,0 +1,490 @@
+"""
+Declarative jobs: many combinations of events, locations, date ranges and sinks in one job file (json or yaml). The
+job is turned into a plan in which overlapping calculations are merged, the merged calculations are run by a pool of
+worker processes and their results are fanned out to all sinks that need them.
+"""
+
+import contextlib
+import datetime as dt
+import json
+from collections import defaultdict
+from typing import Iterator
+
+from google.oauth2.credentials import Credentials
+from pydantic import BaseModel  # pylint: disable=E0611
+from pydantic import ConfigDict
+from pydantic import Field
+from pydantic import field_validator
+from pydantic import model_validator
+from typing_extensions import Self
+
+from suncal.auth import SCOPES
+from suncal.auth import get_credentials
+from suncal.batch import location_of
+from suncal.ephemeris import split_by_kernel
+from suncal.fileio import RECORD_WRITERS
+from suncal.fileio import export_events_to_ics
+from suncal.fileio import export_records
+from suncal.fileio import location_key
+from suncal.models.astro import CALENDAR_PRECISION
+from suncal.models.astro import EVENT_KINDS
+from suncal.models.astro import PRECISIONS
+from suncal.models.astro import Event
+from suncal.models.astro import EventTable
+from suncal.models.astro import Location
+from suncal.models.astro import calculate_events
+from suncal.models.calendar import CalendarEvent
+from suncal.models.googlecal import get_sun_calendar_id
+from suncal.models.googlecal import replace_in_google_calendar
+from suncal.models.records import EventRecord
+from suncal.pool import WarmPool
+from suncal.progress import ConsoleReporter
+from suncal.progress import Progress
+from suncal.ratelimit import DEFAULT_USER_RATE
+from suncal.ratelimit import MAX_ATTEMPTS
+from suncal.ratelimit import QUOTA_STATE_FILE
+from suncal.ratelimit import RateLimiter
+
+try:
+    import yaml
+except ImportError:  # optional dependency, only needed for yaml job files
+    yaml = None  # type: ignore
+
+SINK_TYPES = ['ics', 'api', *RECORD_WRITERS]
+
+
+# job file -------------------------------------------------------------------------------------------------------------
+class JobLocation(BaseModel):
+    """Location of a job. If no [timezone] is provided, it is determined from the coordinates."""
+
+    latitude: float
+    longitude: float
+    timezone: str | None = None
+
+
+class JobSink(BaseModel):
+    """
+    Destination of the events of a task: an ics file ("ics"), a Google calendar ("api") or a file in one of the bulk
+    export formats ("ndjson", "csv", "parquet"). [filename] may contain the placeholders {event} and {location} (see
+    suncal.fileio.location_key), the file extension is added if it is missing.
+    """
+
+    type: str
+    filename: str = '{event}_{location}'
+    calendar: str | None = None  # title of the Google calendar (api)
+    replace: bool = False  # api only, see suncal api --replace
+    resume: bool = False  # api only, see suncal api --resume
+
+    @model_validator(mode='after')
+    def sink_valid(self) -> Self:
+        if self.type not in SINK_TYPES:
+            raise ValueError(
+                f"Unknown sink type {self.type!r}, choose one of {SINK_TYPES}."
+            )
+        if self.type == 'api' and not self.calendar:
+            raise ValueError("Sinks of type 'api' require a calendar title.")
+        return self
+
+
+class JobTask(BaseModel):
+    """All [events] for all [locations] from [from_date] to [to_date], written to each of the [sinks]."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    events: list[str]
+    locations: list[JobLocation]
+    from_date: dt.date = Field(alias='from')
+    to_date: dt.date = Field(alias='to')
+    sinks: list[JobSink]
+
+    @field_validator('events', mode='after')
+    @classmethod
+    def events_valid(cls, events: list[str]) -> list[str]:
+        for event in events:
+            if event not in EVENT_KINDS:
+                raise ValueError(
+                    f"Unknown event {event!r}, choose any of {EVENT_KINDS}."
+                )
+        return events
+
+    @model_validator(mode='after')
+    def dates_valid(self) -> Self:
+        if self.to_date < self.from_date:
+            raise ValueError("to must be >= from.")
+        return self
+
+
+class Job(BaseModel):
+    """
+    Job file of suncal run. [workers] processes calculate the events, all Google Calendar requests of the job share
+    one rate limiter ([user_rate], [project_rate], [quota_state], [max_attempts], see suncal api). The event times
+    are calculated with [precision] (see suncal.models.astro.PRECISIONS), by default with minute precision if all
+    sinks of a computation are calendars and exactly otherwise.
+    """
+
+    tasks: list[JobTask]
+    workers: int = Field(default=1, ge=1)
+    user_rate: float = Field(default=DEFAULT_USER_RATE, gt=0)
+    project_rate: float | None = Field(default=None, gt=0)
+    quota_state: str = QUOTA_STATE_FILE
+    max_attempts: int = Field(default=MAX_ATTEMPTS, ge=1)
+    precision: str | None = None
+
+    @field_validator('precision', mode='after')
+    @classmethod
+    def precision_valid(cls, precision: str | None) -> str | None:
+        if precision is not None and precision not in PRECISIONS:
+            raise ValueError(
+                f"Unknown precision {precision!r}, choose any of {list(PRECISIONS)}."
+            )
+        return precision
+
+
+def load_job(filename: str) -> Job:
+    """Read a job from a json or yaml file (by file extension)."""
+    with open(filename) as f:
+        if filename.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ImportError(
+                    "Job files in yaml format require the optional dependency PyYAML. Install suncal with the "
+                    "'yaml' extra or use a json file."
+                )
+            content = yaml.safe_load(f)
+        else:
+            content = json.load(f)
+    return Job.model_validate(content)
+
+
+# plan -----------------------------------------------------------------------------------------------------------------
+class Computation(BaseModel):
+    """
+    One batched calculation of a plan: all [events] at [location] on every date from [from_date] to [to_date] with
+    the given [precision].
+    """
+
+    location: Location
+    events: list[str]
+    from_date: dt.date
+    to_date: dt.date
+    precision: str | None = None
+
+
+class Output(BaseModel):
+    """
+    Events of kind [event] at [location] from [from_date] to [to_date] that are written to [sink]. They are taken from
+    the result of the computation with index [computation_idx].
+    """
+
+    event: str
+    location: Location
+    from_date: dt.date
+    to_date: dt.date
+    sink: JobSink
+    computation_idx: int
+
+    def filename(self) -> str:
+        return self.sink.filename.format(
+            event=self.event, location=location_key(self.location)
+        )
+
+
+class Plan(BaseModel):
+    computations: list[Computation]
+    outputs: list[Output]
+    # calculations and event-days without merging (one calculation per task, location and event)
+    requested: int = 0
+    requested_days: int = 0
+
+    def summary(self) -> str:
+        days = sum(
+            len(c.events) * ((c.to_date - c.from_date).days + 1)
+            for c in self.computations
+        )
+        return (
+            f"{len(self.outputs)} outputs from {len(self.computations)} computations ({days} event-days) instead "
+            f"of {self.requested} calculations ({self.requested_days} event-days)"
+        )
+
+
+def computation_key(event: str, location: Location) -> tuple:
+    """
+    Calculations with the same key can be merged. Moon phases only depend on the timezone (which determines the
+    local date of a phase), all other events on the exact location.
+    """
+    if event == Event.MOONPHASE.value:
+        return (location.timezone,)
+    return (location.timezone, location.latitude, location.longitude)
+
+
+def build_plan(job: Job) -> Plan:
+    """
+    Plan the calculations of [job]: requested date ranges of the same event and computation_key that overlap or touch
+    are merged, events with the same merged range are calculated together in one computation (so they share their
+    searches, but no event is calculated on dates on which it was not requested). Every combination of task,
+    location, event and sink becomes one output of the plan. Raise ValueError if several outputs would be written to
+    the same file.
+    """
+    requested: dict[tuple, list[tuple[dt.date, dt.date, str]]] = defaultdict(
+        list
+    )
+    locations: dict[tuple, Location] = {}
+    pending: list[tuple[tuple, Output]] = []
+    for task in job.tasks:
+        for job_location in task.locations:
+            location = location_of(
+                job_location.latitude,
+                job_location.longitude,
+                job_location.timezone,
+            )
+            for event in task.events:
+                key = computation_key(event, location)
+                locations.setdefault(key, location)
+                requested[key].append((task.from_date, task.to_date, event))
+                for sink in task.sinks:
+                    pending.append(
+                        (
+                            key,
+                            Output(
+                                event=event,
+                                location=location,
+                                from_date=task.from_date,
+                                to_date=task.to_date,
+                                sink=sink,
+                                computation_idx=-1,
+                            ),
+                        )
+                    )
+
+    computations: list[Computation] = []
+    computations_of_key: dict[tuple, list[int]] = {}
+    for key, ranges in requested.items():
+        ranges_of_event: dict[str, list[tuple[dt.date, dt.date]]] = defaultdict(
+            list
+        )
+        for from_date, to_date, event in sorted(ranges):
+            merged = ranges_of_event[event]
+            if merged and from_date <= merged[-1][1] + dt.timedelta(days=1):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], to_date))
+            else:
+                merged.append((from_date, to_date))
+        events_of_range: dict[tuple[dt.date, dt.date], list[str]] = defaultdict(
+            list
+        )
+        for event, merged in ranges_of_event.items():
+            for date_range in merged:
+                events_of_range[date_range].append(event)
+
+        computations_of_key[key] = []
+        for (from_date, to_date), events in sorted(events_of_range.items()):
+            # fail early if the range is not covered by any ephemeris
+            split_by_kernel(from_date, to_date)
+            computations_of_key[key].append(len(computations))
+            computations.append(
+                Computation(
+                    location=locations[key],
+                    events=sorted(events, key=EVENT_KINDS.index),
+                    from_date=from_date,
+                    to_date=to_date,
+                )
+            )
+
+    outputs = []
+    for key, output in pending:
+        output.computation_idx = next(
+            idx
+            for idx in computations_of_key[key]
+            if output.event in computations[idx].events
+            and computations[idx].from_date
+            <= output.from_date
+            <= computations[idx].to_date
+        )
+        outputs.append(output)
+
+    for idx, computation in enumerate(computations):
+        computation.precision = job.precision or (
+            'exact'
+            if any(
+                output.sink.type in RECORD_WRITERS
+                for output in outputs
+                if output.computation_idx == idx
+            )
+            else CALENDAR_PRECISION
+        )
+
+    files = [
+        (output.sink.type, output.filename())
+        for output in outputs
+        if output.sink.type != 'api'
+    ]
+    duplicates = {file for file in files if files.count(file) > 1}
+    if duplicates:
+        raise ValueError(
+            f"Several outputs would be written to the same files {sorted(duplicates)}. Use the placeholders "
+            f"{{event}} and {{location}} in the file names."
+        )
+
+    return Plan(
+        computations=computations,
+        outputs=outputs,
+        requested=sum(len(ranges) for ranges in requested.values()),
+        requested_days=sum(
+            (to_date - from_date).days + 1
+            for ranges in requested.values()
+            for from_date, to_date, _ in ranges
+        ),
+    )
+
+
+# execution ------------------------------------------------------------------------------------------------------------
+def run_computation(computation: Computation) -> EventTable:
+    return calculate_events(
+        computation.events,
+        computation.from_date,
+        computation.to_date,
+        computation.location,
+        precision=computation.precision,
+    )
+
+
+def plan_pool(
+    plan: Plan, workers: int
+) -> contextlib.AbstractContextManager[WarmPool | None]:
+    """
+    WarmPool for the computations of [plan] that shares the ephemeris between the [workers], or None if the
+    computations are run in this process (one worker or one computation). Use as context manager.
+    """
+    if workers == 1 or len(plan.computations) <= 1:
+        return contextlib.nullcontext()
+    return WarmPool(
+        min(workers, len(plan.computations)),
+        from_date=min(c.from_date for c in plan.computations),
+        to_date=max(c.to_date for c in plan.computations),
+    )
+
+
+def iter_results(
+    plan: Plan, pool: WarmPool | None
+) -> Iterator[tuple[int, EventTable]]:
+    """
+    Run the computations of [plan] in [pool] (in this process if None, see plan_pool) and yield (index, result) in
+    plan order. The pool belongs to the caller, so it is closed by the caller even if the results are not consumed.
+    """
+    if pool is None:
+        for idx, computation in enumerate(plan.computations):
+            yield idx, run_computation(computation)
+        return
+    yield from enumerate(pool.map(run_computation, plan.computations))
+
+
+def write_output(
+    output: Output,
+    table: EventTable,
+    limiter: RateLimiter,
+    credentials: Credentials | None,
+    progress: Progress | None = None,
+) -> None:
+    """
+    Write the events of [output] from the [table] of its computation to the sink of [output]. Uploaded events are
+    counted in [progress].
+    """
+    selection = table.select(
+        event=output.event,
+        from_date=output.from_date,
+        to_date=output.to_date,
+    )
+    if len(selection) == 0:
+        print(
+            f"*** {output.event.title()} could not be calculated for {location_key(output.location)} on any of the "
+            f"provided dates. No calendar events created. ***"
+        )
+        # with replace, the old events of the range are deleted even if there are no new ones
+        if not (output.sink.type == 'api' and output.sink.replace):
+            return
+
+    celestial_events = selection.celestial_events()
+    sink = output.sink
+    if sink.type in RECORD_WRITERS:
+        export_records(
+            (
+                EventRecord.from_celestial_event(
+                    output.event, c_event, output.location
+                )
+                for c_event in celestial_events
+            ),
+            output.event,
+            output.filename(),
+            sink.type,
+        )
+        return
+
+    events = (
+        CalendarEvent.from_celestial_event(c_event)
+        for c_event in celestial_events
+    )
+    if sink.type == 'ics':
+        # the file is written from scratch, so that running a job again does not append a second calendar
+        export_events_to_ics(
+            events, output.event, output.filename(), overwrite=True
+        )
+        return
+
+    if sink.calendar is None:
+        raise ValueError("Sinks of type 'api' require a calendar title.")
+    if credentials is None:
+        raise ValueError(
+            "Outputs to Google Calendar require credentials, see run_plan."
+        )
+    google_calendar_id = get_sun_calendar_id(
+        sink.calendar, output.location.timezone, credentials
+    )
+    replace_in_google_calendar(
+        google_calendar_id,
+        output.event,
+        events,
+        output.from_date,
+        output.to_date,
+        output.location,
+        credentials,
+        replace=sink.replace,
+        limiter=limiter,
+        resume=sink.resume,
+        progress=progress,
+    )
+
+
+def run_plan(job: Job, plan: Plan) -> None:
+    """
+    Run [plan] of [job]. The outputs of a computation are written as soon as it is finished, results are released
+    afterwards. The progress is shown on the terminal.
+    """
+    limiter = RateLimiter(
+        user_rate=job.user_rate,
+        project_rate=job.project_rate,
+        state_file=job.quota_state,
+        max_attempts=job.max_attempts,
+    )
+    credentials = (
+        get_credentials(SCOPES)
+        if any(output.sink.type == 'api' for output in plan.outputs)
+        else None
+    )
+    outputs_of_computation: dict[int, list[Output]] = defaultdict(list)
+    for output in plan.outputs:
+        outputs_of_computation[output.computation_idx].append(output)
+
+    progress = Progress(
+        total_days=sum(
+            (c.to_date - c.from_date).days + 1 for c in plan.computations
+        ),
+        callback=ConsoleReporter(),
+    )
+    with plan_pool(plan, job.workers) as pool:
+        for idx, table in iter_results(plan, pool):
+            computation = plan.computations[idx]
+            progress.add_days(
+                (computation.to_date - computation.from_date).days + 1,
+                len(table),
+            )
+            for output in outputs_of_computation.pop(idx, []):
+                write_output(output, table, limiter, credentials, progress)
+    progress.finish()
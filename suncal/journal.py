@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+from typing import TextIO
+
+from suncal.auth import TOKEN_FILE
+
+# directory with one journal per Google calendar and event name (next to token.json)
+JOURNAL_DIRECTORY = os.path.join(os.path.dirname(TOKEN_FILE), "journals")
+
+
+class Journal:
+    """
+    Append-only journal of an export: one json line per event that Google confirmed as inserted, with its stable key
+    (see CalendarEvent.key) and the id Google assigned to it, and one line per completed deletion of old events (see
+    replace_in_google_calendar) with its scope. Every line is flushed as soon as it is written, so the journal
+    survives crashes and lost connections; a resumed export skips all keys and deletions that are already in the
+    journal.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.file: TextIO | None = None
+
+    @staticmethod
+    def for_export(
+        google_calendar_id: str,
+        marker: str,
+        directory: str | None = None,
+    ) -> 'Journal':
+        """
+        Journal of the export of the events with [marker] (event and location, see googlecal.export_marker) to the
+        Google calendar [google_calendar_id] in [directory] (default: JOURNAL_DIRECTORY).
+        """
+        calendar_hash = hashlib.sha256(google_calendar_id.encode()).hexdigest()
+        return Journal(
+            os.path.join(
+                directory or JOURNAL_DIRECTORY,
+                f"{calendar_hash[:16]}_{marker}.ndjson",
+            )
+        )
+
+    def entries(self, field: str) -> set[str]:
+        """
+        Values of [field] of all lines that have it. A partially written last line (crash while writing) is ignored.
+        """
+        if not os.path.exists(self.filename):
+            return set()
+        values = set()
+        with open(self.filename) as f:
+            for line in f:
+                try:
+                    values.add(json.loads(line)[field])
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return values
+
+    def confirmed_keys(self) -> set[str]:
+        """Keys of all events in the journal."""
+        return self.entries('key')
+
+    def deleted(self, scope: str) -> bool:
+        """Whether the deletion of [scope] was completed by this export (see record_deleted)."""
+        return scope in self.entries('deleted')
+
+    def start(self, resume: bool) -> set[str]:
+        """
+        Open the journal for writing. Unless the export is resumed ([resume]), the journal of previous exports is
+        discarded. Return the keys that are already confirmed. A journal that is already open (e.g. by a replace that
+        deletes old events before it exports) stays as it is.
+        """
+        if self.file is not None:
+            return self.confirmed_keys()
+        confirmed = self.confirmed_keys() if resume else set()
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        self.file = open(self.filename, 'a' if resume else 'w')
+        if resume and self.file.tell() > 0:
+            # terminate a partially written last line
+            with open(self.filename, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self.file.write('\n')
+        return confirmed
+
+    def record(self, key: str, event_id: str) -> None:
+        """Append the confirmed insert of the event with [key] and Google id [event_id]."""
+        assert self.file is not None, "Journal has to be started first."
+        self.file.write(json.dumps({'key': key, 'id': event_id}) + '\n')
+        self.file.flush()
+
+    def record_deleted(self, scope: str) -> None:
+        """Append the completed deletion of the old events of [scope]."""
+        assert self.file is not None, "Journal has to be started first."
+        self.file.write(json.dumps({'deleted': scope}) + '\n')
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
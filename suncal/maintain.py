@@ -0,0 +1,221 @@
+"""
+Rolling-window maintenance of calendars (suncal maintain): a local state file keeps a watermark per calendar, i.e. the
+range of dates the calendar covers, so that every run only calculates and pushes the days that entered the window
+since the last run and optionally prunes the days that fell out of it.
+"""
+
+import datetime as dt
+import json
+import os
+from typing import Iterable
+
+from pydantic import BaseModel  # pylint: disable=E0611
+
+from suncal.fileio import location_key
+from suncal.models.astro import Location
+from suncal.models.calendar import CalendarEvent
+from suncal.models.icalendar import MARKER_PROPERTY
+from suncal.models.icalendar import iter_ics_content
+from suncal.utils import aware_datetime_to_ical_date_with_utc_time
+from suncal.utils import time_range_of_date
+
+MAINTAIN_STATE_FILE = "maintain.json"
+
+# default size of the window: today + 365 days
+DEFAULT_WINDOW_DAYS = 366
+
+
+class Watermark(BaseModel):
+    """A maintained calendar contains the events from [from_date] up to and including [to_date]."""
+
+    from_date: dt.date
+    to_date: dt.date
+
+
+class Maintenance(BaseModel):
+    """
+    Work of one maintenance run: calculate and push the events from [new_from] to [new_to] and delete the events from
+    [prune_from] to [prune_to] (both optional). [fresh] runs start the calendar from scratch because there was no
+    watermark or it does not connect to the window. Afterwards the calendar covers [watermark].
+    """
+
+    new_from: dt.date | None = None
+    new_to: dt.date | None = None
+    prune_from: dt.date | None = None
+    prune_to: dt.date | None = None
+    fresh: bool = False
+    watermark: Watermark
+
+    def summary(self) -> str:
+        if self.new_from is None and self.prune_from is None:
+            return "Calendar is up to date."
+        parts = []
+        if self.new_from is not None:
+            parts.append(f"adding {self.new_from} to {self.new_to}")
+        if self.prune_from is not None:
+            parts.append(f"pruning {self.prune_from} to {self.prune_to}")
+        return f"{', '.join(parts).capitalize()}."
+
+
+def watermark_key(
+    sink: str, target: str, event_name: str, location: Location
+) -> str:
+    """
+    Key of the watermark of the [event_name] events at [location] in the [target] (ics file or Google calendar id)
+    of [sink]. Every event and location has its own watermark, even if they share the target.
+    """
+    return f"{sink}:{target}:{event_name}:{location_key(location)}"
+
+
+def load_watermarks(state_file: str) -> dict[str, Watermark]:
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file) as f:
+        return {
+            key: Watermark.model_validate(value)
+            for key, value in json.load(f).items()
+        }
+
+
+def save_watermark(state_file: str, key: str, watermark: Watermark) -> None:
+    """Store [watermark] of calendar [key] in [state_file] (replaced atomically, other calendars are kept)."""
+    watermarks = load_watermarks(state_file)
+    watermarks[key] = watermark
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(
+            {
+                key: value.model_dump(mode='json')
+                for key, value in watermarks.items()
+            },
+            f,
+            indent=2,
+        )
+    os.replace(tmp_file, state_file)
+
+
+def plan_maintenance(
+    watermark: Watermark | None, today: dt.date, days: int, prune: bool
+) -> Maintenance:
+    """
+    Compare the [watermark] of a calendar with the window of [days] days that starts [today]. Only days after the
+    watermark are new. With [prune], days before the window are deleted.
+    """
+    window_from, window_to = today, today + dt.timedelta(days=days - 1)
+
+    if (
+        watermark is None
+        or watermark.from_date > window_from
+        or watermark.to_date < window_from - dt.timedelta(days=1)
+    ):
+        maintenance = Maintenance(
+            new_from=window_from,
+            new_to=window_to,
+            fresh=True,
+            watermark=Watermark(from_date=window_from, to_date=window_to),
+        )
+        if prune and watermark is not None:
+            maintenance.prune_from = watermark.from_date
+            maintenance.prune_to = watermark.to_date
+        return maintenance
+
+    maintenance = Maintenance(
+        watermark=Watermark(
+            from_date=watermark.from_date,
+            to_date=max(watermark.to_date, window_to),
+        )
+    )
+    if watermark.to_date < window_to:
+        maintenance.new_from = watermark.to_date + dt.timedelta(days=1)
+        maintenance.new_to = window_to
+    if prune and watermark.from_date < window_from:
+        maintenance.prune_from = watermark.from_date
+        maintenance.prune_to = window_from - dt.timedelta(days=1)
+        maintenance.watermark.from_date = window_from
+    return maintenance
+
+
+def ics_event_start(vevent: list[str]) -> str:
+    """DTSTART of the ics lines of one VEVENT: UTC time (e.g. 20250101T071708Z) or date (e.g. 20250101)."""
+    line = next(line for line in vevent if line.startswith('DTSTART'))
+    return line.rsplit(':', 1)[1]
+
+
+def ics_event_marker(vevent: list[str]) -> str | None:
+    """Marker of the ics lines of one VEVENT (see MARKER_PROPERTY), None if it has none."""
+    prefix = MARKER_PROPERTY + ':'
+    return next(
+        (line[len(prefix) :] for line in vevent if line.startswith(prefix)),
+        None,
+    )
+
+
+def update_ics_file(
+    filename: str,
+    events: Iterable[CalendarEvent],
+    prune_before: dt.date | None,
+    timezone: str,
+    marker: str,
+    replace: bool = False,
+) -> tuple[int, int]:
+    """
+    Append [events] to the ics file [filename] (created by suncal, or a new one) marked with [marker] and, if
+    [prune_before] is provided, remove the events with this marker that start before this local date in [timezone].
+    With [replace], all events with this marker are removed. The events of other markers are kept, events without a
+    marker (written before markers were added) are treated like events with this marker. The file is replaced
+    atomically. Return the number of added and removed events.
+    """
+    utc_threshold = (
+        aware_datetime_to_ical_date_with_utc_time(
+            time_range_of_date(prune_before, timezone)[0]
+        )
+        if prune_before
+        else ''
+    )
+    date_threshold = prune_before.strftime('%Y%m%d') if prune_before else ''
+
+    def keep(vevent: list[str]) -> bool:
+        if ics_event_marker(vevent) not in (marker, None):
+            return True
+        if replace:
+            return False
+        start = ics_event_start(vevent)
+        return start >= (utc_threshold if 'T' in start else date_threshold)
+
+    if os.path.exists(filename):
+        with open(filename) as f:
+            lines = f.read().splitlines()
+    else:
+        lines = list(iter_ics_content([]))
+
+    tmp_file = filename + '.tmp'
+    n_added, n_pruned = 0, 0
+    with open(tmp_file, 'w') as f:
+        vevent: list[str] = []
+        for line in lines:
+            if line == 'END:VCALENDAR':
+                break
+            if vevent or line == 'BEGIN:VEVENT':
+                vevent.append(line)
+                if line == 'END:VEVENT':
+                    if keep(vevent):
+                        f.writelines(l + '\n' for l in vevent)
+                    else:
+                        n_pruned += 1
+                    vevent = []
+                continue
+            # header
+            f.write(line + '\n')
+
+        # new events, without the header and footer of the new calendar
+        in_events = False
+        for line in iter_ics_content(events, marker=marker):
+            if line == 'BEGIN:VEVENT':
+                in_events = True
+                n_added += 1
+            if in_events and line != 'END:VCALENDAR':
+                f.write(line + '\n')
+        f.write('END:VCALENDAR\n')
+    os.replace(tmp_file, filename)
+
+    return n_added, n_pruned
@@ -1,16 +1,54 @@
+from __future__ import annotations
+
 import datetime as dt
 from enum import Enum
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
 
-import pytz
+import numpy as np
 from pydantic import BaseModel  # pylint: disable=E0611
+from pydantic import ConfigDict
 from pydantic import field_validator
 from skyfield import almanac
 from skyfield import api as skyfield_api
-
+from skyfield.jpllib import SpiceKernel
+from skyfield.timelib import Time
+
+from suncal.ephemeris import load_ephemeris
+from suncal.ephemeris import load_kernel
+from suncal.ephemeris import load_timescale
+from suncal.ephemeris import split_by_kernel
+from suncal.utils import day_boundaries
 from suncal.utils import time_range_of_date
+from suncal.utils import times_to_local_datetimes
+from suncal.utils import times_to_utc_datetime64
+from suncal.utils import trusted
+from suncal.utils import utc_to_local_datetimes
+
+if TYPE_CHECKING:
+    # optional dependencies, imported only by EventTable.to_arrow and EventTable.to_pandas (they are slow to import)
+    import pandas as pd
+    import pyarrow as pa
 
 MOON_PHASE_SYMBOLS = ['🌚', '🌓', '🌝', '🌗']
 
+# precisions of the event times in seconds (see find_discrete). "exact" (or no precision) refines the times to the
+# default tolerance of skyfield (1 ms).
+PRECISIONS = {'exact': 0, 'second': 1, 'minute': 60, '5min': 300}
+
+# precision of calendar events: their summaries only show hours and minutes
+CALENDAR_PRECISION = 'minute'
+
+# tolerance of the search if it cannot be narrowed down to a single precision slot (same as skyfield)
+EPSILON = 0.001 / 86400
+
+# max sampling interval (~15 minutes) of the rising and setting functions. The defaults of skyfield (1 to 6 hours) miss
+# short nights (e.g. Blue Hours in summer) or a sun or moon that is only briefly above a horizon at high latitudes.
+MAX_STEP_DAYS = 0.01
+
 
 class Location(BaseModel):
     """
@@ -110,17 +148,98 @@ class MagicHour(BaseModel):
         return color
 
 
+def find_discrete(
+    start_time: Time, end_time: Time, f: Any, precision: str | None = None
+) -> tuple[Time, np.ndarray]:
+    """
+    Same as skyfield.almanac.find_discrete, but the times are only refined to the given [precision] (see PRECISIONS).
+    The refinement samples [f] on the UTC grid of the precision (e.g. full minutes), so the search stops as soon as an
+    event is known to happen within one slot of the grid, and returns the middle of that slot: the time is accurate to
+    half the precision and in the same slot (e.g. minute) as the exact time. Without a [precision] (or "exact"), this
+    is almanac.find_discrete.
+    """
+    assert (
+        precision is None or precision in PRECISIONS
+    ), f"Unknown precision {precision!r}, choose any of {list(PRECISIONS)}."
+    ts = start_time.ts
+    if end_time.tt <= start_time.tt:
+        # dates that do not exist locally (e.g. 2011-12-30 in Samoa, which moved across the date line) have no events
+        return ts.tt_jd(np.array([])), np.array([], dtype=np.int8)
+    seconds = PRECISIONS[precision or 'exact']
+    if not seconds:
+        return almanac.find_discrete(start_time, end_time, f)
+
+    def utc_jd(t: Time) -> float:
+        return t.utc_datetime().timestamp() / 86400 + 2440587.5
+
+    # the search runs on UTC Julian dates: TT only runs ahead of UTC by a constant number of seconds between two leap
+    # seconds
+    u0, u1 = utc_jd(start_time), utc_jd(end_time)
+    offset = start_time.tt - u0
+    if abs(end_time.tt - u1 - offset) > EPSILON:
+        # leap second within the range: the grid would not be aligned with UTC
+        return almanac.find_discrete(start_time, end_time, f)
+
+    def values(u: np.ndarray) -> np.ndarray:
+        return np.asarray(f(ts.tt_jd(u + offset)))
+
+    slot = seconds / 86400
+    u = np.linspace(u0, u1, int((u1 - u0) / f.step_days) + 2)
+    y = values(u)
+    changes = np.flatnonzero(np.diff(y))
+    starts, ends, y_ends = u[changes], u[changes + 1], y[changes + 1]
+
+    found_u, found_y = [], []
+    while True:
+        # index of the first and last slot boundary within each bracket (boundaries that are closer than EPSILON to
+        # the start or end are the start or end)
+        first = np.floor((starts + EPSILON) / slot) + 1
+        last = np.ceil((ends - EPSILON) / slot) - 1
+        done = (last < first) | (ends - starts <= EPSILON)
+        middle = (np.floor((starts[done] + EPSILON) / slot) + 0.5) * slot
+        found_u.append(np.clip(middle, starts[done], ends[done]))
+        found_y.append(y_ends[done])
+
+        starts, ends = starts[~done], ends[~done]
+        first, last = first[~done], last[~done]
+        if not len(starts):
+            break
+        # sample up to 11 boundaries of each bracket, together with its start and end
+        inner = (
+            first[:, None]
+            + np.round(np.linspace(0, 1, 11)[None, :] * (last - first)[:, None])
+        ) * slot
+        grid = np.concatenate([starts[:, None], inner, ends[:, None]], axis=1)
+        y_grid = values(grid.ravel()).reshape(grid.shape)
+        rows, cols = np.nonzero(np.diff(y_grid, axis=1))
+        starts, ends = grid[rows, cols], grid[rows, cols + 1]
+        y_ends = y_grid[rows, cols + 1]
+
+    u_found, y_found = np.concatenate(found_u), np.concatenate(found_y)
+    if y_found.dtype == bool:
+        # like skyfield, so that the values can be used as indices
+        y_found = y_found.astype(np.int8)
+    order = np.argsort(u_found, kind='stable')
+    return ts.tt_jd(u_found[order] + offset), y_found[order]
+
+
 def calculate_rise_set(
-    date: dt.date, location: Location, rise: bool, body: CelestialBody
+    date: dt.date,
+    location: Location,
+    rise: bool,
+    body: CelestialBody,
+    precision: str | None = None,
 ) -> RiseSet | None:
     """
-    Calculate sun/moon rise/set. Only return a RiseSet event if the body rises/sets on the given date.
+    Calculate sun/moon rise/set. Only return a RiseSet event if the body rises/sets on the given date (the days without
+    are summarized by suncal.progress.Progress). The event time is calculated with the given [precision] (see
+    find_discrete).
     """
 
     # period of time to scan for rise and set events
     t_start, t_end = time_range_of_date(date=date, timezone=location.timezone)
 
-    eph = skyfield_api.load('de421.bsp')
+    eph = load_ephemeris(date)
     skyfield_location = skyfield_api.wgs84.latlon(
         location.latitude, location.longitude
     )
@@ -132,39 +251,46 @@ def calculate_rise_set(
             body == CelestialBody.MOON
         ), "No rising/setting implementation for bodies other than sun or moon"
         f = almanac.risings_and_settings(eph, eph['moon'], skyfield_location)
+    f.step_days = MAX_STEP_DAYS
 
-    ts = skyfield_api.load.timescale()
-    t, y = almanac.find_discrete(
-        ts.from_datetime(t_start), ts.from_datetime(t_end), f
+    ts = load_timescale()
+    t, y = find_discrete(
+        ts.from_datetime(t_start), ts.from_datetime(t_end), f, precision
     )
 
     idx = 1 if rise else 0
 
     if idx not in y:
-        print(
-            f"The {body.value} does not {'rise' if rise else 'set'} on {date.strftime('%d.%m.%Y')}"
-        )
         return None
     else:
         t_skyfield = t[y == idx]
-        event_time = t_skyfield.astimezone(
-            pytz.timezone(location.timezone)
+        event_time = times_to_local_datetimes(
+            t_skyfield, location.timezone
         ).item()
 
-        return RiseSet(
-            location=location, event_time=event_time, body=body, rise=rise
+        return trusted(
+            RiseSet,
+            location=location,
+            event_time=event_time,
+            body=body,
+            rise=rise,
         )
 
 
 def calculate_magic_hour(
-    date: dt.date, location: Location, color: str, morning: bool
+    date: dt.date,
+    location: Location,
+    color: str,
+    morning: bool,
+    precision: str | None = None,
 ) -> MagicHour | None:
     """
     The golden hour starts with the center of the sun 4 degrees below the horizon and ends when the center of the sun
     is 6 degrees above the horizon. Similar for the Blue hour: it starts with the sun at 8 degrees below the
     horizon and ends with 4 degrees below.
 
-    We only return a MagicHour object if both start and end time are available.
+    We only return a MagicHour object if both start and end time are available. Start and end are calculated with the
+    given [precision] (see find_discrete).
     """
 
     idx = 1 if morning else 0
@@ -173,46 +299,46 @@ def calculate_magic_hour(
 
     t_start, t_end = time_range_of_date(date=date, timezone=location.timezone)
 
-    eph = skyfield_api.load('de421.bsp')
+    eph = load_ephemeris(date)
     skyfield_location = skyfield_api.wgs84.latlon(
         location.latitude, location.longitude
     )
 
-    ts = skyfield_api.load.timescale()
-    t, y = almanac.find_discrete(
+    def sun_crossings(horizon_degrees: int) -> Any:
+        f = almanac.risings_and_settings(
+            eph, eph['sun'], skyfield_location, horizon_degrees=horizon_degrees
+        )
+        f.step_days = MAX_STEP_DAYS
+        return f
+
+    ts = load_timescale()
+    t, y = find_discrete(
         ts.from_datetime(t_start),
         ts.from_datetime(t_end),
-        almanac.risings_and_settings(
-            eph,
-            eph['sun'],
-            skyfield_location,
-            horizon_degrees=degree[color]['from'],
-        ),
+        sun_crossings(degree[color]['from']),
+        precision,
     )
     if idx not in y:
         return None
     else:
         t_skyfield = t[y == idx]
-        t1 = t_skyfield.astimezone(pytz.timezone(location.timezone)).item()
+        t1 = times_to_local_datetimes(t_skyfield, location.timezone).item()
 
-        t, y = almanac.find_discrete(
+        t, y = find_discrete(
             ts.from_datetime(t_start),
             ts.from_datetime(t_end),
-            almanac.risings_and_settings(
-                eph,
-                eph['sun'],
-                skyfield_location,
-                horizon_degrees=degree[color]['to'],
-            ),
+            sun_crossings(degree[color]['to']),
+            precision,
         )
 
         if idx not in y:
             return None
         else:
             t_skyfield = t[y == idx]
-            t2 = t_skyfield.astimezone(pytz.timezone(location.timezone)).item()
+            t2 = times_to_local_datetimes(t_skyfield, location.timezone).item()
 
-            return MagicHour(
+            return trusted(
+                MagicHour,
                 start=t1 if morning else t2,
                 end=t2 if morning else t1,
                 color=color,
@@ -220,63 +346,524 @@ def calculate_magic_hour(
             )
 
 
-def calculate_moon_phase(date: dt.date, timezone: str) -> MoonPhase | None:
+def calculate_moon_phase(
+    date: dt.date, timezone: str, precision: str | None = None
+) -> MoonPhase | None:
     """
     In general, we can calculate a moon phase (angle between 0 and 360 deg) for every single second. This function here
     does not return the phase, but only returns a MoonPhase object when we have either First Quarter, Full Moon, Last
-    Quarter or New Moon on the provided date.
+    Quarter or New Moon on the provided date. The time of the phase is calculated with the given [precision] (see
+    find_discrete).
 
     Note: The moon phase is the same for every location on earth, however, it appears differently visually.
     """
     # period of time to scan for rise and set events
     t_start, t_end = time_range_of_date(date=date, timezone=timezone)
-    eph = skyfield_api.load('de421.bsp')
-    ts = skyfield_api.load.timescale()
+    eph = load_ephemeris(date)
+    ts = load_timescale()
 
-    t, y = almanac.find_discrete(
+    t, y = find_discrete(
         ts.from_datetime(t_start),
         ts.from_datetime(t_end),
         almanac.moon_phases(eph),
+        precision,
     )
 
     if len(y) == 0:
         # this will happen most of the time (there are only 4 days in a month with a "special moon phase")
         return None
     else:
-        event_time = t.astimezone(pytz.timezone(timezone)).item()
+        event_time = times_to_local_datetimes(t, timezone).item()
         phase_idx = y.item()
 
-        return MoonPhase(
-            timezone=timezone, event_time=event_time, phase_idx=phase_idx
+        return trusted(
+            MoonPhase,
+            timezone=timezone,
+            event_time=event_time,
+            phase_idx=phase_idx,
         )
 
 
 CALC = {
-    'sunrise': lambda date, location: calculate_rise_set(
-        date=date, location=location, rise=True, body=CelestialBody.SUN
+    'sunrise': lambda date, location, precision=None: calculate_rise_set(
+        date=date,
+        location=location,
+        rise=True,
+        body=CelestialBody.SUN,
+        precision=precision,
     ),
-    'sunset': lambda date, location: calculate_rise_set(
-        date=date, location=location, rise=False, body=CelestialBody.SUN
+    'sunset': lambda date, location, precision=None: calculate_rise_set(
+        date=date,
+        location=location,
+        rise=False,
+        body=CelestialBody.SUN,
+        precision=precision,
     ),
-    'moonrise': lambda date, location: calculate_rise_set(
-        date=date, location=location, rise=True, body=CelestialBody.MOON
+    'moonrise': lambda date, location, precision=None: calculate_rise_set(
+        date=date,
+        location=location,
+        rise=True,
+        body=CelestialBody.MOON,
+        precision=precision,
     ),
-    'moonset': lambda date, location: calculate_rise_set(
-        date=date, location=location, rise=False, body=CelestialBody.MOON
+    'moonset': lambda date, location, precision=None: calculate_rise_set(
+        date=date,
+        location=location,
+        rise=False,
+        body=CelestialBody.MOON,
+        precision=precision,
     ),
-    'moonphase': lambda date, location: calculate_moon_phase(
-        date=date, timezone=location.timezone
+    'moonphase': lambda date, location, precision=None: calculate_moon_phase(
+        date=date, timezone=location.timezone, precision=precision
     ),
-    'golden_hour_morning': lambda date, location: calculate_magic_hour(
-        date=date, location=location, color='golden', morning=True
+    'golden_hour_morning': lambda date, location, precision=None: calculate_magic_hour(
+        date=date,
+        location=location,
+        color='golden',
+        morning=True,
+        precision=precision,
     ),
-    'golden_hour_evening': lambda date, location: calculate_magic_hour(
-        date=date, location=location, color='golden', morning=False
+    'golden_hour_evening': lambda date, location, precision=None: calculate_magic_hour(
+        date=date,
+        location=location,
+        color='golden',
+        morning=False,
+        precision=precision,
     ),
-    'blue_hour_morning': lambda date, location: calculate_magic_hour(
-        date=date, location=location, color='blue', morning=True
+    'blue_hour_morning': lambda date, location, precision=None: calculate_magic_hour(
+        date=date,
+        location=location,
+        color='blue',
+        morning=True,
+        precision=precision,
     ),
-    'blue_hour_evening': lambda date, location: calculate_magic_hour(
-        date=date, location=location, color='blue', morning=False
+    'blue_hour_evening': lambda date, location, precision=None: calculate_magic_hour(
+        date=date,
+        location=location,
+        color='blue',
+        morning=False,
+        precision=precision,
     ),
 }
+
+
+# batched calculations -------------------------------------------------------------------------------------------------
+# The functions above calculate one event on one date. The batched engine below searches a whole range of dates at once
+# and returns the event times as arrays (EventTable).
+
+# codes of the event kinds in EventTable.kind
+EVENT_KINDS = [e.value for e in Event]
+
+RISE_SET_EVENTS = {
+    'sunrise': (CelestialBody.SUN, True),
+    'sunset': (CelestialBody.SUN, False),
+    'moonrise': (CelestialBody.MOON, True),
+    'moonset': (CelestialBody.MOON, False),
+}
+
+MAGIC_HOUR_EVENTS = {
+    'golden_hour_morning': ('golden', True),
+    'golden_hour_evening': ('golden', False),
+    'blue_hour_morning': ('blue', True),
+    'blue_hour_evening': ('blue', False),
+}
+
+MAGIC_HOUR_DEGREES = {
+    'blue': {'from': -8, 'to': -4},
+    'golden': {'from': -4, 'to': 6},
+}
+
+# max number of days that are searched at once (limits the size of the sampled arrays of skyfield)
+MAX_BATCH_DAYS = 366
+
+
+class EventTable(BaseModel):
+    """
+    Columnar result of the batched calculation of events: one entry per event in arrays of equal length.
+
+    kind:         event kind as index into EVENT_KINDS (int8)
+    location_idx: index into [locations] (int32)
+    date:         local date of the event (datetime64[D])
+    start:        UTC time of the event or start of Golden/Blue Hour (datetime64[us])
+    end:          UTC end of Golden/Blue Hour, same as [start] for all other events (datetime64[us])
+    phase_idx:    moon phase index (see MoonPhase), -1 for all other events (int8)
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    locations: list[Location]
+    kind: np.ndarray
+    location_idx: np.ndarray
+    date: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    phase_idx: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    @staticmethod
+    def empty(locations: list[Location]) -> EventTable:
+        return EventTable(
+            locations=locations,
+            kind=np.empty(0, dtype=np.int8),
+            location_idx=np.empty(0, dtype=np.int32),
+            date=np.empty(0, dtype='datetime64[D]'),
+            start=np.empty(0, dtype='datetime64[us]'),
+            end=np.empty(0, dtype='datetime64[us]'),
+            phase_idx=np.empty(0, dtype=np.int8),
+        )
+
+    @staticmethod
+    def concatenate(
+        tables: list[EventTable], locations: list[Location]
+    ) -> EventTable:
+        """Concatenate [tables] that all refer to the same list of [locations]."""
+        if not tables:
+            return EventTable.empty(locations)
+        return EventTable(
+            locations=locations,
+            **{
+                column: np.concatenate([getattr(t, column) for t in tables])
+                for column in EVENT_TABLE_COLUMNS
+            },
+        )
+
+    def select(
+        self,
+        event: str | None = None,
+        location_idx: int | None = None,
+        from_date: dt.date | None = None,
+        to_date: dt.date | None = None,
+    ) -> EventTable:
+        """
+        Subset of the table with only the events of kind [event] and/or of the location [location_idx] and/or on the
+        local dates from [from_date] to [to_date].
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if event is not None:
+            mask &= self.kind == EVENT_KINDS.index(event)
+        if location_idx is not None:
+            mask &= self.location_idx == location_idx
+        if from_date is not None:
+            mask &= self.date >= np.datetime64(from_date, 'D')
+        if to_date is not None:
+            mask &= self.date <= np.datetime64(to_date, 'D')
+        return EventTable(
+            locations=self.locations,
+            **{
+                column: getattr(self, column)[mask]
+                for column in EVENT_TABLE_COLUMNS
+            },
+        )
+
+    def location_columns(self) -> dict[str, np.ndarray]:
+        """Latitude, longitude and timezone index of every event, and the distinct timezones the index refers to."""
+        timezones, tz_idx = np.unique(
+            [location.timezone for location in self.locations],
+            return_inverse=True,
+        )
+        latitudes = np.array([l.latitude for l in self.locations], dtype=float)
+        longitudes = np.array(
+            [l.longitude for l in self.locations], dtype=float
+        )
+        return {
+            'latitude': latitudes[self.location_idx],
+            'longitude': longitudes[self.location_idx],
+            'timezone_idx': tz_idx.astype(np.int32)[self.location_idx],
+            'timezones': timezones,
+        }
+
+    def to_arrow(self) -> pa.Table:
+        """
+        Convert the table to a pyarrow Table. The time columns are wrapped as UTC timestamps and the event kinds as
+        dictionary (categorical) arrays without creating a Python object per event. phase_idx is null for all events
+        that are not moon phases. Requires the optional dependency pyarrow.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError(
+                "EventTable.to_arrow requires the optional dependency pyarrow. Install suncal with the 'arrow' extra."
+            ) from e
+
+        location_columns = self.location_columns()
+        return pa.table(
+            {
+                'kind': pa.DictionaryArray.from_arrays(
+                    self.kind, pa.array(EVENT_KINDS)
+                ),
+                'date': pa.array(self.date.astype('datetime64[D]')),
+                'start': pa.array(
+                    self.start, type=pa.timestamp('us', tz='UTC')
+                ),
+                'end': pa.array(self.end, type=pa.timestamp('us', tz='UTC')),
+                'timezone': pa.DictionaryArray.from_arrays(
+                    location_columns['timezone_idx'],
+                    pa.array(location_columns['timezones']),
+                ),
+                'latitude': pa.array(location_columns['latitude']),
+                'longitude': pa.array(location_columns['longitude']),
+                'location_idx': pa.array(self.location_idx),
+                'phase_idx': pa.array(self.phase_idx, mask=self.phase_idx < 0),
+            }
+        )
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Convert the table to a pandas DataFrame with UTC-aware start/end columns and categorical event kinds and
+        timezones. phase_idx is a nullable integer column. Requires the optional dependency pandas.
+        """
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError(
+                "EventTable.to_pandas requires the optional dependency pandas. Install suncal with the 'pandas' extra."
+            ) from e
+
+        location_columns = self.location_columns()
+        return pd.DataFrame(
+            {
+                'kind': pd.Categorical.from_codes(
+                    self.kind, categories=EVENT_KINDS
+                ),
+                'date': pd.DatetimeIndex(self.date.astype('datetime64[s]')),
+                'start': pd.DatetimeIndex(self.start).tz_localize('UTC'),
+                'end': pd.DatetimeIndex(self.end).tz_localize('UTC'),
+                'timezone': pd.Categorical.from_codes(
+                    location_columns['timezone_idx'],
+                    categories=location_columns['timezones'],
+                ),
+                'latitude': location_columns['latitude'],
+                'longitude': location_columns['longitude'],
+                'location_idx': self.location_idx,
+                'phase_idx': pd.arrays.IntegerArray(
+                    self.phase_idx, self.phase_idx < 0
+                ),
+            },
+            copy=False,
+        )
+
+    def celestial_events(self) -> Iterator[RiseSet | MoonPhase | MagicHour]:
+        """Convert the entries of the table to RiseSet, MoonPhase or MagicHour objects (in the order of the table)."""
+        for i in range(len(self)):
+            event = EVENT_KINDS[self.kind[i]]
+            location = self.locations[self.location_idx[i]]
+            start, end = utc_to_local_datetimes(
+                np.array([self.start[i], self.end[i]]), location.timezone
+            )
+            if event in RISE_SET_EVENTS:
+                body, rise = RISE_SET_EVENTS[event]
+                yield trusted(
+                    RiseSet,
+                    location=location,
+                    event_time=start,
+                    body=body,
+                    rise=rise,
+                )
+            elif event in MAGIC_HOUR_EVENTS:
+                color, morning = MAGIC_HOUR_EVENTS[event]
+                yield trusted(
+                    MagicHour,
+                    start=start,
+                    end=end,
+                    color=color,
+                    morning=morning,
+                )
+            else:
+                yield trusted(
+                    MoonPhase,
+                    timezone=location.timezone,
+                    event_time=start,
+                    phase_idx=int(self.phase_idx[i]),
+                )
+
+
+EVENT_TABLE_COLUMNS = [
+    'kind',
+    'location_idx',
+    'date',
+    'start',
+    'end',
+    'phase_idx',
+]
+
+
+def find_events(
+    t_start: np.datetime64,
+    t_end: np.datetime64,
+    f: Callable,
+    precision: str | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find the discrete events of the skyfield almanac function [f] between the UTC instants [t_start] and [t_end] with
+    the given [precision] (see find_discrete). Return UTC event times (datetime64[us]) and values of [f].
+    """
+    ts = load_timescale()
+    t, y = find_discrete(
+        ts.from_datetime(
+            t_start.astype(dt.datetime).replace(tzinfo=dt.timezone.utc)
+        ),
+        ts.from_datetime(
+            t_end.astype(dt.datetime).replace(tzinfo=dt.timezone.utc)
+        ),
+        f,
+        precision,
+    )
+    return times_to_utc_datetime64(t), np.asarray(y)
+
+
+def first_event_per_day(
+    utc: np.ndarray, boundaries: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Assign UTC event times [utc] to the days defined by [boundaries] (see suncal.utils.day_boundaries). Return the
+    indices of the days with events and the index (into [utc]) of the first event of each of these days.
+    """
+    day = np.searchsorted(boundaries, utc, side='right') - 1
+    valid = np.flatnonzero((day >= 0) & (day < len(boundaries) - 1))
+    days, first = np.unique(day[valid], return_index=True)
+    return days, valid[first]
+
+
+def calculate_batch(
+    event: str,
+    from_date: dt.date,
+    to_date: dt.date,
+    location: Location,
+    eph: SpiceKernel,
+    searches: dict[str, tuple[np.ndarray, np.ndarray]] | None = None,
+    precision: str | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calculate [event] for all dates from [from_date] to [to_date] with a single search per event function. Return the
+    local dates with events and the start, end and phase_idx of the events on these dates. Results of the searches are
+    stored in [searches], so that other events of the same dates and location can reuse them (e.g. sunrise and sunset
+    come from the same search, Golden and Blue Hour share the -4° horizon). The event times are calculated with the
+    given [precision] (see find_discrete).
+    """
+    boundaries = day_boundaries(from_date, to_date, location.timezone)
+    # same window as the per-day calculations: the end of the last date is inclusive
+    t_start, t_end = boundaries[0], boundaries[-1] - np.timedelta64(1, 'us')
+    skyfield_location = skyfield_api.wgs84.latlon(
+        location.latitude, location.longitude
+    )
+    searches = {} if searches is None else searches
+
+    def search(key: str, make_function: Callable[[], Any]) -> tuple:
+        if key not in searches:
+            f = make_function()
+            if key != 'moonphase':
+                f.step_days = MAX_STEP_DAYS
+            searches[key] = find_events(t_start, t_end, f, precision)
+        return searches[key]
+
+    if event == Event.MOONPHASE.value:
+        utc, y = search('moonphase', lambda: almanac.moon_phases(eph))
+        days, first = first_event_per_day(utc, boundaries)
+        start, end, phase_idx = utc[first], utc[first], y[first]
+
+    elif event in RISE_SET_EVENTS:
+        body, rise = RISE_SET_EVENTS[event]
+        if body == CelestialBody.SUN:
+            utc, y = search(
+                'sun',
+                lambda: almanac.sunrise_sunset(eph, skyfield_location),
+            )
+        else:
+            utc, y = search(
+                'moon',
+                lambda: almanac.risings_and_settings(
+                    eph, eph['moon'], skyfield_location
+                ),
+            )
+        utc = utc[y == (1 if rise else 0)]
+        days, first = first_event_per_day(utc, boundaries)
+        start, end = utc[first], utc[first]
+        phase_idx = np.full(len(days), -1)
+
+    else:
+        color, morning = MAGIC_HOUR_EVENTS[event]
+        idx = 1 if morning else 0
+        times = {}
+        for horizon in ['from', 'to']:
+            degrees = MAGIC_HOUR_DEGREES[color][horizon]
+            utc, y = search(
+                f'sun{degrees:+}',
+                lambda: almanac.risings_and_settings(
+                    eph,
+                    eph['sun'],
+                    skyfield_location,
+                    horizon_degrees=degrees,
+                ),
+            )
+            utc = utc[y == idx]
+            days_horizon, first = first_event_per_day(utc, boundaries)
+            times[horizon] = (days_horizon, utc[first])
+        # only days on which both horizons are crossed have a Golden/Blue Hour
+        days, idx_from, idx_to = np.intersect1d(
+            times['from'][0], times['to'][0], return_indices=True
+        )
+        t_from, t_to = times['from'][1][idx_from], times['to'][1][idx_to]
+        start, end = (t_from, t_to) if morning else (t_to, t_from)
+        phase_idx = np.full(len(days), -1)
+
+    dates = np.datetime64(from_date, 'D') + days.astype('timedelta64[D]')
+    return dates, start, end, phase_idx
+
+
+def calculate_events(
+    event: str | Iterable[str],
+    from_date: dt.date,
+    to_date: dt.date,
+    location: Location,
+    location_idx: int = 0,
+    precision: str | None = None,
+) -> EventTable:
+    """
+    Batched counterpart of CALC: calculate [event] (or several events) for all dates from [from_date] to [to_date] for
+    [location] and return the results as an EventTable (sorted by event). The range is searched in batches of at most
+    MAX_BATCH_DAYS days that can each be calculated with a single ephemeris kernel; events of the same batch share
+    their searches. Like the per-day calculations, only the first event per local date is kept. The event times are
+    calculated with the given [precision] (see find_discrete).
+    """
+    events = [event] if isinstance(event, str) else list(event)
+    tables: dict[str, list[EventTable]] = {name: [] for name in events}
+    for chunk_from, chunk_to, kernel in split_by_kernel(from_date, to_date):
+        eph = load_kernel(kernel)
+        batch_from = chunk_from
+        while batch_from <= chunk_to:
+            batch_to = min(
+                batch_from + dt.timedelta(days=MAX_BATCH_DAYS - 1), chunk_to
+            )
+            searches: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+            for name in events:
+                dates, start, end, phase_idx = calculate_batch(
+                    name,
+                    batch_from,
+                    batch_to,
+                    location,
+                    eph,
+                    searches,
+                    precision,
+                )
+                tables[name].append(
+                    EventTable(
+                        locations=[location],
+                        kind=np.full(
+                            len(dates), EVENT_KINDS.index(name), dtype=np.int8
+                        ),
+                        location_idx=np.full(
+                            len(dates), location_idx, dtype=np.int32
+                        ),
+                        date=dates,
+                        start=start.astype('datetime64[us]'),
+                        end=end.astype('datetime64[us]'),
+                        phase_idx=phase_idx.astype(np.int8),
+                    )
+                )
+            batch_from = batch_to + dt.timedelta(days=1)
+
+    return EventTable.concatenate(
+        [table for name in events for table in tables[name]], [location]
+    )
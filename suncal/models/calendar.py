@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import datetime as dt
+
+from pydantic import BaseModel  # pylint: disable=E0611
+from pydantic import model_validator
+from skyfield.almanac import MOON_PHASES
+from typing_extensions import Self
+
+from suncal.models.astro import MOON_PHASE_SYMBOLS
+from suncal.models.astro import CelestialBody
+from suncal.models.astro import MagicHour
+from suncal.models.astro import MoonPhase
+from suncal.models.astro import RiseSet
+from suncal.utils import trusted
+
+
+class CalendarEvent(BaseModel):
+    """
+    Calendar event that is independent of the sink (ics file or Google Calendar), the sinks convert it to their own
+    models (VEvent, GoogleCalEvent) only when they write it. Timed events have timezone-aware datetimes as [start] and
+    [end], all-day events have dates and the [timezone] of the calendar; [end] is exclusive, i.e. the day after the
+    last day. [transparent] events do not block time in the calendar.
+    """
+
+    start: dt.datetime | dt.date
+    end: dt.datetime | dt.date
+    summary: str
+    timezone: str | None = None
+    transparent: bool = True
+
+    @model_validator(mode='after')
+    def start_and_end_valid(self) -> Self:
+        if isinstance(self.start, dt.datetime) != isinstance(
+            self.end, dt.datetime
+        ):
+            raise ValueError(
+                "Start and end have to be both datetimes (timed event) or both dates (all-day event)."
+            )
+        if isinstance(self.start, dt.datetime):
+            assert isinstance(self.end, dt.datetime)
+            if self.start.utcoffset() is None or self.end.utcoffset() is None:
+                raise ValueError(
+                    "Start and end of timed events have to be timezone-aware."
+                )
+        else:
+            if self.timezone is None:
+                raise ValueError("All-day events require a timezone.")
+            if not self.end > self.start:
+                raise ValueError(
+                    "End is the exclusive(!) end date of the event so it has to be larger than the start date."
+                )
+        return self
+
+    @property
+    def all_day(self) -> bool:
+        return not isinstance(self.start, dt.datetime)
+
+    @property
+    def date(self) -> dt.date:
+        """Local date on which the event starts."""
+        if isinstance(self.start, dt.datetime):
+            return self.start.date()
+        return self.start
+
+    def key(self) -> str:
+        """
+        Stable identity of the event within a calendar and event kind: its local start date (suncal creates at most
+        one event of a kind per date). Used by the journal of resumable exports.
+        """
+        return self.date.isoformat()
+
+    @staticmethod
+    def from_rise_set(rise_set: RiseSet) -> CalendarEvent:
+        """
+        Create calendar event from a RiseSet event (e.g. sunrise, moonset ...).
+        """
+        symbol = '🌞' if rise_set.body == CelestialBody.SUN else '🌜'
+        direction = '↑' if rise_set.rise else '↓'
+
+        summary = (
+            f"{symbol}{direction} at {rise_set.event_time.strftime('%I:%M %p')}"
+        )
+
+        return trusted(
+            CalendarEvent,
+            start=rise_set.event_time,
+            end=rise_set.event_time,
+            summary=summary,
+        )
+
+    @staticmethod
+    def from_moon_phase(moon_phase: MoonPhase) -> CalendarEvent:
+        """
+        Create calendar event from a MoonPhase event. We are using an all-day event for that purpose.
+        """
+        event_date = moon_phase.event_time.date()
+
+        symbol = MOON_PHASE_SYMBOLS[moon_phase.phase_idx]
+        desc = MOON_PHASES[moon_phase.phase_idx]
+
+        summary = (
+            f"{symbol} {desc} at {moon_phase.event_time.strftime('%I:%M %p')}"
+        )
+
+        return trusted(
+            CalendarEvent,
+            start=event_date,
+            end=event_date + dt.timedelta(days=1),
+            summary=summary,
+            timezone=moon_phase.timezone,
+        )
+
+    @staticmethod
+    def from_magic_hour(magic_hour: MagicHour) -> CalendarEvent:
+
+        symbol = '🌇' if magic_hour.color == 'golden' else '🏙'
+        desc = 'Golden Hour' if magic_hour.color == 'golden' else 'Blue Hour'
+
+        return trusted(
+            CalendarEvent,
+            start=magic_hour.start,
+            end=magic_hour.end,
+            summary=f'{symbol} {desc}',
+        )
+
+    @staticmethod
+    def from_celestial_event(
+        c_event: MoonPhase | RiseSet | MagicHour,
+    ) -> CalendarEvent:
+        """
+        Interface method that calls either constructor 'from_rise_set', 'from_moon_phase' or 'from_magic_hour'
+        depending on input type.
+        """
+        if isinstance(c_event, MoonPhase):
+            return CalendarEvent.from_moon_phase(c_event)
+        elif isinstance(c_event, RiseSet):
+            return CalendarEvent.from_rise_set(c_event)
+        elif isinstance(c_event, MagicHour):
+            return CalendarEvent.from_magic_hour(c_event)
+        else:
+            raise NotImplementedError(
+                'This method currently only supports events of type MoonPhase, RiseSet or MagicHour.'
+            )
@@ -1,22 +1,47 @@
 import datetime as dt
+import itertools
 import json
+import os
+import urllib.parse
+import uuid
+from collections import deque
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import TypeVar
 
 from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import Resource
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
+from googleapiclient.http import HttpRequest
 from pydantic import BaseModel  # pylint: disable=E0611
 from pydantic import ConfigDict
 from pydantic import Field
 from pydantic import field_validator
 from pydantic import model_validator
-from skyfield.almanac import MOON_PHASES
 from typing_extensions import Self
 
-from suncal.models.astro import MOON_PHASE_SYMBOLS
-from suncal.models.astro import CelestialBody
+from suncal.auth import CALENDAR_CACHE_FILE
+from suncal.auth import account_key
+from suncal.fileio import export_marker
+from suncal.journal import Journal
+from suncal.models.astro import Location
 from suncal.models.astro import MagicHour
 from suncal.models.astro import MoonPhase
 from suncal.models.astro import RiseSet
-from suncal.utils import create_batches
+from suncal.models.calendar import CalendarEvent
+from suncal.progress import Progress
+from suncal.ratelimit import ExportMetrics
+from suncal.ratelimit import RateLimiter
+from suncal.utils import time_range_of_date
+from suncal.utils import trusted
+
+T = TypeVar('T')
+
+# base url of an alternative Calendar API server (e.g. "http://127.0.0.1:8080/"), used by tests and load tests
+API_ENDPOINT_ENV_VAR = 'SUNCAL_GOOGLE_API_ENDPOINT'
 
 
 class GoogleCalTime(BaseModel):
@@ -134,86 +159,91 @@ class GoogleCalEvent(BaseModel):
         return json.loads(self.model_dump_json(by_alias=True))
 
     @staticmethod
-    def from_rise_set(rise_set: RiseSet) -> 'GoogleCalEvent':
+    def from_calendar_event(event: CalendarEvent) -> 'GoogleCalEvent':
         """
-        Create calendar event from a RiseSet event (e.g. sunrise, moonset ...).
+        Convert a sink-neutral calendar event, all-day events get the timezone of the calendar.
         """
-        symbol = '🌞' if rise_set.body == CelestialBody.SUN else '🌜'
-        direction = '↑' if rise_set.rise else '↓'
-
-        summary = (
-            f"{symbol}{direction} at {rise_set.event_time.strftime('%I:%M %p')}"
-        )
-
-        return GoogleCalEvent(
-            start=GoogleCalTime(datetime=rise_set.event_time),
-            end=GoogleCalTime(datetime=rise_set.event_time),
-            summary=summary,
-            transparency='transparent',
+        if event.all_day:
+            start = trusted(
+                GoogleCalTime, date=event.start, timezone=event.timezone
+            )
+            end = trusted(
+                GoogleCalTime, date=event.end, timezone=event.timezone
+            )
+        else:
+            start = trusted(GoogleCalTime, datetime=event.start)
+            end = trusted(GoogleCalTime, datetime=event.end)
+        return trusted(
+            GoogleCalEvent,
+            start=start,
+            end=end,
+            summary=event.summary,
+            transparency='transparent' if event.transparent else 'opaque',
         )
 
     @staticmethod
-    def from_moon_phase(moon_phase: MoonPhase) -> 'GoogleCalEvent':
+    def from_celestial_event(
+        c_event: MoonPhase | RiseSet | MagicHour,
+    ) -> 'GoogleCalEvent':
         """
-        Create calendar event from a MoonPhase event. We are using an all-day event for that purpose.
+        Create calendar event from a celestial event, see CalendarEvent.from_celestial_event.
         """
-        event_date = moon_phase.event_time.date()
-        timezone = moon_phase.timezone
-
-        symbol = MOON_PHASE_SYMBOLS[moon_phase.phase_idx]
-        desc = MOON_PHASES[moon_phase.phase_idx]
-
-        summary = (
-            f"{symbol} {desc} at {moon_phase.event_time.strftime('%I:%M %p')}"
-        )
-
-        return GoogleCalEvent(
-            start=GoogleCalTime(date=event_date, timezone=timezone),
-            end=GoogleCalTime(
-                date=event_date + dt.timedelta(days=1), timezone=timezone
-            ),
-            summary=summary,
-            transparency='transparent',
+        return GoogleCalEvent.from_calendar_event(
+            CalendarEvent.from_celestial_event(c_event)
         )
 
-    @staticmethod
-    def from_magic_hour(magic_hour: MagicHour) -> 'GoogleCalEvent':
-
-        symbol = '🌇' if magic_hour.color == 'golden' else '🏙'
-        desc = 'Golden Hour' if magic_hour.color == 'golden' else 'Blue Hour'
 
-        return GoogleCalEvent(
-            start=GoogleCalTime(datetime=magic_hour.start),
-            end=GoogleCalTime(datetime=magic_hour.end),
-            summary=f'{symbol} {desc}',
-            transparency='transparent',
+def calendar_service(credentials: Credentials) -> Resource:
+    """
+    Client of the Google Calendar API. If the environment variable API_ENDPOINT_ENV_VAR is set, all requests are sent
+    to this endpoint instead of Google (e.g. to the fake server in tests/fake_gcal.py).
+    """
+    endpoint = os.environ.get(API_ENDPOINT_ENV_VAR)
+    if endpoint:
+        return build(
+            "calendar",
+            "v3",
+            credentials=credentials,
+            client_options={
+                'api_endpoint': urllib.parse.urljoin(endpoint, 'calendar/v3/')
+            },
         )
-
-    @staticmethod
-    def from_celestial_event(
-        c_event: MoonPhase | RiseSet | MagicHour,
-    ) -> 'GoogleCalEvent':
-        """
-        Interface method that calls either constructor 'from_rise_set' or 'from_moon_phase' depending on input type.
-        """
-        if isinstance(c_event, MoonPhase):
-            return GoogleCalEvent.from_moon_phase(c_event)
-        elif isinstance(c_event, RiseSet):
-            return GoogleCalEvent.from_rise_set(c_event)
-        elif isinstance(c_event, MagicHour):
-            return GoogleCalEvent.from_magic_hour(c_event)
-        else:
-            raise NotImplementedError(
-                'This method currently only supports events of type MoonPhase, RiseSet or MagicHour.'
-            )
+    return build("calendar", "v3", credentials=credentials)
+
+
+def new_batch_request(
+    service: Resource, callback: Callable[[str, Any, Any], None]
+) -> BatchHttpRequest:
+    """Batch request of [service] (sent to the configured endpoint, see calendar_service)."""
+    endpoint = os.environ.get(API_ENDPOINT_ENV_VAR)
+    if endpoint:
+        # the client always sends batch requests to the root url of the discovery document
+        return BatchHttpRequest(
+            callback=callback,
+            batch_uri=urllib.parse.urljoin(endpoint, 'batch/calendar/v3'),
+        )
+    # pylint: disable=maybe-no-member"
+    return service.new_batch_http_request(callback=callback)
 
 
 def get_sun_calendar_id(
-    calendar_title: str, timezone: str, creds: Credentials
+    calendar_title: str,
+    timezone: str,
+    creds: Credentials,
+    cache_file: str | None = CALENDAR_CACHE_FILE,
 ) -> str:
     """
     Get id of Google Calendar with name [calendar_title]. If no calendar with this name exists, create a new one.
+    The id is stored in the local [cache_file] (per account and title). A cached id is checked with a single request
+    and only if it is missing or stale, all calendars of the account are listed.
     """
+    account = account_key(creds)
+    cache = load_calendar_cache(cache_file) if cache_file else {}
+    cached_id = cache.get(account, {}).get(calendar_title)
+    if cached_id is not None and calendar_exists(
+        cached_id, calendar_title, creds
+    ):
+        return cached_id
 
     all_calendars = request_calendars(creds=creds)
     # dict of calendars with matching title
@@ -236,16 +266,59 @@ def get_sun_calendar_id(
             f"Will insert events into calendar {calendar_title} with id {google_calendar_id}."
         )
 
+    if cache_file:
+        cache.setdefault(account, {})[calendar_title] = google_calendar_id
+        save_calendar_cache(cache, cache_file)
+
     return google_calendar_id
 
 
+def load_calendar_cache(cache_file: str) -> dict[str, dict[str, str]]:
+    """Load the cached calendar ids (account -> calendar title -> calendar id). Unreadable caches are ignored."""
+    if not os.path.exists(cache_file):
+        return {}
+    try:
+        with open(cache_file) as f:
+            cache = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_calendar_cache(
+    cache: dict[str, dict[str, str]], cache_file: str
+) -> None:
+    """Write the calendar id [cache] to [cache_file]."""
+    with open(cache_file, 'w') as f:
+        json.dump(cache, f, indent=2)
+
+
+def calendar_exists(
+    calendar_id: str, calendar_title: str, creds: Credentials
+) -> bool:
+    """
+    Check with a single request that the calendar with id [calendar_id] still exists and is still called
+    [calendar_title].
+    """
+    with calendar_service(creds) as service:
+        try:
+            # pylint: disable=maybe-no-member"
+            calendar = service.calendars().get(calendarId=calendar_id).execute()
+        except HttpError as e:
+            if e.resp.status in (403, 404, 410):
+                return False
+            raise
+
+    return calendar.get('summary') == calendar_title
+
+
 def request_calendars(creds: Credentials) -> dict[str, str]:
     """
     Get all existing calendars of this Google account.
     """
 
     #  TODO: what do we do in case we get no response?
-    with build("calendar", "v3", credentials=creds) as service:
+    with calendar_service(creds) as service:
 
         # use calendar id as key and calendar summary as value in this dict (summary would be more handy as key,
         # but unfortunately calendar titles don"t have to be unique (verified!)
@@ -276,7 +349,7 @@ def create_sun_calendar(
     Create a new Google calendar with title [calendar_title] in timezone [timezone].
     """
 
-    with build("calendar", "v3", credentials=creds) as service:
+    with calendar_service(creds) as service:
         calendar = {"summary": calendar_title, "timeZone": timezone}
         # pylint: disable=maybe-no-member"
         created_calendar = service.calendars().insert(body=calendar).execute()
@@ -284,30 +357,342 @@ def create_sun_calendar(
     return created_calendar["id"]
 
 
+def new_event_id() -> str:
+    """
+    Random id of a new event, created by suncal instead of Google so that inserts can be retried safely. The Google
+    Calendar API accepts 5 to 1024 characters of base32hex (0-9 and a-v), the hex digits of a uuid are a subset.
+    """
+    return uuid.uuid4().hex
+
+
+# key of the private extended property that marks the events created by suncal, the value is the export_marker
+MARKER_KEY = 'suncal'
+
+
+# reasons of 403 responses of the Google Calendar API that mean that a quota is exhausted (the request can be retried)
+RATE_LIMIT_REASONS = {
+    'rateLimitExceeded',
+    'userRateLimitExceeded',
+    'quotaExceeded',
+}
+
+
+# status codes of transient server errors, requests are retried
+SERVER_ERROR_STATUS = (500, 502, 503, 504)
+
+
+def is_server_error(exception: Exception) -> bool:
+    """Check if [exception] is a transient server error of the Google API."""
+    return (
+        isinstance(exception, HttpError)
+        and exception.resp.status in SERVER_ERROR_STATUS
+    )
+
+
+def is_rate_limit_error(exception: Exception) -> bool:
+    """Check if [exception] is a rate limit response of the Google API (429 or 403 with a rate limit reason)."""
+    if not isinstance(exception, HttpError):
+        return False
+    if exception.resp.status == 429:
+        return True
+    if exception.resp.status != 403:
+        return False
+    try:
+        errors = json.loads(exception.content)['error'].get('errors', [])
+    except (ValueError, KeyError, TypeError):
+        return False
+    return any(error.get('reason') in RATE_LIMIT_REASONS for error in errors)
+
+
+def execute_batched(
+    items: Iterable[T],
+    make_request: Callable[[Any, T], HttpRequest],
+    credentials: Credentials,
+    limiter: RateLimiter | None = None,
+    on_success: Callable[[T, Any], None] | None = None,
+    ignore_status: tuple[int, ...] = (),
+) -> ExportMetrics:
+    """
+    Send one request per item of [items] (created by [make_request] from the api service and the item) in batch
+    requests. The batch size and rate are controlled by [limiter]: requests that are answered with a rate limit
+    error are retried in the next batch after an exponential backoff and the batch size shrinks; it grows again after
+    successful batches. Requests that are answered with a server error are retried after a short delay, without
+    changing the batch size. Every request is sent at most limiter.max_attempts times, then it is counted as failed.
+    [on_success] is called with the item and the response of every successful request. Errors with a status in
+    [ignore_status] count as success, all other errors are counted as failed.
+    """
+    limiter = limiter or RateLimiter()
+    metrics = ExportMetrics()
+    item_iterator = ((item, 1) for item in items)
+    retry: deque[tuple[T, int]] = deque()
+
+    with calendar_service(credentials) as service:
+        while True:
+            batch = [
+                retry.popleft()
+                for _ in range(min(len(retry), limiter.batch_size.size))
+            ]
+            batch.extend(
+                itertools.islice(
+                    item_iterator, limiter.batch_size.size - len(batch)
+                )
+            )
+            if not batch:
+                break
+
+            to_retry: list[tuple[T, int]] = []
+            rate_limited = False
+
+            def handle_error(item: T, attempt: int, exception) -> None:
+                nonlocal rate_limited
+                if is_rate_limit_error(exception):
+                    metrics.rate_limited += 1
+                    rate_limited = True
+                elif is_server_error(exception):
+                    metrics.server_errors += 1
+                else:
+                    metrics.failed += 1
+                    return
+                if attempt < limiter.max_attempts:
+                    to_retry.append((item, attempt + 1))
+                else:
+                    metrics.failed += 1
+
+            def callback(request_id: str, response: Any, exception) -> None:
+                item, attempt = batch[int(request_id)]
+                if exception is None or (
+                    isinstance(exception, HttpError)
+                    and exception.resp.status in ignore_status
+                ):
+                    metrics.succeeded += 1
+                    if on_success is not None:
+                        on_success(item, response)
+                else:
+                    handle_error(item, attempt, exception)
+
+            metrics.waited_seconds += limiter.acquire(len(batch))
+            batch_request = new_batch_request(service, callback)
+            for request_id, (item, _) in enumerate(batch):
+                batch_request.add(
+                    make_request(service, item), request_id=str(request_id)
+                )
+            try:
+                batch_request.execute()
+            except HttpError as e:
+                # the whole batch was rejected
+                if not (is_rate_limit_error(e) or is_server_error(e)):
+                    raise
+                for item, attempt in batch:
+                    handle_error(item, attempt, e)
+            metrics.requests += len(batch)
+            metrics.batches += 1
+
+            if to_retry:
+                retry.extendleft(reversed(to_retry))
+            if rate_limited:
+                metrics.waited_seconds += limiter.rate_limited()
+            elif to_retry:
+                metrics.waited_seconds += limiter.server_error()
+            else:
+                limiter.success()
+
+    metrics.batch_size = limiter.batch_size.size
+    return metrics
+
+
 def export_events_to_google_calendar(
     google_calendar_id: str,
-    events: list[GoogleCalEvent],
+    events: Iterable[CalendarEvent],
     credentials: Credentials,
-) -> None:
+    marker: str | None = None,
+    limiter: RateLimiter | None = None,
+    journal: Journal | None = None,
+    resume: bool = False,
+    progress: Progress | None = None,
+) -> ExportMetrics:
     """
-    Add events to Google calendar with id [google_calendar_id]. Operate in batches of 1000.
+    Add events to Google calendar with id [google_calendar_id]. Events are sent in batch requests, whose size and rate
+    are controlled by [limiter] (see execute_batched). If a [marker] is provided, it is stored in a private extended
+    property of every event, so that the events can be found again by delete_marked_events. Events are inserted with
+    ids created by suncal, so retries never create duplicates (see new_event_id). Every confirmed insert
+    is written to the [journal]; with [resume], events that are already in the journal are skipped. Confirmed
+    inserts are counted in [progress]. Return the metrics of the export.
     """
+    if journal is not None:
+        confirmed = journal.start(resume)
+        if confirmed:
+            print(
+                f"Skipping {len(confirmed)} events that were already created."
+            )
+            events = (event for event in events if event.key() not in confirmed)
+
+    # every event gets its id before it is sent for the first time: Google may have created an event although the
+    # insert was answered with a server error, its retry is then rejected as a duplicate (409) instead of creating the
+    # event a second time
+    items = ((event, new_event_id()) for event in events)
+
+    def on_success(item: tuple[CalendarEvent, str], response: Any) -> None:
+        event, event_id = item
+        if journal is not None:
+            journal.record(event.key(), event_id)
+        if progress is not None:
+            progress.add_uploaded()
+
+    def insert_request(service, item: tuple[CalendarEvent, str]) -> HttpRequest:
+        event, event_id = item
+        # converted only when the request is built, so the ics path never creates Google models
+        body = GoogleCalEvent.from_calendar_event(event).payload()
+        body['id'] = event_id
+        if marker is not None:
+            body['extendedProperties'] = {'private': {MARKER_KEY: marker}}
+        # pylint: disable=maybe-no-member"
+        return service.events().insert(calendarId=google_calendar_id, body=body)
 
-    # create batches of events list of max size 1000 (current max of google api)
-    event_batches = create_batches(list_=events, batch_size=1000)
     print("Creating calendar events ...")
-    with build("calendar", "v3", credentials=credentials) as service:
+    try:
+        metrics = execute_batched(
+            items,
+            insert_request,
+            credentials,
+            limiter=limiter,
+            on_success=on_success,
+            ignore_status=(409,),
+        )
+    finally:
+        if journal is not None:
+            journal.close()
+    print(metrics.summary())
+    print("... DONE.")
 
-        for event_batch in event_batches:
-            # pylint: disable=maybe-no-member"
-            batch_request = service.new_batch_http_request()
-            for google_cal_event in event_batch:
-                batch_request.add(
-                    # pylint: disable=maybe-no-member"
-                    service.events().insert(
-                        calendarId=google_calendar_id,
-                        body=google_cal_event.payload(),
-                    )
+    return metrics
+
+
+def request_marked_event_ids(
+    google_calendar_id: str,
+    marker: str,
+    time_min: dt.datetime,
+    time_max: dt.datetime,
+    credentials: Credentials,
+) -> list[str]:
+    """
+    Get the ids of all events in Google calendar [google_calendar_id] that were created by suncal with [marker] and
+    that overlap with the window from [time_min] to [time_max] (both timezone aware).
+    """
+    with calendar_service(credentials) as service:
+        event_ids: list[str] = []
+        page_token = None
+        while True:
+            response = (
+                # pylint: disable=maybe-no-member"
+                service.events()
+                .list(
+                    calendarId=google_calendar_id,
+                    privateExtendedProperty=f"{MARKER_KEY}={marker}",
+                    timeMin=time_min.isoformat(),
+                    timeMax=time_max.isoformat(),
+                    maxResults=2500,
+                    fields='items(id),nextPageToken',
+                    pageToken=page_token,
                 )
-            batch_request.execute()
+                .execute()
+            )
+            event_ids.extend(item['id'] for item in response.get('items', []))
+
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+    return event_ids
+
+
+def delete_marked_events(
+    google_calendar_id: str,
+    marker: str,
+    time_min: dt.datetime,
+    time_max: dt.datetime,
+    credentials: Credentials,
+    limiter: RateLimiter | None = None,
+) -> ExportMetrics:
+    """
+    Delete all events that suncal created with [marker] between [time_min] and [time_max] from Google calendar
+    [google_calendar_id]. Events are deleted in batch requests (see execute_batched). Events that are already gone
+    count as deleted. Return the metrics of the deletion.
+    """
+    event_ids = request_marked_event_ids(
+        google_calendar_id, marker, time_min, time_max, credentials
+    )
+
+    def delete_request(service, event_id: str) -> HttpRequest:
+        # pylint: disable=maybe-no-member"
+        return service.events().delete(
+            calendarId=google_calendar_id, eventId=event_id
+        )
+
+    print(f"Deleting {len(event_ids)} existing calendar events ...")
+    metrics = execute_batched(
+        event_ids,
+        delete_request,
+        credentials,
+        limiter=limiter,
+        ignore_status=(404, 410),
+    )
+    print(metrics.summary())
     print("... DONE.")
+
+    return metrics
+
+
+def replace_in_google_calendar(
+    google_calendar_id: str,
+    event_name: str,
+    events: Iterable[CalendarEvent],
+    from_date: dt.date,
+    to_date: dt.date,
+    location: Location,
+    credentials: Credentials,
+    replace: bool = False,
+    limiter: RateLimiter | None = None,
+    resume: bool = False,
+    progress: Progress | None = None,
+) -> ExportMetrics:
+    """
+    Export [events] of kind [event_name] at [location] to Google calendar [google_calendar_id] with the journal of this
+    calendar, event and location. The events are marked with the export_marker of the event and location. With
+    [replace], the events with the same marker that suncal created before between [from_date] and [to_date] (local
+    dates at [location]) are deleted first. With [resume], only the events that are missing in the journal are sent, a
+    deletion that was completed before the interruption is not repeated. The uploaded events are counted in
+    [progress].
+    """
+    limiter = limiter or RateLimiter()
+    marker = export_marker(event_name, location)
+    journal = Journal.for_export(google_calendar_id, marker)
+    # the journal of an earlier export is discarded before anything is deleted, so that only the completed steps of
+    # this export can be skipped when it is resumed
+    journal.start(resume)
+    try:
+        scope = f"{marker} {from_date.isoformat()} {to_date.isoformat()}"
+        if replace and not journal.deleted(scope):
+            time_min, _ = time_range_of_date(from_date, location.timezone)
+            _, time_max = time_range_of_date(to_date, location.timezone)
+            delete_marked_events(
+                google_calendar_id,
+                marker,
+                time_min,
+                time_max,
+                credentials,
+                limiter=limiter,
+            )
+            journal.record_deleted(scope)
+
+        return export_events_to_google_calendar(
+            google_calendar_id,
+            events,
+            credentials,
+            marker=marker,
+            limiter=limiter,
+            journal=journal,
+            resume=resume,
+            progress=progress,
+        )
+    finally:
+        journal.close()
@@ -1,13 +1,20 @@
 from __future__ import annotations
 
 import datetime as dt
+from typing import Iterable
+from typing import Iterator
 from uuid import uuid4
 
 from pydantic import BaseModel  # pylint: disable=E0611
 from pydantic import field_validator
 
-from suncal.models.googlecal import GoogleCalEvent
+from suncal.models.calendar import CalendarEvent
 from suncal.utils import aware_datetime_to_ical_date_with_utc_time
+from suncal.utils import trusted
+
+# property of the events in files that are maintained by suncal, its value is the export_marker (event and location)
+# of the events, so that several events and locations can be maintained in one file
+MARKER_PROPERTY = 'X-SUNCAL-MARKER'
 
 
 class VEvent(BaseModel):
@@ -21,6 +28,9 @@ class VEvent(BaseModel):
     uid: str  # unique identifier of icalendar event
     summary: str  # event title
     transp: str  # transparency of event
+    marker: str | None = (
+        None  # X-SUNCAL-MARKER of maintained files, see update_ics_file
+    )
 
     @field_validator("dtend", "dtstart", "dtstamp", mode='after')
     @classmethod
@@ -33,19 +43,21 @@ class VEvent(BaseModel):
         return timestamp
 
     @staticmethod
-    def fromGoogleCalEvent(ge: GoogleCalEvent, dtstamp: dt.datetime) -> VEvent:
-        ical_event = VEvent(
-            dtstart=ge.start.datetime or ge.start.date,
-            dtend=ge.end.datetime or ge.end.date,
+    def from_calendar_event(
+        event: CalendarEvent, dtstamp: dt.datetime, marker: str | None = None
+    ) -> VEvent:
+        ical_event = trusted(
+            VEvent,
+            dtstart=event.start,
+            dtend=event.end,
             dtstamp=dtstamp,
             uid=f"{uuid4()}@itsalwaysbeen.photography",
-            summary=ge.summary,
-            transp=ge.transparency,
+            summary=event.summary,
+            transp='transparent' if event.transparent else 'opaque',
+            marker=marker,
         )
         return ical_event
 
-    # vev = VEvent.fromGoogleCalEvent(ge, dtstamp)
-
     def to_ics(self) -> list[str]:
         """Create lines in ics file from VEvent class object."""
 
@@ -71,8 +83,10 @@ class VEvent(BaseModel):
             f'UID:{self.uid}',
             f'SUMMARY:{self.summary}',
             f'TRANSP:{self.transp.upper()}',
-            'END:VEVENT',
         ]
+        if self.marker is not None:
+            ics_entry.append(f'{MARKER_PROPERTY}:{self.marker}')
+        ics_entry.append('END:VEVENT')
         return ics_entry
 
 
@@ -105,18 +119,25 @@ class VCalendar(BaseModel):
         return ['END:VCALENDAR']
 
 
-def create_ics_content(gcal_events: list[GoogleCalEvent]) -> list[str]:
-    """Create all lines of ics file as list of strings."""
+def iter_ics_content(
+    events: Iterable[CalendarEvent], marker: str | None = None
+) -> Iterator[str]:
+    """Lazily create all lines of ics file, one event at a time. The events are marked with [marker] if provided."""
     dtstamp = dt.datetime.now(dt.timezone.utc)
     vcalendar = VCalendar()
 
     # header
-    ics_content = vcalendar.header()
-    # add google calendar events one by one
-    for gcal_event in gcal_events:
-        vevent = VEvent.fromGoogleCalEvent(ge=gcal_event, dtstamp=dtstamp)
-        ics_content += vevent.to_ics()
+    yield from vcalendar.header()
+    # add calendar events one by one
+    for event in events:
+        vevent = VEvent.from_calendar_event(
+            event, dtstamp=dtstamp, marker=marker
+        )
+        yield from vevent.to_ics()
     # end with footer
-    ics_content += vcalendar.footer()
+    yield from vcalendar.footer()
+
 
-    return ics_content
+def create_ics_content(events: Iterable[CalendarEvent]) -> list[str]:
+    """Create all lines of ics file as list of strings."""
+    return list(iter_ics_content(events))
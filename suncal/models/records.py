@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import datetime as dt
+
+from pydantic import BaseModel  # pylint: disable=E0611
+
+from suncal.models.astro import Location
+from suncal.models.astro import MagicHour
+from suncal.models.astro import MoonPhase
+from suncal.models.astro import RiseSet
+from suncal.utils import trusted
+
+# column order of the bulk export formats
+RECORD_FIELDS = [
+    'kind',
+    'start_utc',
+    'start_local',
+    'end_utc',
+    'end_local',
+    'timezone',
+    'latitude',
+    'longitude',
+    'phase_idx',
+]
+
+
+class EventRecord(BaseModel):
+    """
+    Flat, machine-readable record of a celestial event for the bulk export formats (ndjson, csv, parquet).
+    [start_utc]/[start_local] is the time of the event (or the start of a Golden/Blue Hour), [end_utc]/[end_local] is
+    only set for Golden/Blue Hours and [phase_idx] only for moon phases.
+    """
+
+    kind: str  # any of the values of suncal.models.astro.Event
+    start_utc: dt.datetime
+    start_local: dt.datetime
+    end_utc: dt.datetime | None = None
+    end_local: dt.datetime | None = None
+    timezone: str
+    latitude: float
+    longitude: float
+    phase_idx: int | None = None
+
+    def row(self) -> dict[str, str | float | int | None]:
+        """Flat dict of the record with datetimes as ISO 8601 strings (in the order of RECORD_FIELDS)."""
+        return {
+            'kind': self.kind,
+            'start_utc': self.start_utc.isoformat(),
+            'start_local': self.start_local.isoformat(),
+            'end_utc': self.end_utc.isoformat() if self.end_utc else None,
+            'end_local': self.end_local.isoformat() if self.end_local else None,
+            'timezone': self.timezone,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'phase_idx': self.phase_idx,
+        }
+
+    @staticmethod
+    def from_celestial_event(
+        kind: str,
+        c_event: MoonPhase | RiseSet | MagicHour,
+        location: Location,
+    ) -> EventRecord:
+        """
+        Create record from a celestial event of type [kind] that was calculated for [location].
+        """
+        end_local = None
+        phase_idx = None
+        if isinstance(c_event, MagicHour):
+            start_local = c_event.start
+            end_local = c_event.end
+        elif isinstance(c_event, (MoonPhase, RiseSet)):
+            start_local = c_event.event_time
+            if isinstance(c_event, MoonPhase):
+                phase_idx = c_event.phase_idx
+        else:
+            raise NotImplementedError(
+                'This method currently only supports events of type MoonPhase, RiseSet or MagicHour.'
+            )
+
+        return trusted(
+            EventRecord,
+            kind=kind,
+            start_utc=start_local.astimezone(dt.timezone.utc),
+            start_local=start_local,
+            end_utc=(
+                end_local.astimezone(dt.timezone.utc) if end_local else None
+            ),
+            end_local=end_local,
+            timezone=location.timezone,
+            latitude=location.latitude,
+            longitude=location.longitude,
+            phase_idx=phase_idx,
+        )
@@ -0,0 +1,105 @@
+"""
+Pool of worker processes that start warm: the timescale, the ephemeris kernels and the timezone data are loaded once in
+the parent process before the workers are forked, so every worker has them without loading them again and all workers
+share the pages copy-on-write.
+"""
+
+import datetime as dt
+import multiprocessing
+from types import TracebackType
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import TypeVar
+
+from suncal.ephemeris import load_ephemeris
+from suncal.ephemeris import load_timescale
+from suncal.ephemeris import split_by_kernel
+from suncal.utils import timezone_finder
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def warm_up(
+    from_date: dt.date | None = None, to_date: dt.date | None = None
+) -> None:
+    """
+    Load the timescale, the timezone data and the ephemeris kernels for [from_date] to [to_date] (de421 if no dates
+    are provided) into this process. The Earth, Sun and Moon segments of the kernels are used once, so that jplephem
+    memory-maps them now and not in every worker. Everything is cached per process, so repeated calls are cheap.
+    """
+    ts = load_timescale()
+    timezone_finder()
+    chunks: list[tuple[dt.date | None, dt.date | None]] = [(None, None)]
+    if from_date is not None:
+        chunks = [
+            (chunk_from, chunk_to)
+            for chunk_from, chunk_to, _ in split_by_kernel(
+                from_date, to_date or from_date
+            )
+        ]
+    for chunk_from, chunk_to in chunks:
+        eph = load_ephemeris(chunk_from, chunk_to)
+        date = chunk_from or dt.date(2000, 1, 1)
+        earth = eph['earth'].at(ts.utc(date.year, date.month, date.day))
+        earth.observe(eph['sun'])
+        earth.observe(eph['moon'])
+
+
+class WarmPool:
+    """
+    [workers] processes that pull tasks from one queue. The workers are forked right away (pre-forked) from this
+    process after warm_up, so they start without loading anything and the memory-mapped ephemeris, the timescale and
+    the timezone data are shared instead of copied per worker. On platforms without fork, the workers are spawned and
+    warm up once each when they start. Use as context manager.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        from_date: dt.date | None = None,
+        to_date: dt.date | None = None,
+    ):
+        assert workers >= 1, "workers must be >= 1."
+        warm_up(from_date, to_date)
+        start_method = (
+            'fork'
+            if 'fork' in multiprocessing.get_all_start_methods()
+            else None
+        )
+        self.pool = multiprocessing.get_context(start_method).Pool(
+            processes=workers,
+            initializer=warm_up,
+            initargs=(from_date, to_date),
+        )
+
+    def map(
+        self, function: Callable[[T], R], tasks: Iterable[T]
+    ) -> Iterator[R]:
+        """Lazily yield the results of [function] (a module-level function) for all [tasks], in the order of [tasks]."""
+        return self.pool.imap(function, tasks)
+
+    def map_unordered(
+        self, function: Callable[[T], R], tasks: Iterable[T]
+    ) -> Iterator[R]:
+        """
+        Lazily yield the results of [function] for all [tasks] as soon as they are done, so one slow task does not hold
+        back the results of the others. [tasks] may be endless (e.g. lines of stdin), they are consumed as they come.
+        """
+        return self.pool.imap_unordered(function, tasks)
+
+    def __enter__(self) -> 'WarmPool':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            self.pool.close()
+        else:
+            self.pool.terminate()
+        self.pool.join()
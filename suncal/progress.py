@@ -0,0 +1,166 @@
+"""
+Progress of long runs: the days that are calculated, the events that are found and the events that are uploaded, with
+their throughput and the estimated time until the calculation is done. Snapshots are passed to a callback at most
+every [interval] seconds, so reporting costs nothing per day; ConsoleReporter is the callback of the CLI. Days on which
+an event does not exist are counted per event and summarized at the end instead of being printed one by one.
+"""
+
+import datetime as dt
+import sys
+import time
+from typing import Callable
+from typing import TextIO
+
+from pydantic import BaseModel  # pylint: disable=E0611
+
+
+class ProgressSnapshot(BaseModel):
+    """
+    State of a run after [elapsed] seconds: [days] of [total_days] (None if unknown) calculated, [events] found and
+    [uploaded] events confirmed by Google Calendar. [eta_seconds] is the remaining time of the calculation at the
+    current throughput.
+    """
+
+    days: int = 0
+    total_days: int | None = None
+    events: int = 0
+    uploaded: int = 0
+    elapsed: float = 0.0
+    days_per_second: float = 0.0
+    events_per_second: float = 0.0
+    eta_seconds: float | None = None
+    finished: bool = False
+
+    def line(self) -> str:
+        """One-line description, e.g. "120/365 days (33%), 118 events, 12.0 days/s, 11.8 events/s, ETA 0:00:20"."""
+        days = f"{self.days} days"
+        if self.total_days:
+            days = f"{self.days}/{self.total_days} days ({100 * self.days // self.total_days}%)"
+        parts = [days, f"{self.events} events"]
+        if self.uploaded:
+            parts.append(f"{self.uploaded} uploaded")
+        parts += [
+            f"{self.days_per_second:.1f} days/s",
+            f"{self.events_per_second:.1f} events/s",
+        ]
+        if self.finished:
+            parts.append(f"done in {dt.timedelta(seconds=round(self.elapsed))}")
+        elif self.eta_seconds is not None:
+            parts.append(f"ETA {dt.timedelta(seconds=round(self.eta_seconds))}")
+        return ', '.join(parts)
+
+
+ProgressCallback = Callable[[ProgressSnapshot], None]
+
+
+class MissingEvents(BaseModel):
+    """Number of days on which an event does not exist and the [first] and [last] of them."""
+
+    days: int = 0
+    first: dt.date | None = None
+    last: dt.date | None = None
+
+
+class Progress:
+    """
+    Counts the progress of a run of [total_days] days (None if unknown; for several locations, the sum of their days)
+    and passes a snapshot to [callback] at most every [interval] seconds and once more when the run is finished.
+    """
+
+    def __init__(
+        self,
+        total_days: int | None = None,
+        callback: ProgressCallback | None = None,
+        interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.total_days = total_days
+        self.callback = callback
+        self.interval = interval
+        self.clock = clock
+        self.started = clock()
+        self.reported = self.started
+        self.days = 0
+        self.events = 0
+        self.uploaded = 0
+        self.missing: dict[str, MissingEvents] = {}
+
+    def add_days(self, days: int = 1, events: int = 0) -> None:
+        """[days] were calculated, [events] were found on them."""
+        self.days += days
+        self.events += events
+        self.report()
+
+    def add_uploaded(self, events: int = 1) -> None:
+        self.uploaded += events
+        self.report()
+
+    def no_event(self, event: str, date: dt.date) -> None:
+        """[event] does not exist on [date] (e.g. the sun does not rise during the polar night)."""
+        missing = self.missing.setdefault(event, MissingEvents())
+        missing.days += 1
+        if missing.first is None or date < missing.first:
+            missing.first = date
+        if missing.last is None or date > missing.last:
+            missing.last = date
+
+    def snapshot(self, finished: bool = False) -> ProgressSnapshot:
+        elapsed = self.clock() - self.started
+        days_per_second = self.days / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total_days is not None and days_per_second > 0:
+            eta = max(self.total_days - self.days, 0) / days_per_second
+        return ProgressSnapshot(
+            days=self.days,
+            total_days=self.total_days,
+            events=self.events,
+            uploaded=self.uploaded,
+            elapsed=elapsed,
+            days_per_second=days_per_second,
+            events_per_second=self.events / elapsed if elapsed > 0 else 0.0,
+            eta_seconds=eta,
+            finished=finished,
+        )
+
+    def report(self) -> None:
+        if self.callback is None:
+            return
+        now = self.clock()
+        if now - self.reported >= self.interval:
+            self.reported = now
+            self.callback(self.snapshot())
+
+    def finish(self) -> ProgressSnapshot:
+        """Final snapshot, it is always passed to the callback."""
+        snapshot = self.snapshot(finished=True)
+        if self.callback is not None:
+            self.callback(snapshot)
+        return snapshot
+
+    def missing_summary(self) -> list[str]:
+        """One line per event that does not exist on some of the days, e.g. "No sunrise on 45 of 365 days (...)"."""
+        return [
+            f"No {event} on {missing.days} of {self.total_days or self.days} days "
+            f"(the first on {missing.first}, the last on {missing.last})."
+            for event, missing in self.missing.items()
+        ]
+
+
+class ConsoleReporter:
+    """
+    Progress callback that keeps one line on [stream] (default: stderr) up to date. Nothing is written if [stream] is
+    not a terminal (e.g. piped to a file or run by cron), so logs do not fill up with progress lines.
+    """
+
+    def __init__(self, stream: TextIO | None = None):
+        self.stream = stream or sys.stderr
+        self.enabled = self.stream.isatty()
+
+    def __call__(self, snapshot: ProgressSnapshot) -> None:
+        if not self.enabled:
+            return
+        # rewrite the line in place and clear the rest of it
+        self.stream.write(f"\r{snapshot.line()}\x1b[K")
+        if snapshot.finished:
+            self.stream.write('\n')
+        self.stream.flush()
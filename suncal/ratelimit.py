@@ -0,0 +1,218 @@
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Callable
+from typing import Iterator
+
+from pydantic import BaseModel  # pylint: disable=E0611
+
+try:
+    import fcntl
+except (
+    ImportError
+):  # not available on Windows, the shared state file is then used without a lock
+    fcntl = None  # type: ignore
+
+# default quota of the Google Calendar API: 600 requests per minute and user. Every request within a batch request
+# counts against the quota.
+DEFAULT_USER_RATE = 10.0
+
+# max number of requests per batch request that the Google Calendar API accepts reliably
+MAX_BATCH_SIZE = 50
+
+# default max number of attempts per request (the first one and the retries after rate limit or server errors), the
+# requests that still fail afterwards are counted as failed
+MAX_ATTEMPTS = 8
+
+# max delay before server errors are retried, the delay is jittered between half of it and all of it
+SERVER_ERROR_DELAY = 0.5
+
+# file in which suncal processes that share a Google cloud project keep the state of the project budget
+QUOTA_STATE_FILE = "quota.json"
+
+
+class TokenBucket:
+    """
+    Token bucket that allows [rate] requests per second on average and bursts of up to [capacity] requests. If a
+    [state_file] is provided, the bucket is kept in this file (guarded by a lock on [state_file].lock), so that all
+    processes that use the same file share the budget.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        state_file: str | None = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        assert rate > 0, "rate must be > 0."
+        self.rate = rate
+        self.capacity = capacity or max(rate, MAX_BATCH_SIZE)
+        self.state_file = state_file
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    @contextmanager
+    def locked_state(self) -> Iterator[None]:
+        """Load the state of the bucket from the state file (if any) and write it back after the update."""
+        if self.state_file is None:
+            yield
+            return
+
+        with open(self.state_file + '.lock', 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(self.state_file):
+                    with open(self.state_file) as f:
+                        state = json.load(f)
+                    self.tokens = min(state['tokens'], self.capacity)
+                    self.updated = state['updated']
+                yield
+                with open(self.state_file, 'w') as f:
+                    json.dump(
+                        {'tokens': self.tokens, 'updated': self.updated}, f
+                    )
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def try_acquire(self, n: float) -> float:
+        """Take [n] tokens if available and return 0, otherwise take none and return the time to wait for them."""
+        with self.locked_state():
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= n:
+                self.tokens -= n
+                return 0.0
+            return (n - self.tokens) / self.rate
+
+    def acquire(self, n: int = 1) -> float:
+        """Block until [n] tokens were taken from the bucket. Return the time spent waiting."""
+        waited = 0.0
+        while n > 0:
+            # requests for more tokens than the bucket can hold are served in parts
+            part = min(n, self.capacity)
+            wait = self.try_acquire(part)
+            if wait > 0:
+                self.sleep(wait)
+                waited += wait
+                continue
+            n -= int(part)
+        return waited
+
+
+class AdaptiveBatchSize:
+    """
+    Size of the next batch request: halved after a response with rate limit errors, grown by a quarter (at least by
+    one) after a successful batch, always between [min_size] and [max_size].
+    """
+
+    def __init__(
+        self,
+        initial: int = MAX_BATCH_SIZE,
+        min_size: int = 1,
+        max_size: int = MAX_BATCH_SIZE,
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = max(min_size, min(initial, max_size))
+
+    def shrink(self) -> None:
+        self.size = max(self.min_size, self.size // 2)
+
+    def grow(self) -> None:
+        self.size = min(self.max_size, self.size + max(1, self.size // 4))
+
+
+class ExportMetrics(BaseModel):
+    """Counters of a batched export to (or deletion from) Google Calendar."""
+
+    requests: int = 0  # requests sent, including retries
+    succeeded: int = 0
+    failed: int = 0
+    # requests that were answered with a rate limit error (and retried)
+    rate_limited: int = 0
+    # requests that were answered with a transient server error (and retried)
+    server_errors: int = 0
+    batches: int = 0
+    # time spent waiting for the rate limiter and backoff
+    waited_seconds: float = 0.0
+    batch_size: int = 0  # batch size at the end of the export
+
+    def summary(self) -> str:
+        return (
+            f"{self.succeeded} succeeded, {self.failed} failed, {self.rate_limited} rate limited, "
+            f"{self.server_errors} server errors "
+            f"({self.requests} requests in {self.batches} batches, {self.waited_seconds:.1f}s waiting for quota, "
+            f"final batch size {self.batch_size})"
+        )
+
+
+class RateLimiter:
+    """
+    Rate limiter for the Google Calendar API with a per-user budget ([user_rate] requests per second, local to this
+    process) and an optional per-project budget ([project_rate]) that is shared with other processes via
+    [state_file]. Also keeps track of the adaptive batch size and the consecutive rate limit responses for the
+    exponential backoff. Requests are sent at most [max_attempts] times.
+    """
+
+    def __init__(
+        self,
+        user_rate: float = DEFAULT_USER_RATE,
+        project_rate: float | None = None,
+        state_file: str | None = QUOTA_STATE_FILE,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_attempts: int = MAX_ATTEMPTS,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.buckets = [TokenBucket(user_rate, clock=clock, sleep=sleep)]
+        if project_rate is not None:
+            self.buckets.append(
+                TokenBucket(
+                    project_rate,
+                    state_file=state_file,
+                    clock=clock,
+                    sleep=sleep,
+                )
+            )
+        self.batch_size = AdaptiveBatchSize(max_size=max_batch_size)
+        self.sleep = sleep
+        self.consecutive_rate_limits = 0
+        assert max_attempts >= 1, "max_attempts must be >= 1."
+        self.max_attempts = max_attempts
+
+    def acquire(self, n: int) -> float:
+        """Block until [n] requests may be sent. Return the time spent waiting."""
+        return sum(bucket.acquire(n) for bucket in self.buckets)
+
+    def success(self) -> None:
+        self.consecutive_rate_limits = 0
+        self.batch_size.grow()
+
+    def rate_limited(self) -> float:
+        """Shrink the batch size and wait (exponential backoff, max 64s). Return the time spent waiting."""
+        self.batch_size.shrink()
+        wait = float(min(2**self.consecutive_rate_limits, 64))
+        self.consecutive_rate_limits += 1
+        self.sleep(wait)
+        return wait
+
+    def server_error(self) -> float:
+        """
+        Wait a short, jittered delay before requests that failed with a server error are retried. Server errors are
+        no sign of too many requests, so the batch size and the backoff of rate limits are kept. Return the time spent
+        waiting.
+        """
+        wait = random.uniform(SERVER_ERROR_DELAY / 2, SERVER_ERROR_DELAY)
+        self.sleep(wait)
+        return wait
@@ -1,44 +1,76 @@
 import datetime as dt
+import os
+import sys
+from typing import Iterable
+from typing import Iterator
 
 import click
 from timezonefinder import TimezoneFinder
 
-from suncal.auth import get_credentials
+from suncal.accuracy import CASES
+from suncal.accuracy import ENGINES
+from suncal.accuracy import Thresholds
+from suncal.accuracy import random_cases
+from suncal.accuracy import run_accuracy
+from suncal.almanac import ALMANAC_ENV_VAR
+from suncal.almanac import ALMANAC_FILE
+from suncal.almanac import build_almanac
+from suncal.batch import location_of
+from suncal.bench import ENGINES as BENCH_ENGINES
+from suncal.bench import EVENT_SETS
+from suncal.bench import run_bench
+from suncal.bench import scenarios
+from suncal.cli import ClickCoordinates
+from suncal.cli import ClickDate
 from suncal.cli import common_suncal_options
+from suncal.cli import event_location_options
+from suncal.dates import DateSelection
+from suncal.ephemeris import TRIMMED_EPHEMERIS
+from suncal.ephemeris import build_trimmed_ephemeris
+from suncal.ephemeris import split_by_kernel
+from suncal.events import iter_calendar_events
+from suncal.events import iter_celestial_events
+from suncal.fileio import RECORD_WRITERS
 from suncal.fileio import export_events_to_ics
-from suncal.models.astro import CALC
+from suncal.fileio import export_events_to_ics_shards
+from suncal.fileio import export_marker
+from suncal.fileio import export_records
+from suncal.fileio import ics_filename
+from suncal.fileio import iter_year_shards
+from suncal.fileio import location_key
+from suncal.maintain import DEFAULT_WINDOW_DAYS
+from suncal.maintain import MAINTAIN_STATE_FILE
+from suncal.maintain import Maintenance
+from suncal.maintain import load_watermarks
+from suncal.maintain import plan_maintenance
+from suncal.maintain import save_watermark
+from suncal.maintain import update_ics_file
+from suncal.maintain import watermark_key
+from suncal.models.astro import CALENDAR_PRECISION
+from suncal.models.astro import EVENT_KINDS
+from suncal.models.astro import PRECISIONS
 from suncal.models.astro import Location
-from suncal.models.googlecal import GoogleCalEvent
-from suncal.models.googlecal import export_events_to_google_calendar
-from suncal.models.googlecal import get_sun_calendar_id
+from suncal.models.calendar import CalendarEvent
+from suncal.models.records import EventRecord
+from suncal.progress import ConsoleReporter
+from suncal.progress import Progress
+from suncal.progress import ProgressCallback
+from suncal.ratelimit import DEFAULT_USER_RATE
+from suncal.ratelimit import MAX_ATTEMPTS
+from suncal.ratelimit import QUOTA_STATE_FILE
+from suncal.ratelimit import RateLimiter
 from suncal.utils import collect_cli_arguments
-from suncal.utils import date_range
+from suncal.utils import get_timezone
+from suncal.utils import peek
+from suncal.utils import set_validation
+from suncal.utils import time_range_of_date
 
-SCOPES = [
-    "https://www.googleapis.com/auth/calendar",
-    "https://www.googleapis.com/auth/calendar.events",
-]
 
-
-def create_calendar_events(
-    event: str, from_date: dt.date, to_date: dt.date, location: Location
-) -> list[GoogleCalEvent]:
-    """
-    Calculate event times for any of the events of type suncal.models.astro.Event between [from_date] and [to_date].
-    If the events exist, export them to a GoogleCalEvent and append them to the list of calendar events.
-    """
-
-    calendar_events: list = []
-    dates = date_range(from_date, to_date)
-
-    for date in dates:
-        celestial_event = CALC[event](date, location)
-        if celestial_event:
-            calendar_events.append(
-                GoogleCalEvent.from_celestial_event(celestial_event)
-            )
-
-    return calendar_events
+def finish_progress(progress: Progress) -> None:
+    """End the progress line and print the summary of the days on which the event does not exist."""
+    progress.finish()
+    for line in progress.missing_summary():
+        click.echo(line)
 
 
 def suncal_main(
@@ -51,14 +83,38 @@ def suncal_main(
     timezone: str | None = None,
     filename: str | None = None,
     calendar_title: str | None = None,
+    shard_by: str | None = None,
+    workers: int = 1,
+    compress: bool = False,
+    write_index: bool = False,
+    replace: bool = False,
+    limiter: RateLimiter | None = None,
+    resume: bool = False,
+    dates: DateSelection | None = None,
+    precision: str | None = None,
+    progress: ProgressCallback | None = None,
 ) -> None:
     """
     Project main function. Creates events for the specified [event_name] between [from_date] and [to_date] for the
-    location specified by [longitude] and [latitude]. The events are then exported to a Google Calendar or an ics file
-    depending on the value of [return_val].
+    location specified by [longitude] and [latitude]. The events are then exported to a Google Calendar ("api"), an ics
+    file ("ics") or a file in one of the bulk export formats ("ndjson", "csv", "parquet") depending on the value of
+    [return_val]. ics files can be sharded by "year" or "location" ([shard_by]), in which case [filename] is the name
+    of the output directory. With [replace], the events of the same kind that suncal created before in the Google
+    Calendar between [from_date] and [to_date] are deleted first. Requests to Google are throttled by [limiter].
+    Confirmed inserts are journaled, with [resume] an interrupted export only sends the events that are missing. With
+    a selection of [dates], events are only calculated and exported for the selected dates of the range. The event
+    times are calculated with the given [precision] (see suncal.models.astro.PRECISIONS), by default with minute
+    precision for calendars (the events show hours and minutes) and exactly for the bulk export formats. Snapshots of
+    the progress are passed to the [progress] callback (default: a line on the terminal), the days without an event
+    are summarized at the end.
     """
 
     assert to_date >= from_date, "to_date must be >= from_date."
+    try:
+        # fail early if the range is not covered by any ephemeris
+        split_by_kernel(from_date, to_date)
+    except ValueError as e:
+        raise click.UsageError(str(e)) from e
 
     tf = TimezoneFinder()
     timezone = timezone or tf.timezone_at(lng=longitude, lat=latitude)
@@ -67,13 +123,62 @@ def suncal_main(
         timezone=timezone, longitude=longitude, latitude=latitude
     )
 
-    events: list[GoogleCalEvent] = create_calendar_events(
-        event_name, from_date, to_date, location
+    if precision is None:
+        precision = (
+            'exact' if return_val in RECORD_WRITERS else CALENDAR_PRECISION
+        )
+
+    run_progress = Progress(
+        total_days=(
+            (to_date - from_date).days + 1
+            if dates is None
+            else sum(1 for _ in dates.iter_dates(from_date, to_date))
+        ),
+        callback=progress or ConsoleReporter(),
+    )
+    # events are streamed from the calculation to the sink, we only compute the first one upfront to know whether
+    # there is anything to export at all
+    first_event, celestial_events = peek(
+        iter_celestial_events(
+            event_name,
+            from_date,
+            to_date,
+            location,
+            dates,
+            precision,
+            run_progress,
+        )
     )
 
-    if events:
+    if first_event is None:
+        click.echo(
+            f"*** {event_name.title()} could not be calculated for the specified location on any of the provided dates."
+            f"No calendar events created. ***"
+        )
+    # with [replace], the old events of the range are deleted even if there are no new ones
+    if first_event is not None or (return_val == "api" and replace):
+
+        if return_val in RECORD_WRITERS:
+            records = (
+                EventRecord.from_celestial_event(event_name, c_event, location)
+                for c_event in celestial_events
+            )
+            export_records(records, event_name, filename, return_val)
+            finish_progress(run_progress)
+            return
+
+        events = (
+            CalendarEvent.from_celestial_event(c_event)
+            for c_event in celestial_events
+        )
 
         if return_val == "api":
+            # imported on use, the Google client libraries are slow to import and only needed by the api sink
+            from suncal.auth import SCOPES
+            from suncal.auth import get_credentials
+            from suncal.models.googlecal import get_sun_calendar_id
+            from suncal.models.googlecal import replace_in_google_calendar
+
             assert calendar_title is not None
             assert timezone is not None
 
@@ -85,25 +190,191 @@ def suncal_main(
                 calendar_title, timezone, credentials
             )
 
-            export_events_to_google_calendar(
-                google_calendar_id, events, credentials
+            replace_in_google_calendar(
+                google_calendar_id,
+                event_name,
+                events,
+                from_date,
+                to_date,
+                location,
+                credentials,
+                replace=replace,
+                limiter=limiter,
+                resume=resume,
+                progress=run_progress,
+            )
+
+        elif shard_by is not None:
+            # export events to one ics file per shard in the directory with the specified name, the single shard of
+            # the location is streamed into its file
+            shards: Iterator[tuple[str, Iterable[CalendarEvent]]] = (
+                iter_year_shards(events)
+                if shard_by == "year"
+                else iter([(location_key(location), events)])
+            )
+            export_events_to_ics_shards(
+                shards,
+                event_name,
+                directory=filename
+                or ics_filename(event_name, dt.datetime.now()).removesuffix(
+                    '.ics'
+                ),
+                workers=workers,
+                compress=compress,
+                write_index=write_index,
             )
 
         else:
             # export events to ics file with specified name
             export_events_to_ics(events, event_name, filename)
 
+    finish_progress(run_progress)
+
+
+def suncal_maintain(
+    event_name: str,
+    longitude: float,
+    latitude: float,
+    sink: str,
+    days: int = DEFAULT_WINDOW_DAYS,
+    prune: bool = False,
+    state_file: str = MAINTAIN_STATE_FILE,
+    timezone: str | None = None,
+    filename: str | None = None,
+    calendar_title: str | None = None,
+    today: dt.date | None = None,
+    limiter: RateLimiter | None = None,
+    precision: str = CALENDAR_PRECISION,
+    progress: ProgressCallback | None = None,
+) -> Maintenance:
+    """
+    Keep the calendar of [event_name] at [longitude]/[latitude] filled for the window of [days] days from [today]
+    (default: the current local date). Only the days after the watermark of the calendar in [state_file] are
+    calculated and pushed to the [sink], the ics file [filename] ("ics") or the Google Calendar [calendar_title]
+    ("api"). With [prune], the days before the window are deleted. The watermark only moves once the sink is updated,
+    so an interrupted run is repeated by the next one. The event times are calculated with the given [precision], the
+    [progress] of the calculation and upload is reported like in suncal_main.
+    """
+    location = location_of(latitude, longitude, timezone)
+    today = today or dt.datetime.now(get_timezone(location.timezone)).date()
+
+    if sink == "ics":
+        assert filename is not None
+        if not filename.endswith('.ics'):
+            filename += '.ics'
+        key = watermark_key(
+            sink, os.path.abspath(filename), event_name, location
+        )
     else:
+        # imported on use, see suncal_main
+        from suncal.auth import SCOPES
+        from suncal.auth import get_credentials
+        from suncal.models.googlecal import delete_marked_events
+        from suncal.models.googlecal import get_sun_calendar_id
+        from suncal.models.googlecal import replace_in_google_calendar
+
+        assert calendar_title is not None
+        credentials = get_credentials(SCOPES)
+        google_calendar_id = get_sun_calendar_id(
+            calendar_title, location.timezone, credentials
+        )
+        key = watermark_key(sink, google_calendar_id, event_name, location)
+
+    maintenance = plan_maintenance(
+        load_watermarks(state_file).get(key), today, days, prune
+    )
+    click.echo(maintenance.summary())
+    run_progress = Progress(callback=progress or ConsoleReporter())
+    if maintenance.new_from is not None and maintenance.new_to is not None:
+        run_progress.total_days = (
+            maintenance.new_to - maintenance.new_from
+        ).days + 1
+        try:
+            # fail early if the range is not covered by any ephemeris
+            split_by_kernel(maintenance.new_from, maintenance.new_to)
+        except ValueError as e:
+            raise click.UsageError(str(e)) from e
+        events: Iterator[CalendarEvent] = iter_calendar_events(
+            event_name,
+            maintenance.new_from,
+            maintenance.new_to,
+            location,
+            precision=precision,
+            progress=run_progress,
+        )
+    else:
+        events = iter([])
+
+    if sink == "ics":
+        assert filename is not None
+        prune_before = (
+            maintenance.watermark.from_date
+            if maintenance.prune_from is not None
+            else None
+        )
+        # a fresh start only replaces the events of this event and location, other ones in the same file are kept
+        added, pruned = update_ics_file(
+            filename,
+            events,
+            prune_before,
+            location.timezone,
+            export_marker(event_name, location),
+            replace=maintenance.fresh,
+        )
         click.echo(
-            f"*** {event_name.title()} could not be calculated for the specified location on any of the provided dates."
-            f"No calendar events created. ***"
+            f"{added} events added to and {pruned} removed from {filename}."
         )
 
+    else:
+        if (
+            maintenance.prune_from is not None
+            and maintenance.prune_to is not None
+        ):
+            time_min, _ = time_range_of_date(
+                maintenance.prune_from, location.timezone
+            )
+            _, time_max = time_range_of_date(
+                maintenance.prune_to, location.timezone
+            )
+            delete_marked_events(
+                google_calendar_id,
+                export_marker(event_name, location),
+                time_min,
+                time_max,
+                credentials,
+                limiter=limiter,
+            )
+        if maintenance.new_from is not None and maintenance.new_to is not None:
+            # events of an interrupted run (pushed, but not recorded in the watermark) are replaced
+            replace_in_google_calendar(
+                google_calendar_id,
+                event_name,
+                events,
+                maintenance.new_from,
+                maintenance.new_to,
+                location,
+                credentials,
+                replace=True,
+                limiter=limiter,
+                progress=run_progress,
+            )
+
+    finish_progress(run_progress)
+    save_watermark(state_file, key, maintenance.watermark)
+    return maintenance
+
 
 # root command "suncal"  -----------------------------------------------------------------------------------------------
 @click.group()
-def suncal():
-    pass
+@click.option(
+    "--validate",
+    is_flag=True,
+    default=False,
+    help="Validate all events that suncal creates internally (slower, for debugging).",
+)
+def suncal(validate: bool) -> None:
+    if validate:
+        set_validation(True)
 
 
 # sub-command "api" ----------------------------------------------------------------------------------------------------
@@ -116,19 +387,72 @@ def suncal():
     required=True,
     help="Google calendar name.",
 )
+@click.option(
+    "--replace/--no-replace",
+    default=False,
+    help="Delete the events of the same kind that suncal created before in the date range, then insert the new ones.",
+)
+@click.option(
+    "--user-rate",
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_USER_RATE,
+    show_default=True,
+    help="Max requests per second to Google Calendar for this user.",
+)
+@click.option(
+    "--project-rate",
+    type=click.FloatRange(min=0, min_open=True),
+    required=False,
+    help="Max requests per second to Google Calendar for the whole cloud project, shared by all suncal processes "
+    "that use the same --quota-state file. Optional.",
+)
+@click.option(
+    "--quota-state",
+    type=click.STRING,
+    default=QUOTA_STATE_FILE,
+    show_default=True,
+    help="State file of the project budget (--project-rate).",
+)
+@click.option(
+    "--max-attempts",
+    type=click.IntRange(min=1),
+    default=MAX_ATTEMPTS,
+    show_default=True,
+    help="Max attempts per event after rate limit or server errors, the events that still fail are counted as failed.",
+)
+@click.option(
+    "--resume/--no-resume",
+    default=False,
+    help="Continue an interrupted export: skip all events that were already created.",
+)
 def api(
     dev_mode: bool,
     calendar_title: str,
+    replace: bool,
+    user_rate: float,
+    project_rate: float | None,
+    quota_state: str,
+    max_attempts: int,
+    resume: bool,
     from_date: dt.date,
     to_date: dt.date,
     event_name: str,
     timezone: str,
     longitude: float,
     latitude: float,
+    precision: str | None,
+    weekdays: set[int] | None,
+    rrule: str | None,
+    dates_file: str | None,
 ) -> None:
     """Calculate suncal.models.astro.Event for provided range of dates and export calendar events directly
     to Google Calendar.
     """
+    try:
+        dates = DateSelection.from_options(weekdays, rrule, dates_file)
+    except ValueError as e:
+        raise click.UsageError(str(e)) from e
+
     if not dev_mode:
         suncal_main(
             calendar_title=calendar_title,
@@ -139,18 +463,36 @@ def api(
             longitude=longitude,
             latitude=latitude,
             return_val="api",
+            replace=replace,
+            limiter=RateLimiter(
+                user_rate=user_rate,
+                project_rate=project_rate,
+                state_file=quota_state,
+                max_attempts=max_attempts,
+            ),
+            resume=resume,
+            dates=dates,
+            precision=precision.lower() if precision else None,
         )
     else:
         # print all parsed arguments to the console (as dict)
         collect_cli_arguments(
             dev_mode=dev_mode,
             calendar_title=calendar_title,
+            replace=replace,
+            user_rate=user_rate,
+            project_rate=project_rate,
+            quota_state=quota_state,
+            max_attempts=max_attempts,
+            resume=resume,
             from_date=from_date,
             to_date=to_date,
             event=event_name,
             timezone=timezone,
             longitude=longitude,
             latitude=latitude,
+            dates=dates,
+            precision=precision,
         )
 
 
@@ -161,7 +503,33 @@ def api(
     "--filename",
     type=click.STRING,
     required=False,
-    help="Name of ics file. Optional.",
+    help="Name of ics file (or of the output directory if --shard-by is used). Optional.",
+)
+@click.option(
+    "--shard-by",
+    "shard_by",
+    type=click.Choice(["year", "location"], case_sensitive=False),
+    required=False,
+    help="Write one ics file per year or per location instead of a single file. Optional.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of processes that render and write the shards in parallel (only with --shard-by year).",
+)
+@click.option(
+    "--gzip/--no-gzip",
+    "compress",
+    default=False,
+    help="Gzip-compress the shards.",
+)
+@click.option(
+    "--index/--no-index",
+    "write_index",
+    default=False,
+    help="Write an index.json with all shards to the output directory.",
 )
 def ics(
     dev_mode: bool,
@@ -170,12 +538,35 @@ def ics(
     event_name: str,
     longitude: float,
     latitude: float,
+    precision: str | None,
+    weekdays: set[int] | None,
+    rrule: str | None,
+    dates_file: str | None,
     timezone: str,
+    workers: int,
+    compress: bool,
+    write_index: bool,
     filename: str | None = None,
+    shard_by: str | None = None,
 ) -> None:
     """
     Calculate suncal.models.astro.Event for provided range of dates and export them to ics file.
     """
+    if shard_by is None and (workers > 1 or compress or write_index):
+        raise click.UsageError(
+            "--workers, --gzip and --index can only be used together with --shard-by."
+        )
+    if shard_by == "location" and workers > 1:
+        raise click.UsageError(
+            "--workers can only be used with --shard-by year: a single location is one shard, which is streamed "
+            "into its file by this process."
+        )
+
+    try:
+        dates = DateSelection.from_options(weekdays, rrule, dates_file)
+    except ValueError as e:
+        raise click.UsageError(str(e)) from e
+
     if not dev_mode:
         suncal_main(
             from_date=from_date,
@@ -186,6 +577,12 @@ def ics(
             return_val="ics",
             filename=filename,
             timezone=timezone,
+            shard_by=shard_by.lower() if shard_by else None,
+            workers=workers,
+            compress=compress,
+            write_index=write_index,
+            dates=dates,
+            precision=precision.lower() if precision else None,
         )
     else:
         # print all parsed arguments to the console (as dict)
@@ -198,4 +595,586 @@ def ics(
             latitude=latitude,
             filename=filename,
             timezone=timezone,
+            shard_by=shard_by,
+            workers=workers,
+            compress=compress,
+            write_index=write_index,
+            dates=dates,
+            precision=precision,
         )
+
+
+# sub-command "export" -------------------------------------------------------------------------------------------------
+@suncal.command()
+@common_suncal_options
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(list(RECORD_WRITERS), case_sensitive=False),
+    required=True,
+    help="Machine-readable file format. parquet requires the optional dependency pyarrow.",
+)
+@click.option(
+    "--filename",
+    type=click.STRING,
+    required=False,
+    help="Name of export file. Optional.",
+)
+def export(
+    dev_mode: bool,
+    from_date: dt.date,
+    to_date: dt.date,
+    event_name: str,
+    longitude: float,
+    latitude: float,
+    precision: str | None,
+    weekdays: set[int] | None,
+    rrule: str | None,
+    dates_file: str | None,
+    timezone: str,
+    file_format: str,
+    filename: str | None = None,
+) -> None:
+    """
+    Calculate suncal.models.astro.Event for provided range of dates and export the raw event records to an ndjson,
+    csv or parquet file.
+    """
+    try:
+        dates = DateSelection.from_options(weekdays, rrule, dates_file)
+    except ValueError as e:
+        raise click.UsageError(str(e)) from e
+
+    if not dev_mode:
+        suncal_main(
+            from_date=from_date,
+            to_date=to_date,
+            event_name=event_name,
+            longitude=longitude,
+            latitude=latitude,
+            return_val=file_format.lower(),
+            filename=filename,
+            timezone=timezone,
+            dates=dates,
+            precision=precision.lower() if precision else None,
+        )
+    else:
+        # print all parsed arguments to the console (as dict)
+        collect_cli_arguments(
+            dev_mode=dev_mode,
+            from_date=from_date,
+            to_date=to_date,
+            event=event_name,
+            longitude=longitude,
+            latitude=latitude,
+            file_format=file_format,
+            filename=filename,
+            timezone=timezone,
+            dates=dates,
+            precision=precision,
+        )
+
+
+# sub-command "maintain" -----------------------------------------------------------------------------------------------
+@suncal.command()
+@event_location_options
+@click.option(
+    "--sink",
+    type=click.Choice(["ics", "api"], case_sensitive=False),
+    required=True,
+    help="Maintain an ics file (--filename) or a Google calendar (--cal).",
+)
+@click.option(
+    "--filename",
+    type=click.STRING,
+    required=False,
+    help="Name of the maintained ics file.",
+)
+@click.option(
+    "--cal",
+    "calendar_title",
+    type=click.STRING,
+    required=False,
+    help="Name of the maintained Google calendar.",
+)
+@click.option(
+    "--days",
+    type=click.IntRange(min=1),
+    default=DEFAULT_WINDOW_DAYS,
+    show_default=True,
+    help="Number of days from today that the calendar covers.",
+)
+@click.option(
+    "--prune/--no-prune",
+    default=False,
+    help="Delete the events of the days before today.",
+)
+@click.option(
+    "--state",
+    "state_file",
+    type=click.STRING,
+    default=MAINTAIN_STATE_FILE,
+    show_default=True,
+    help="State file with the watermarks (last covered date) of all maintained calendars.",
+)
+@click.option(
+    "--today",
+    type=ClickDate(),
+    required=False,
+    help="First date of the window (default: the current date at the location). Optional.",
+)
+def maintain(
+    dev_mode: bool,
+    event_name: str,
+    longitude: float,
+    latitude: float,
+    precision: str | None,
+    timezone: str | None,
+    sink: str,
+    filename: str | None,
+    calendar_title: str | None,
+    days: int,
+    prune: bool,
+    state_file: str,
+    today: dt.date | None,
+) -> None:
+    """
+    Keep a calendar filled with suncal.models.astro.Event for a rolling window of days. Only the days that entered the
+    window since the last run are calculated and exported, e.g. when run every night.
+    """
+    sink = sink.lower()
+    if sink == "ics" and filename is None:
+        raise click.UsageError("--sink ics requires --filename.")
+    if sink == "api" and calendar_title is None:
+        raise click.UsageError("--sink api requires --cal.")
+
+    if not dev_mode:
+        suncal_maintain(
+            event_name=event_name,
+            longitude=longitude,
+            latitude=latitude,
+            sink=sink,
+            days=days,
+            prune=prune,
+            state_file=state_file,
+            timezone=timezone,
+            filename=filename,
+            calendar_title=calendar_title,
+            today=today,
+            precision=precision.lower() if precision else CALENDAR_PRECISION,
+        )
+    else:
+        # print all parsed arguments to the console (as dict)
+        collect_cli_arguments(
+            dev_mode=dev_mode,
+            event=event_name,
+            longitude=longitude,
+            latitude=latitude,
+            timezone=timezone,
+            sink=sink,
+            filename=filename,
+            calendar_title=calendar_title,
+            days=days,
+            prune=prune,
+            state_file=state_file,
+            today=today,
+            precision=precision,
+        )
+
+
+# sub-command "run" ----------------------------------------------------------------------------------------------------
+@suncal.command()
+@click.argument("job_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    required=False,
+    help="Number of processes that calculate the events (overrides the job file). Optional.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Only print the plan, do not calculate or export anything.",
+)
+def run(job_file: str, workers: int | None, dry_run: bool) -> None:
+    """
+    Run all tasks of a job file (json or yaml). Overlapping calculations of the tasks are merged into one plan that is
+    calculated once and fanned out to all ics, Google Calendar and bulk export sinks of the job.
+    """
+    from suncal.jobs import build_plan
+    from suncal.jobs import load_job
+    from suncal.jobs import run_plan
+
+    try:
+        job = load_job(job_file)
+        if workers is not None:
+            job.workers = workers
+        plan = build_plan(job)
+    except (ValueError, AssertionError, ImportError) as e:
+        raise click.UsageError(str(e)) from e
+
+    click.echo(plan.summary())
+    if dry_run:
+        for computation in plan.computations:
+            click.echo(
+                f"  {', '.join(computation.events)} at {location_key(computation.location)} "
+                f"({computation.location.timezone}) from {computation.from_date} to {computation.to_date}"
+            )
+        return
+
+    run_plan(job, plan)
+
+
+# sub-command "accuracy" -----------------------------------------------------------------------------------------------
+@suncal.command()
+@click.option(
+    "--engine",
+    "engines",
+    type=click.Choice(list(ENGINES)),
+    multiple=True,
+    help="Engine to verify (repeatable). Default: all.",
+)
+@click.option(
+    "--case",
+    "case_names",
+    type=click.Choice([c.name for c in CASES]),
+    multiple=True,
+    help="Built-in case to calculate (repeatable). Default: all.",
+)
+@click.option(
+    "--samples",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Number of additional cases at random locations and dates.",
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=0,
+    show_default=True,
+    help="Seed of the random cases.",
+)
+@click.option(
+    "--event",
+    "events",
+    type=click.Choice(EVENT_KINDS),
+    multiple=True,
+    help="Event to calculate (repeatable). Default: all.",
+)
+@click.option(
+    "--max-delta",
+    type=click.FloatRange(min=0),
+    required=False,
+    help="Max delta of the event times in seconds. Default: the tolerance of each engine.",
+)
+@click.option(
+    "--max-p99",
+    type=click.FloatRange(min=0),
+    required=False,
+    help="Max 99th percentile of the deltas in seconds. Default: the tolerance of each engine.",
+)
+@click.option(
+    "--max-missing",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Max number of events that an engine misses.",
+)
+@click.option(
+    "--max-extra",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Max number of events that an engine finds in addition.",
+)
+def accuracy(
+    engines: tuple[str, ...],
+    case_names: tuple[str, ...],
+    samples: int,
+    seed: int,
+    events: tuple[str, ...],
+    max_delta: float | None,
+    max_p99: float | None,
+    max_missing: int,
+    max_extra: int,
+) -> None:
+    """
+    Verify alternative engines (batched, lower precision, ...) against the per-day calculations with full precision
+    on polar, equatorial, date line and DST cases and a long range. Prints the report as json and fails if any engine
+    exceeds the thresholds.
+    """
+    cases = [c for c in CASES if not case_names or c.name in case_names]
+    report = run_accuracy(
+        engines=list(engines) or None,
+        cases=cases + random_cases(samples, seed),
+        events=list(events) or None,
+        thresholds=Thresholds(
+            max_delta=max_delta,
+            max_p99=max_p99,
+            max_missing=max_missing,
+            max_extra=max_extra,
+        ),
+    )
+    click.echo(report.model_dump_json(indent=2))
+    if not report.passed:
+        failed = [e.engine for e in report.engines if not e.passed]
+        raise click.ClickException(
+            f"Accuracy check failed for {', '.join(failed)}."
+        )
+
+
+# sub-command "bench" --------------------------------------------------------------------------------------------------
+@suncal.command()
+@click.option(
+    "--event-set",
+    "event_sets",
+    type=click.Choice(list(EVENT_SETS)),
+    multiple=True,
+    default=list(EVENT_SETS),
+    show_default=True,
+    help="Events of the scenarios: only sunrise or all events (repeatable).",
+)
+@click.option(
+    "--days",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[7, 90],
+    show_default=True,
+    help="Length of the range in days (repeatable).",
+)
+@click.option(
+    "--locations",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[1, 4],
+    show_default=True,
+    help="Number of locations (repeatable).",
+)
+@click.option(
+    "--engine",
+    "engines",
+    type=click.Choice(list(BENCH_ENGINES)),
+    multiple=True,
+    default=list(BENCH_ENGINES),
+    show_default=True,
+    help="per_day: every event and day on its own (like ics and api), batch: whole ranges (like compute and run) "
+    "(repeatable).",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=lambda: sorted({1, os.cpu_count() or 1}),
+    show_default="1 and the number of CPUs",
+    help="Number of worker processes (repeatable).",
+)
+@click.option(
+    "--precision",
+    "precisions",
+    type=click.Choice(list(PRECISIONS), case_sensitive=False),
+    multiple=True,
+    default=['exact'],
+    show_default=True,
+    help="Precision of the event times (repeatable).",
+)
+@click.option(
+    "--ics/--no-ics",
+    default=True,
+    show_default=True,
+    help="Render the events as ics.",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    required=False,
+    help="Write the report to this json file instead of printing it.",
+)
+def bench(
+    event_sets: tuple[str, ...],
+    days: tuple[int, ...],
+    locations: tuple[int, ...],
+    engines: tuple[str, ...],
+    workers: tuple[int, ...],
+    precisions: tuple[str, ...],
+    ics: bool,
+    output: str | None,
+) -> None:
+    """
+    Benchmark this machine: every combination of the options is run in a fresh process, cold and warm, and reported
+    with days/sec and events/sec, latency percentiles, peak memory and the cold start as json.
+    """
+    scenario_list = scenarios(
+        list(event_sets),
+        list(days),
+        list(locations),
+        list(engines),
+        list(workers),
+        list(precisions),
+        ics,
+    )
+    report = run_bench(
+        scenario_list,
+        progress=lambda s: click.echo(f"Running {s.name}", err=True),
+    )
+    content = report.model_dump_json(indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(content + '\n')
+        click.echo(
+            f"Report of {len(scenario_list)} scenarios written to {output}."
+        )
+    else:
+        click.echo(content)
+
+
+# sub-command "ephem" --------------------------------------------------------------------------------------------------
+@suncal.group()
+def ephem() -> None:
+    """Manage the ephemeris files that are used for the calculation of events."""
+
+
+@ephem.command()
+@click.option(
+    "--from",
+    "from_date",
+    type=ClickDate(),
+    help="First date that the ephemeris excerpt has to cover.",
+    required=True,
+)
+@click.option(
+    "--to",
+    "to_date",
+    type=ClickDate(),
+    help="Last date that the ephemeris excerpt has to cover.",
+    required=True,
+)
+@click.option(
+    "--filename",
+    type=click.STRING,
+    default=TRIMMED_EPHEMERIS,
+    show_default=True,
+    help="Name of the ephemeris excerpt. suncal only picks up the excerpt automatically if the default name is used.",
+)
+def build(from_date: dt.date, to_date: dt.date, filename: str) -> None:
+    """
+    Write a trimmed ephemeris file that only contains the Earth, Sun and Moon segments for the provided range of
+    dates. It is preferred over the full de421 kernel whenever it covers the requested dates.
+    """
+    if to_date < from_date:
+        raise click.BadParameter("--to must not be before --from.")
+
+    click.echo(f"Writing ephemeris excerpt to {filename} ...")
+    build_trimmed_ephemeris(
+        from_date=from_date, to_date=to_date, filename=filename
+    )
+    click.echo("... Done.")
+
+
+# sub-command "almanac" ------------------------------------------------------------------------------------------------
+@suncal.group()
+def almanac() -> None:
+    """Manage precomputed almanac files, from which the events of known places are read instead of calculated."""
+
+
+@almanac.command(name='build')
+@click.option(
+    "--location",
+    "coordinates",
+    type=ClickCoordinates(),
+    multiple=True,
+    required=True,
+    help="Location as LAT,LONG or LAT,LONG,TIMEZONE (repeatable). The timezone is determined from the coordinates "
+    "if it is not provided.",
+)
+@click.option(
+    "--from",
+    "from_date",
+    type=ClickDate(),
+    help="First date of the almanac.",
+    required=True,
+)
+@click.option(
+    "--to",
+    "to_date",
+    type=ClickDate(),
+    help="Last date of the almanac.",
+    required=True,
+)
+@click.option(
+    "--event",
+    "events",
+    type=click.Choice(EVENT_KINDS),
+    multiple=True,
+    help="Event to include (repeatable). Default: all.",
+)
+@click.option(
+    "--filename",
+    type=click.STRING,
+    default=ALMANAC_FILE,
+    show_default=True,
+    help=f"Name of the almanac file. suncal picks up the default name and the files in {ALMANAC_ENV_VAR} "
+    f"(separated by {os.pathsep!r}).",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of processes that calculate the locations.",
+)
+def build_almanac_file(
+    coordinates: tuple[tuple[float, float, str | None], ...],
+    from_date: dt.date,
+    to_date: dt.date,
+    events: tuple[str, ...],
+    filename: str,
+    workers: int,
+) -> None:
+    """
+    Calculate all events for the provided locations and dates and write them to a compact binary almanac file. ics,
+    api and maintain read the events of these locations from it instead of calculating them.
+    """
+    if to_date < from_date:
+        raise click.BadParameter("--to must not be before --from.")
+    try:
+        split_by_kernel(from_date, to_date)
+        locations = [
+            location_of(latitude, longitude, timezone)
+            for latitude, longitude, timezone in coordinates
+        ]
+    except (ValueError, AssertionError) as e:
+        raise click.UsageError(str(e)) from e
+
+    click.echo(f"Writing almanac to {filename} ...")
+    build_almanac(
+        locations,
+        from_date,
+        to_date,
+        filename=filename,
+        events=list(events) or None,
+        workers=workers,
+        progress=ConsoleReporter(),
+    )
+    click.echo(f"... Done ({os.path.getsize(filename)} bytes).")
+
+
+# sub-command "worker" -------------------------------------------------------------------------------------------------
+@suncal.command()
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of processes that answer requests concurrently.",
+)
+def worker(workers: int) -> None:
+    """
+    Answer requests on stdin until it is closed: one json object per line with the parameters of a calendar (event,
+    from, to, longitude, latitude, optionally timezone, return_val "ics" or "ndjson", precision, weekdays, rrule) and
+    an id. One json response per request is written to stdout, with the ics text or the records or the error.
+    """
+    from suncal.worker import run_worker
+
+    answered = run_worker(sys.stdin, sys.stdout, workers=workers)
+    click.echo(f"Answered {answered} requests.", err=True)
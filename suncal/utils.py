@@ -1,7 +1,101 @@
 import datetime as dt
+import functools
+import itertools
+import os
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+from typing import TypeVar
 
 import click
+import numpy as np
 import pytz
+from pydantic import BaseModel  # pylint: disable=E0611
+from skyfield.timelib import Time
+from timezonefinder import TimezoneFinder
+
+T = TypeVar('T')
+M = TypeVar('M', bound=BaseModel)
+
+# set this environment variable (to anything but "" or "0") to validate all models that suncal creates itself
+VALIDATE_ENV_VAR = 'SUNCAL_VALIDATE'
+
+# the environment variable is only read once, the lookup would be a noticeable cost per created model
+_validate = os.environ.get(VALIDATE_ENV_VAR, '') not in ('', '0')
+
+
+def validation_enabled() -> bool:
+    """Whether the models created by suncal itself are validated (debug mode, see VALIDATE_ENV_VAR)."""
+    return _validate
+
+
+def set_validation(enabled: bool) -> None:
+    """
+    Enable or disable the validation of the models that suncal creates itself. The setting is also exported to the
+    environment, so that worker processes inherit it.
+    """
+    global _validate
+    _validate = enabled
+    os.environ[VALIDATE_ENV_VAR] = '1' if enabled else '0'
+
+
+@functools.lru_cache(maxsize=None)
+def model_defaults(model: type[BaseModel]) -> dict[str, Any]:
+    """Default values of all optional fields of [model] that do not use a default factory."""
+    return {
+        name: field.default
+        for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+
+
+# instance attributes of pydantic models that trusted sets directly. If a pydantic release changes the layout of
+# model instances, trusted falls back to the public (but slower) model_construct
+PYDANTIC_SLOTS = (
+    '__dict__',
+    '__pydantic_fields_set__',
+    '__pydantic_extra__',
+    '__pydantic_private__',
+)
+_fast_construct = tuple(BaseModel.__slots__) == PYDANTIC_SLOTS
+
+
+def trusted(model: type[M], **fields: Any) -> M:
+    """
+    Create an instance of [model] from [fields] that were computed by suncal itself and are known to be valid. The
+    pydantic validation (including all custom validators) is skipped, unless validation is enabled for debugging.
+    Fields have to be passed by name (not by alias). Input from users or other external sources has to be passed to
+    the model constructor as usual.
+    """
+    if _validate:
+        return model(**fields)
+    if not _fast_construct:
+        return model.model_construct(**fields)
+    # same as model.model_construct, but without the handling of aliases, extra fields and private attributes, which
+    # none of the models of suncal use (model_construct is slower than validating small models)
+    instance = model.__new__(model)
+    object.__setattr__(
+        instance, '__dict__', {**model_defaults(model), **fields}
+    )
+    object.__setattr__(instance, '__pydantic_fields_set__', set(fields))
+    object.__setattr__(instance, '__pydantic_extra__', None)
+    object.__setattr__(instance, '__pydantic_private__', None)
+    return instance
+
+
+@functools.lru_cache(maxsize=None)
+def timezone_finder() -> TimezoneFinder:
+    """TimezoneFinder is expensive to create, so one instance is shared by all calls."""
+    return TimezoneFinder()
+
+
+def iter_date_range(date_from: dt.date, date_to: dt.date) -> Iterator[dt.date]:
+    """
+    Lazily yield all dates from [date_from] to [date_to] including the
+    from and to dates.
+    """
+    for i in range((date_to - date_from).days + 1):
+        yield date_from + dt.timedelta(days=i)
 
 
 def date_range(date_from: dt.date, date_to: dt.date) -> list[dt.date]:
@@ -9,10 +103,7 @@ def date_range(date_from: dt.date, date_to: dt.date) -> list[dt.date]:
     Create list of dates from [date_from] to [date_to] including the
     from and to dates.
     """
-    return [
-        date_from + dt.timedelta(days=i)
-        for i in range((date_to - date_from).days + 1)
-    ]
+    return list(iter_date_range(date_from, date_to))
 
 
 def tz_aware_dt(
@@ -24,29 +115,168 @@ def tz_aware_dt(
     assert (
         naive_datetime.tzinfo is None
     ), f"The datetime you provided already is timezone-aware ({naive_datetime.tzinfo})"
-    timezone_obj = pytz.timezone(timezone)
+    timezone_obj = get_timezone(timezone)
     aware_datetime = timezone_obj.localize(naive_datetime)
     return aware_datetime
 
 
+@functools.lru_cache(maxsize=None)
+def get_timezone(timezone: str) -> pytz.BaseTzInfo:
+    """Get the pytz timezone object for the IANA timezone string [timezone] (only looked up once per process)."""
+    return pytz.timezone(timezone)
+
+
+@functools.lru_cache(maxsize=None)
+def utc_transitions(
+    timezone: str,
+) -> tuple[np.ndarray, np.ndarray, list[dt.tzinfo]]:
+    """
+    Transition table of [timezone] as arrays: UTC seconds since epoch at which a new UTC offset takes effect, the UTC
+    offsets in seconds and the pytz tzinfo objects that belong to them. Timezones without transitions (e.g. UTC) are
+    represented by a single entry that is valid since the beginning of time.
+    """
+    tz = get_timezone(timezone)
+    if not isinstance(tz, pytz.tzinfo.DstTzInfo):
+        offset = tz.utcoffset(dt.datetime(2000, 1, 1))
+        assert offset is not None
+        return (
+            np.array([np.iinfo(np.int64).min], dtype=np.int64),
+            np.array([offset.total_seconds()], dtype=np.int64),
+            [tz],
+        )
+
+    # pytz keeps the transition table of a timezone in private attributes
+    # pylint: disable=protected-access
+    utc_transition_times = tz._utc_transition_times  # type: ignore
+    transition_info = tz._transition_info  # type: ignore
+    tzinfos_by_info = tz._tzinfos  # type: ignore
+
+    transition_times = np.array(
+        utc_transition_times, dtype='datetime64[s]'
+    ).astype(np.int64)
+    offsets = np.array(
+        [info[0].total_seconds() for info in transition_info],
+        dtype=np.int64,
+    )
+    tzinfos = [tzinfos_by_info[info] for info in transition_info]
+    # the first transition time (0001-01-01) only marks the beginning of time
+    transition_times[0] = np.iinfo(np.int64).min
+
+    return transition_times, offsets, tzinfos
+
+
+def day_boundaries(
+    date_from: dt.date, date_to: dt.date, timezone: str
+) -> np.ndarray:
+    """
+    UTC instants (datetime64[us]) of the beginning of every local date from [date_from] to the day after [date_to] in
+    [timezone], computed for all dates at once. Day i lasts from boundary i (inclusive) to boundary i + 1 (exclusive),
+    so days with DST transitions are 23 or 25 hours long. If midnight is skipped by a DST transition, the day starts at
+    the transition; if midnight occurs twice, the day starts at the first midnight.
+    """
+    transition_times, offsets, _ = utc_transitions(timezone)
+    # sentinel to simplify the lookup of the end of the last interval
+    ends = np.append(transition_times[1:], np.iinfo(np.int64).max)
+
+    local_midnights = (
+        np.arange(
+            np.datetime64(date_from, 'D'),
+            np.datetime64(date_to, 'D') + 2,
+            dtype='datetime64[D]',
+        )
+        .astype('datetime64[s]')
+        .astype(np.int64)
+    )
+
+    # index of the last offset interval that has started (in local wall time) before the local midnight
+    local_starts = transition_times.copy()
+    local_starts[1:] += offsets[1:]
+    idx = np.searchsorted(local_starts, local_midnights, side='right') - 1
+    prev = np.maximum(idx - 1, 0)
+
+    utc_current = local_midnights - offsets[idx]
+    utc_previous = local_midnights - offsets[prev]
+
+    # midnight occurs twice: the interpretation in the previous interval is the earlier one
+    earlier_in_previous = (idx > 0) & (utc_previous < transition_times[idx])
+    # midnight is skipped: the day starts at the next transition
+    skipped = utc_current >= ends[idx]
+
+    utc_boundaries = np.where(
+        earlier_in_previous,
+        utc_previous,
+        np.where(skipped, ends[idx], utc_current),
+    )
+
+    return utc_boundaries.astype('datetime64[s]').astype('datetime64[us]')
+
+
 def time_range_of_date(
     date: dt.date, timezone: str
 ) -> tuple[dt.datetime, dt.datetime]:
     """
     Get start and end timestamp of one date, timezone aware.
     """
-    t_start = tz_aware_dt(
-        dt.datetime(
-            year=date.year,
-            month=date.month,
-            day=date.day,
-        ),
-        timezone=timezone,
+    start, end = utc_to_local_datetimes(
+        day_boundaries(date, date, timezone), timezone
     )
 
-    t_end = t_start + dt.timedelta(days=1, microseconds=-1)
+    return start, end - dt.timedelta(microseconds=1)
+
 
-    return t_start, t_end
+def utc_offsets(
+    utc: np.ndarray, timezone: str
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    UTC offsets (timedelta64[s]) in [timezone] for an array of UTC instants (datetime64) and the indices of the
+    corresponding entries of the transition table.
+    """
+    transition_times, offsets, _ = utc_transitions(timezone)
+    seconds = utc.astype('datetime64[s]').astype(np.int64)
+    idx = np.searchsorted(transition_times, seconds, side='right') - 1
+
+    return offsets[idx].astype('timedelta64[s]'), idx
+
+
+def utc_to_local_datetimes(utc: np.ndarray, timezone: str) -> np.ndarray:
+    """
+    Convert an array of UTC instants (datetime64) to an array of timezone-aware datetime objects in [timezone]. The
+    UTC offsets are determined for all instants at once, only the final datetime objects are created one by one.
+    """
+    _, _, tzinfos = utc_transitions(timezone)
+    offsets, idx = utc_offsets(utc, timezone)
+    local_naive = (utc.astype('datetime64[us]') + offsets).astype(dt.datetime)
+
+    local = np.empty(len(local_naive), dtype=object)
+    local[:] = [
+        naive.replace(tzinfo=tzinfos[i])
+        for naive, i in zip(local_naive, idx.tolist())
+    ]
+    return local
+
+
+def times_to_utc_datetime64(t: Time) -> np.ndarray:
+    """Convert a skyfield Time (scalar or array) to an array of UTC instants (datetime64[us])."""
+    year, month, day, hour, minute, second = (
+        np.atleast_1d(component) for component in t.utc
+    )
+    days = (((year - 1970) * 12 + (month - 1)).astype('datetime64[M]')).astype(
+        'datetime64[D]'
+    ) + (day - 1).astype('timedelta64[D]')
+    whole_seconds = (hour * 3600 + minute * 60).astype(np.int64)
+    # round to microseconds like skyfield does when it creates datetime objects
+    micro = np.floor(second * 1e6 + 0.5).astype(np.int64)
+
+    return (
+        days.astype('datetime64[us]')
+        + whole_seconds.astype('timedelta64[s]')
+        + micro.astype('timedelta64[us]')
+    )
+
+
+def times_to_local_datetimes(t: Time, timezone: str) -> np.ndarray:
+    """Convert a skyfield Time (scalar or array) to an array of timezone-aware datetime objects in [timezone]."""
+    return utc_to_local_datetimes(times_to_utc_datetime64(t), timezone)
 
 
 def aware_datetime_to_ical_date_with_utc_time(
@@ -65,7 +295,7 @@ def aware_datetime_to_ical_date_with_utc_time(
 
     19980119T070000Z"""
 
-    utc_timezone = pytz.timezone('UTC')
+    utc_timezone = get_timezone('UTC')
     utc_datetime = aware_datetime.astimezone(utc_timezone)
 
     return utc_datetime.strftime("%Y%m%dT%H%M%SZ")
@@ -79,5 +309,30 @@ def create_batches(list_: list, batch_size: int = 500) -> list[list]:
     return batches
 
 
+def iter_batches(
+    iterable: Iterable[T], batch_size: int = 500
+) -> Iterator[list[T]]:
+    """
+    Lazily divide [iterable] into batches of max length [batch_size]. Only one batch is held in memory at a time, so
+    unlike create_batches this also works for (unbounded) generators.
+    """
+    assert batch_size > 0, "batch_size must be > 0."
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, batch_size)):
+        yield batch
+
+
+def peek(iterable: Iterable[T]) -> tuple[T | None, Iterator[T]]:
+    """
+    Get the first element of [iterable] (None if it is empty) together with an iterator that still yields all
+    elements, including the first one.
+    """
+    iterator = iter(iterable)
+    first = next(iterator, None)
+    if first is None:
+        return None, iterator
+    return first, itertools.chain([first], iterator)
+
+
 def collect_cli_arguments(**suncal_kwargs) -> None:
     click.echo(suncal_kwargs)
@@ -0,0 +1,234 @@
+"""
+Long-running worker for orchestrators that create many calendars: requests are read as newline-delimited json from
+stdin and every response is written as one json line to stdout. The process (and its pool of warm worker processes)
+pays the startup, the imports, the timezone data and the ephemeris only once instead of once per calendar. Every
+request carries an id that is echoed in its response, because with several workers the responses are written in the
+order in which the requests finish. A request that fails only produces an error response, the worker keeps running.
+"""
+
+import contextlib
+import datetime as dt
+import json
+import sys
+import time
+from typing import Iterable
+from typing import Iterator
+from typing import TextIO
+
+from pydantic import BaseModel  # pylint: disable=E0611
+from pydantic import ConfigDict
+from pydantic import Field
+from pydantic import ValidationError
+from pydantic import field_validator
+from pydantic import model_validator
+from typing_extensions import Self
+
+from suncal.dates import DateSelection
+from suncal.dates import parse_weekdays
+from suncal.ephemeris import split_by_kernel
+from suncal.events import iter_celestial_events
+from suncal.models.astro import CALENDAR_PRECISION
+from suncal.models.astro import EVENT_KINDS
+from suncal.models.astro import PRECISIONS
+from suncal.models.astro import Location
+from suncal.models.calendar import CalendarEvent
+from suncal.models.icalendar import iter_ics_content
+from suncal.models.records import EventRecord
+from suncal.pool import WarmPool
+from suncal.pool import warm_up
+from suncal.utils import timezone_finder
+
+# the results are returned in the response instead of being written to files or Google Calendar
+WORKER_FORMATS = ['ics', 'ndjson']
+
+
+class WorkerRequest(BaseModel):
+    """
+    Request of suncal worker with the parameters of suncal_main (see there), by name or by the names of the command
+    line options ("event", "from", "to"). [return_val] is "ics" (the ics file as text) or "ndjson" (the bulk export
+    records), [weekdays] is a comma-separated list like the --weekdays option. [id] is returned in the response.
+    """
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: str | int | None = None
+    event_name: str = Field(alias='event')
+    from_date: dt.date = Field(alias='from')
+    to_date: dt.date = Field(alias='to')
+    longitude: float
+    latitude: float
+    timezone: str | None = None
+    return_val: str = 'ics'
+    precision: str | None = None
+    weekdays: str | None = None
+    rrule: str | None = None
+
+    @field_validator('event_name', mode='after')
+    @classmethod
+    def event_valid(cls, event: str) -> str:
+        if event not in EVENT_KINDS:
+            raise ValueError(
+                f"Unknown event {event!r}, choose any of {EVENT_KINDS}."
+            )
+        return event
+
+    @field_validator('return_val', mode='after')
+    @classmethod
+    def return_val_valid(cls, return_val: str) -> str:
+        if return_val not in WORKER_FORMATS:
+            raise ValueError(
+                f"Unknown return_val {return_val!r}, choose any of {WORKER_FORMATS}."
+            )
+        return return_val
+
+    @field_validator('precision', mode='after')
+    @classmethod
+    def precision_valid(cls, precision: str | None) -> str | None:
+        if precision is not None and precision not in PRECISIONS:
+            raise ValueError(
+                f"Unknown precision {precision!r}, choose any of {list(PRECISIONS)}."
+            )
+        return precision
+
+    @model_validator(mode='after')
+    def dates_valid(self) -> Self:
+        if self.to_date < self.from_date:
+            raise ValueError("to_date must be >= from_date.")
+        return self
+
+
+class WorkerResponse(BaseModel):
+    """
+    Response to the request [id]: the number of [events] and either the [ics] text or the [records], or the [error]
+    if the request failed. [seconds] is the time the worker spent on the request.
+    """
+
+    id: str | int | None = None
+    ok: bool
+    events: int = 0
+    ics: str | None = None
+    records: list[EventRecord] | None = None
+    error: str | None = None
+    seconds: float = 0.0
+
+    def line(self) -> str:
+        return self.model_dump_json(exclude_none=True)
+
+
+def request_id(line: str) -> str | int | None:
+    """Id of a request that could not be parsed, if the line is json at all (so the caller can match the error)."""
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    rid = data.get('id') if isinstance(data, dict) else None
+    return rid if isinstance(rid, (str, int)) else None
+
+
+def answer(request: WorkerRequest) -> WorkerResponse:
+    """Calculate the events of [request] like suncal_main and return them in the response."""
+    # fail early if the range is not covered by any ephemeris
+    split_by_kernel(request.from_date, request.to_date)
+    timezone = request.timezone or timezone_finder().timezone_at(
+        lng=request.longitude, lat=request.latitude
+    )
+    assert timezone is not None, "Timezone could not be determined."
+    location = Location(
+        timezone=timezone,
+        longitude=request.longitude,
+        latitude=request.latitude,
+    )
+    dates = DateSelection.from_options(
+        parse_weekdays(request.weekdays) if request.weekdays else None,
+        request.rrule,
+    )
+    precision = request.precision or (
+        CALENDAR_PRECISION if request.return_val == 'ics' else 'exact'
+    )
+    celestial_events = iter_celestial_events(
+        request.event_name,
+        request.from_date,
+        request.to_date,
+        location,
+        dates,
+        precision,
+    )
+
+    if request.return_val == 'ics':
+        events = [
+            CalendarEvent.from_celestial_event(c_event)
+            for c_event in celestial_events
+        ]
+        return WorkerResponse(
+            id=request.id,
+            ok=True,
+            events=len(events),
+            ics=''.join(line + '\n' for line in iter_ics_content(events)),
+        )
+    records = [
+        EventRecord.from_celestial_event(request.event_name, c_event, location)
+        for c_event in celestial_events
+    ]
+    return WorkerResponse(
+        id=request.id, ok=True, events=len(records), records=records
+    )
+
+
+def handle_request(line: str) -> str:
+    """
+    Answer the request in the json [line] and return the response line. Errors are returned as error responses. The
+    response is the only output: anything that is printed while the request is answered goes to stderr, so it cannot
+    corrupt the stream of responses on stdout.
+    """
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            request = WorkerRequest.model_validate_json(line)
+            response = answer(request)
+    except ValidationError as e:
+        response = WorkerResponse(
+            id=request_id(line),
+            ok=False,
+            error='; '.join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'request'}: {error['msg']}"
+                for error in e.errors()
+            ),
+        )
+    except Exception as e:  # pylint: disable=broad-except
+        # one failing request must not stop the worker (e.g. a range without ephemeris, an unknown timezone)
+        response = WorkerResponse(
+            id=request_id(line), ok=False, error=f"{type(e).__name__}: {e}"
+        )
+    response.seconds = time.perf_counter() - start
+    return response.line()
+
+
+def request_lines(stream: TextIO) -> Iterator[str]:
+    """Non-empty lines of [stream], read as they arrive."""
+    for line in stream:
+        if line.strip():
+            yield line
+
+
+def run_worker(requests: TextIO, responses: TextIO, workers: int = 1) -> int:
+    """
+    Answer all requests on [requests] until it is closed and write the responses to [responses], flushed one by one.
+    With [workers] > 1, the requests are answered concurrently by a pool of warm processes and the responses are
+    written as soon as they are ready. Return the number of answered requests.
+    """
+    answered = 0
+
+    def write(lines: Iterable[str]) -> None:
+        nonlocal answered
+        for line in lines:
+            responses.write(line + '\n')
+            responses.flush()
+            answered += 1
+
+    if workers > 1:
+        with WarmPool(workers) as pool:
+            write(pool.map_unordered(handle_request, request_lines(requests)))
+    else:
+        warm_up()
+        write(handle_request(line) for line in request_lines(requests))
+    return answered
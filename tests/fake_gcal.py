@@ -0,0 +1,301 @@
+"""
+Fake Google Calendar API server for offline tests and load tests of the export to Google Calendar.
+
+Implements the parts of the Calendar API v3 that suncal uses (calendarList.list, calendars.get/insert,
+events.insert/list/delete and the batch endpoint) with in-memory calendars. Latency, random server errors and a
+per-second quota (answered with 403 rateLimitExceeded like the real API) can be configured. Point suncal to the
+server with the environment variable SUNCAL_GOOGLE_API_ENDPOINT (see suncal.models.googlecal.calendar_service).
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from email.message import Message
+from email.parser import BytesParser
+from email.parser import Parser
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+from pydantic import BaseModel  # pylint: disable=E0611
+
+from suncal.ratelimit import TokenBucket
+
+REASONS = {
+    200: 'OK',
+    204: 'No Content',
+    400: 'Bad Request',
+    403: 'Forbidden',
+    404: 'Not Found',
+    410: 'Gone',
+    500: 'Internal Server Error',
+}
+
+
+class FakeServerConfig(BaseModel):
+    # seconds per http request (a batch request counts once)
+    latency: float = 0.0
+    # probability of a 500 backendError per (batched) request
+    error_rate: float = 0.0
+    # requests per second before 403 rateLimitExceeded responses
+    quota_rate: float | None = None
+    # requests that can be sent at once (default: one second of quota)
+    quota_burst: float | None = None
+    max_batch_size: int = 50  # larger batch requests are rejected
+    page_size: int = 100  # items per page of list responses
+    seed: int = 0  # seed of the random errors
+    # probability that an event is inserted, but the response is a 503 (e.g. a timeout behind the api frontend)
+    lost_insert_response_rate: float = 0.0
+
+
+class FakeCalendarApi:
+    """In-memory state of the fake api and the dispatch of single requests."""
+
+    def __init__(self, config: FakeServerConfig):
+        self.config = config
+        self.calendars: dict[str, dict] = {}
+        self.events: dict[str, dict[str, dict]] = {}
+        self.stats: Counter = Counter()
+        self.lock = threading.Lock()
+        self.random = random.Random(config.seed)
+        self.quota = (
+            TokenBucket(config.quota_rate, capacity=config.quota_burst)
+            if config.quota_rate
+            else None
+        )
+        self.next_id = 0
+        self.deleted_ids: set[str] = set()
+
+    def new_id(self, prefix: str) -> str:
+        self.next_id += 1
+        return f"{prefix}{self.next_id}"
+
+    def error(self, status: int, reason: str) -> tuple[int, dict | None]:
+        return status, {
+            'error': {
+                'code': status,
+                'message': reason,
+                'errors': [{'reason': reason}],
+            }
+        }
+
+    def handle(
+        self, method: str, url: str, body: bytes
+    ) -> tuple[int, dict | None]:
+        """Handle a single api request. Return the status and json response."""
+        parsed = urllib.parse.urlparse(url)
+        path = urllib.parse.unquote(parsed.path)
+        query = {
+            key: values[0]
+            for key, values in urllib.parse.parse_qs(parsed.query).items()
+        }
+        payload = json.loads(body) if body else {}
+
+        with self.lock:
+            self.stats['requests'] += 1
+            if self.quota is not None and self.quota.try_acquire(1) > 0:
+                self.stats['rate_limited'] += 1
+                return self.error(403, 'rateLimitExceeded')
+            if self.random.random() < self.config.error_rate:
+                self.stats['errors'] += 1
+                return self.error(500, 'backendError')
+            return self.dispatch(method, path, query, payload)
+
+    def page(self, items: list[dict], query: dict[str, str]) -> dict:
+        start = int(query.get('pageToken', 0))
+        size = min(
+            int(query.get('maxResults', self.config.page_size)),
+            self.config.page_size,
+        )
+        response: dict = {'items': items[start : start + size]}
+        if start + size < len(items):
+            response['nextPageToken'] = str(start + size)
+        return response
+
+    def dispatch(
+        self, method: str, path: str, query: dict[str, str], payload: dict
+    ) -> tuple[int, dict | None]:
+        if method == 'GET' and path == '/calendar/v3/users/me/calendarList':
+            self.stats['calendarList.list'] += 1
+            items = [
+                {'id': gcal_id, 'summary': calendar['summary']}
+                for gcal_id, calendar in self.calendars.items()
+            ]
+            return 200, self.page(items, query)
+
+        if method == 'POST' and path == '/calendar/v3/calendars':
+            self.stats['calendars.insert'] += 1
+            gcal_id = self.new_id('calendar')
+            self.calendars[gcal_id] = {'id': gcal_id, **payload}
+            self.events[gcal_id] = {}
+            return 200, self.calendars[gcal_id]
+
+        match = re.fullmatch(
+            r'/calendar/v3/calendars/([^/]+)(/events(?:/([^/]+))?)?', path
+        )
+        if match is None:
+            return self.error(404, 'notFound')
+        gcal_id, events_path, event_id = match.groups()
+        if gcal_id not in self.calendars:
+            return self.error(404, 'notFound')
+
+        if events_path is None and method == 'GET':
+            self.stats['calendars.get'] += 1
+            return 200, self.calendars[gcal_id]
+
+        events = self.events[gcal_id]
+        if event_id is None and method == 'POST':
+            self.stats['events.insert'] += 1
+            # ids of deleted events cannot be used again, like in Google Calendar
+            event_id = payload.get('id') or self.new_id('event')
+            if event_id in events or event_id in self.deleted_ids:
+                self.stats['duplicates'] += 1
+                return self.error(409, 'duplicate')
+            events[event_id] = {**payload, 'id': event_id}
+            if self.random.random() < self.config.lost_insert_response_rate:
+                self.stats['lost_responses'] += 1
+                return self.error(503, 'backendError')
+            return 200, events[event_id]
+
+        if event_id is None and method == 'GET':
+            self.stats['events.list'] += 1
+            return 200, self.page(self.list_events(events, query), query)
+
+        if event_id is not None and method == 'DELETE':
+            self.stats['events.delete'] += 1
+            if events.pop(event_id, None) is None:
+                return self.error(410, 'deleted')
+            self.deleted_ids.add(event_id)
+            return 204, None
+
+        return self.error(400, 'badRequest')
+
+    def list_events(
+        self, events: dict[str, dict], query: dict[str, str]
+    ) -> list[dict]:
+        """Events that match the privateExtendedProperty and overlap with timeMin/timeMax (compared as strings)."""
+        key, _, value = query.get('privateExtendedProperty', '').partition('=')
+        time_min, time_max = query.get('timeMin', ''), query.get('timeMax', '~')
+
+        def time_of(event: dict, field: str) -> str:
+            return event[field].get('dateTime') or event[field].get('date')
+
+        return [
+            {'id': event['id']}
+            for event in events.values()
+            if (
+                not key
+                or event.get('extendedProperties', {})
+                .get('private', {})
+                .get(key)
+                == value
+            )
+            and time_of(event, 'start') < time_max
+            and time_of(event, 'end') >= time_min
+        ]
+
+
+def http_response(status: int, content: dict | None) -> str:
+    """Response to a single request within a batch (application/http)."""
+    body = json.dumps(content) if content is not None else ''
+    return (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: application/json; charset=UTF-8\r\n\r\n{body}"
+    )
+
+
+def make_handler(api: FakeCalendarApi) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args) -> None:
+            pass
+
+        def send_json(self, status: int, content: dict | None) -> None:
+            body = json.dumps(content).encode() if content is not None else b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def handle_request(self) -> None:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(api.config.latency)
+            if self.path.startswith('/batch/calendar/v3'):
+                self.handle_batch(body)
+            else:
+                self.send_json(*api.handle(self.command, self.path, body))
+
+        def handle_batch(self, body: bytes) -> None:
+            message = BytesParser().parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+                + body
+            )
+            parts = message.get_payload()
+            assert isinstance(parts, list)
+            with api.lock:
+                api.stats['batches'] += 1
+            if len(parts) > api.config.max_batch_size:
+                self.send_json(*api.error(400, 'tooManyRequestsInBatch'))
+                return
+
+            boundary = 'batch_suncal_fake'
+            response = ''
+            for part in parts:
+                assert isinstance(part, Message)
+                request_line, rest = str(part.get_payload()).split('\n', 1)
+                method, url, _ = request_line.split(' ')
+                request = Parser().parsestr(rest)
+                status, content = api.handle(
+                    method, url, str(request.get_payload()).encode()
+                )
+                content_id = part['Content-ID'].strip('<>')
+                response += (
+                    f"--{boundary}\r\nContent-Type: application/http\r\n"
+                    f"Content-ID: <response-{content_id}>\r\n\r\n"
+                    f"{http_response(status, content)}\r\n"
+                )
+            response += f"--{boundary}--\r\n"
+
+            encoded = response.encode()
+            self.send_response(200)
+            self.send_header(
+                'Content-Type', f'multipart/mixed; boundary={boundary}'
+            )
+            self.send_header('Content-Length', str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        do_GET = do_POST = do_DELETE = handle_request
+
+    return Handler
+
+
+class FakeCalendarServer:
+    """
+    Fake Calendar API server on localhost that runs in a background thread. Use as context manager, the api endpoint
+    for suncal is available as [endpoint].
+    """
+
+    def __init__(self, config: FakeServerConfig | None = None, port: int = 0):
+        self.api = FakeCalendarApi(config or FakeServerConfig())
+        self.server = ThreadingHTTPServer(
+            ('127.0.0.1', port), make_handler(self.api)
+        )
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def __enter__(self) -> 'FakeCalendarServer':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,124 @@
+"""
+Load test of the export to Google Calendar against the fake Calendar API server (tests/fake_gcal.py).
+
+Run e.g. with
+
+    python -m tests.loadtest_gcal --events 5000 --latency 0.05 --error-rate 0.01 --quota-rate 100
+
+Prints the throughput and the export metrics (retries, backoff, batch size) as json.
+"""
+
+import datetime as dt
+import json
+import os
+import time
+
+import click
+from google.oauth2.credentials import Credentials
+
+from suncal.models.calendar import CalendarEvent
+from suncal.models.googlecal import API_ENDPOINT_ENV_VAR
+from suncal.models.googlecal import export_events_to_google_calendar
+from suncal.models.googlecal import get_sun_calendar_id
+from suncal.ratelimit import RateLimiter
+from suncal.utils import tz_aware_dt
+from tests.fake_gcal import FakeCalendarServer
+from tests.fake_gcal import FakeServerConfig
+
+TIMEZONE = "Europe/Berlin"
+
+
+def synthetic_events(n_events: int) -> list[CalendarEvent]:
+    """[n_events] daily events, the calculation of real events would dominate the measurement."""
+    start = tz_aware_dt(dt.datetime(2025, 1, 1, 8), TIMEZONE)
+    return [
+        CalendarEvent(
+            summary="Sunrise",
+            start=start + dt.timedelta(days=i),
+            end=start + dt.timedelta(days=i),
+        )
+        for i in range(n_events)
+    ]
+
+
+@click.command()
+@click.option('--events', 'n_events', type=int, default=1000, show_default=True)
+@click.option(
+    '--latency',
+    type=float,
+    default=0.02,
+    show_default=True,
+    help="Seconds per http request.",
+)
+@click.option(
+    '--error-rate',
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="Probability of a 500 response per request.",
+)
+@click.option(
+    '--quota-rate',
+    type=float,
+    default=None,
+    help="Requests per second that the server accepts.",
+)
+@click.option(
+    '--user-rate',
+    type=float,
+    default=1000.0,
+    show_default=True,
+    help="Requests per second that suncal sends.",
+)
+@click.option('--max-batch-size', type=int, default=50, show_default=True)
+@click.option('--seed', type=int, default=0, show_default=True)
+def loadtest(
+    n_events: int,
+    latency: float,
+    error_rate: float,
+    quota_rate: float | None,
+    user_rate: float,
+    max_batch_size: int,
+    seed: int,
+) -> None:
+    config = FakeServerConfig(
+        latency=latency, error_rate=error_rate, quota_rate=quota_rate, seed=seed
+    )
+    events = synthetic_events(n_events)
+    creds = Credentials(token='fake')
+
+    with FakeCalendarServer(config) as server:
+        os.environ[API_ENDPOINT_ENV_VAR] = server.endpoint
+        gcal_id = get_sun_calendar_id('Sun', TIMEZONE, creds, cache_file=None)
+
+        start = time.perf_counter()
+        metrics = export_events_to_google_calendar(
+            gcal_id,
+            events,
+            creds,
+            limiter=RateLimiter(
+                user_rate=user_rate, max_batch_size=max_batch_size
+            ),
+        )
+        seconds = time.perf_counter() - start
+        n_stored = len(server.api.events[gcal_id])
+        server_stats = dict(server.api.stats)
+
+    click.echo(
+        json.dumps(
+            {
+                'config': config.model_dump(),
+                'events': n_events,
+                'stored': n_stored,
+                'seconds': round(seconds, 3),
+                'events_per_second': round(metrics.succeeded / seconds, 1),
+                'metrics': metrics.model_dump(),
+                'server': server_stats,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == '__main__':
+    loadtest()
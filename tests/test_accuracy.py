@@ -0,0 +1,91 @@
+import datetime as dt
+import json
+
+from click.testing import CliRunner
+
+from suncal.accuracy import CASES
+from suncal.accuracy import Thresholds
+from suncal.accuracy import compare
+from suncal.accuracy import random_cases
+from suncal.accuracy import run_accuracy
+from suncal.suncal import suncal
+
+day = dt.date(2025, 1, 1)
+noon = dt.datetime(2025, 1, 1, 12)
+
+
+def test_compare():
+    reference = {
+        'case': {
+            'sunrise': {
+                day + dt.timedelta(days=i): (noon, noon) for i in range(4)
+            }
+        }
+    }
+    results = {
+        'case': {
+            'sunrise': {
+                # one event 2 seconds off, one missing, one extra
+                day: (noon + dt.timedelta(seconds=2),) * 2,
+                day + dt.timedelta(days=1): (noon, noon),
+                day + dt.timedelta(days=2): (noon, noon),
+                day + dt.timedelta(days=9): (noon, noon),
+            }
+        }
+    }
+
+    report = compare('engine', reference, results, 1.0, 1.0, Thresholds())
+    assert (report.compared, report.missing, report.extra) == (3, 1, 1)
+    assert report.max_delta == 2.0
+    assert report.p50_delta == 0.0
+    assert not report.passed
+    assert len(report.failures) == 4
+    assert report.deviations[2] == 'case sunrise 2025-01-01: 2.000000 s'
+
+    report = compare(
+        'engine',
+        reference,
+        results,
+        1.0,
+        1.0,
+        Thresholds(max_delta=2, max_p99=2, max_missing=1, max_extra=1),
+    )
+    assert report.passed
+
+
+def test_run_accuracy():
+    """The batched and the minute engine agree with the reference, also on the day that Samoa skipped."""
+    cases = [c for c in CASES if c.name == 'apia_date_line']
+    report = run_accuracy(
+        engines=['batch', 'minute'],
+        cases=cases + random_cases(1, days=2),
+        events=['sunrise', 'blue_hour_evening'],
+    )
+    assert report.passed
+    assert report.cases == ['apia_date_line', 'random_0']
+    for engine in report.engines:
+        assert engine.compared > 10
+        assert engine.missing == engine.extra == 0
+    assert report.engines[1].max_delta <= 30
+
+
+def test_accuracy_cli():
+    args = [
+        'accuracy',
+        '--case',
+        'kiritimati_date_line',
+        '--event',
+        'sunset',
+        '--engine',
+        'second',
+    ]
+    runner = CliRunner()
+    result = runner.invoke(suncal, args)
+    assert result.exit_code == 0
+    report = json.loads(result.output)
+    assert report['passed']
+    assert report['engines'][0]['compared'] == 7
+
+    result = runner.invoke(suncal, [*args, '--max-delta', '0.001'])
+    assert result.exit_code == 1
+    assert 'failed for second' in result.output
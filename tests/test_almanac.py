@@ -0,0 +1,127 @@
+import datetime as dt
+import struct
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from suncal import compute
+from suncal.almanac import ALMANAC_ENV_VAR
+from suncal.almanac import Almanac
+from suncal.almanac import build_almanac
+from suncal.dates import DateSelection
+from suncal.events import create_calendar_events
+from suncal.events import iter_calendar_events
+from suncal.models.astro import CALC
+from suncal.models.astro import EVENT_KINDS
+from suncal.models.astro import Location
+from suncal.suncal import suncal
+
+berlin = Location(timezone='Europe/Berlin', latitude=52.52, longitude=13.41)
+tromso = Location(timezone='Europe/Oslo', latitude=69.65, longitude=18.96)
+from_date, to_date = dt.date(2025, 5, 10), dt.date(2025, 5, 30)
+
+
+def test_build_and_read(tmp_path):
+    filename = str(tmp_path / 'test.almanac')
+    index = build_almanac([berlin, tromso], from_date, to_date, filename)
+    assert index.days == 21
+    expected = compute(EVENT_KINDS, [berlin, tromso], from_date, to_date)
+
+    almanac = Almanac(filename)
+    assert almanac.index == index
+    assert almanac.location_index(tromso) == 1
+    assert (
+        almanac.location_index(
+            Location(**{**berlin.model_dump(), 'timezone': 'UTC'})
+        )
+        is None
+    )
+    for location_idx in range(2):
+        for event in EVENT_KINDS:
+            table = almanac.table(event, location_idx, from_date, to_date)
+            calculated = expected.select(event=event, location_idx=location_idx)
+            assert np.array_equal(table.date, calculated.date)
+            assert np.array_equal(table.phase_idx, calculated.phase_idx)
+            # whole seconds, rounded down
+            delta = calculated.start - table.start
+            assert (delta >= np.timedelta64(0)).all()
+            assert (delta < np.timedelta64(1, 's')).all()
+
+    # the midnight sun starts in the range
+    sunsets = almanac.table('sunset', 1, dt.date(2025, 5, 20), to_date)
+    assert len(sunsets) == 0
+    assert not almanac.covers('sunset', from_date, dt.date(2025, 5, 31))
+
+    del almanac
+    with open(filename, 'r+b') as f:
+        f.seek(8)
+        f.write(struct.pack('<I', 99))
+    with pytest.raises(ValueError, match='version 99'):
+        Almanac(filename)
+
+
+def test_calendar_events_from_almanac(tmp_path, monkeypatch):
+    """Calendar events of a known place are read from the almanac, exact events are still calculated."""
+    filename = str(tmp_path / 'test.almanac')
+    build_almanac([berlin], from_date, to_date, filename, ['sunrise'])
+    calculated = create_calendar_events('sunrise', from_date, to_date, berlin)
+
+    def not_calculated(*args):
+        raise AssertionError('calculated')
+
+    monkeypatch.setenv(ALMANAC_ENV_VAR, filename)
+    monkeypatch.setitem(CALC, 'sunrise', not_calculated)
+    events = create_calendar_events(
+        'sunrise', from_date, to_date, berlin, precision='minute'
+    )
+    assert len(events) == len(calculated) == 21
+    for event, expected in zip(events, calculated):
+        assert isinstance(expected.start, dt.datetime)
+        assert event.start == expected.start.replace(microsecond=0)
+
+    # only the selected dates are read from the almanac, when they are reached
+    reads: list[dt.date] = []
+    table = Almanac.table
+
+    def counted_table(self, event, location_idx, first, last):
+        reads.append(first)
+        return table(self, event, location_idx, first, last)
+
+    monkeypatch.setattr(Almanac, 'table', counted_table)
+    events_iter = iter_calendar_events(
+        'sunrise',
+        from_date,
+        to_date,
+        berlin,
+        DateSelection(weekdays={5}),
+        precision='minute',
+    )
+    assert reads == []
+    assert next(events_iter).start.weekday() == 5
+    assert reads == [dt.date(2025, 5, 10)]
+    assert len(list(events_iter)) == 2
+    assert reads == [dt.date(2025, 5, day) for day in (10, 17, 24)]
+
+    with pytest.raises(AssertionError, match='calculated'):
+        create_calendar_events('sunrise', from_date, to_date, berlin)
+    with pytest.raises(AssertionError, match='calculated'):
+        create_calendar_events(
+            'sunrise', from_date, to_date, tromso, precision='minute'
+        )
+
+
+def test_almanac_cli(tmp_path):
+    filename = str(tmp_path / 'cli.almanac')
+    args = ['almanac', 'build', '--location', '52.52,13.41,europe/berlin']
+    args += ['--from', '2025-01-01', '--to', '2025-01-03', '--event', 'sunset']
+    runner = CliRunner()
+    result = runner.invoke(suncal, [*args, '--filename', filename])
+    assert result.exit_code == 0, result.output
+    almanac = Almanac(filename)
+    assert almanac.index.locations == [berlin]
+    assert almanac.index.events == ['sunset']
+
+    result = runner.invoke(suncal, [*args[:3], '52.52', *args[4:]])
+    assert result.exit_code == 2
+    assert 'LAT,LONG' in result.output
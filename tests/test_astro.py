@@ -4,12 +4,14 @@ import pytest
 from pydantic import ValidationError
 
 from suncal.models.astro import CALC
+from suncal.models.astro import PRECISIONS
 from suncal.models.astro import CelestialBody
 from suncal.models.astro import Location
 from suncal.models.astro import MagicHour
 from suncal.models.astro import MoonPhase
 from suncal.models.astro import RiseSet
 from suncal.models.astro import calculate_moon_phase
+from suncal.models.calendar import CalendarEvent
 from suncal.utils import tz_aware_dt
 from tests.test_data import CITIES
 
@@ -140,3 +142,50 @@ def test_magic_hour_calculations():
         assert isinstance(magic_hour, MagicHour)
         assert ref_start - prec <= magic_hour.start <= ref_start + prec
         assert ref_end - prec <= magic_hour.end <= ref_end + prec
+
+
+def test_short_crossings_at_high_latitudes():
+    """In February, the sun rises above -4° for only 4 hours in Longyearbyen."""
+    location = Location(
+        timezone='Arctic/Longyearbyen', longitude=15.65, latitude=78.22
+    )
+    blue_hour = CALC['blue_hour_morning'](dt.date(2025, 2, 10), location)
+
+    assert isinstance(blue_hour, MagicHour)
+    assert blue_hour.end - blue_hour.start > dt.timedelta(hours=1)
+
+
+@pytest.mark.parametrize('event', list(CALC))
+def test_precision(event):
+    """Calendar events show the same times with minute precision, all times are within half the precision."""
+    for city in CITIES[:2]:
+        location = Location(
+            timezone=city['timezone'],
+            longitude=city['long'],
+            latitude=city['lat'],
+        )
+        for day in range(7):
+            date = dt.date(2023, 3, 1) + dt.timedelta(days=day)
+            exact = CALC[event](date, location)
+            assert exact is not None or event.startswith('moon')
+            for precision in ['second', 'minute', '5min']:
+                c_event = CALC[event](date, location, precision)
+                if exact is None:
+                    assert c_event is None
+                    continue
+                assert c_event is not None
+                if precision != '5min':
+                    assert (
+                        CalendarEvent.from_celestial_event(c_event).summary
+                        == CalendarEvent.from_celestial_event(exact).summary
+                    )
+                tolerance = dt.timedelta(seconds=PRECISIONS[precision] / 2)
+                if isinstance(exact, MagicHour):
+                    assert isinstance(c_event, MagicHour)
+                    assert abs(c_event.start - exact.start) <= tolerance
+                    assert abs(c_event.end - exact.end) <= tolerance
+                else:
+                    assert isinstance(c_event, (RiseSet, MoonPhase))
+                    assert abs(c_event.event_time - exact.event_time) <= (
+                        tolerance
+                    )
@@ -0,0 +1,194 @@
+import datetime as dt
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from suncal import compute
+from suncal import location_of
+from suncal.models.astro import CALC
+from suncal.models.astro import EVENT_KINDS
+from suncal.models.astro import Location
+from suncal.models.astro import MagicHour
+from tests.test_data import CITIES
+
+from_date = dt.date(2023, 3, 1)
+to_date = dt.date(2023, 3, 14)
+
+
+def event_start(celestial_event) -> dt.datetime:
+    if isinstance(celestial_event, MagicHour):
+        return celestial_event.start
+    return celestial_event.event_time
+
+
+@pytest.mark.parametrize('event', EVENT_KINDS)
+def test_compute_same_as_calc(event):
+    locations = [
+        Location(
+            timezone=city['timezone'],
+            longitude=city['long'],
+            latitude=city['lat'],
+        )
+        for city in CITIES[:2]
+    ]
+    table = compute(event, locations, from_date, to_date)
+
+    for i, location in enumerate(locations):
+        calculated = list(table.select(location_idx=i).celestial_events())
+        expected = [
+            c_event
+            for date in [
+                from_date + dt.timedelta(days=d)
+                for d in range((to_date - from_date).days + 1)
+            ]
+            if (c_event := CALC[event](date, location))
+        ]
+
+        assert len(calculated) == len(expected)
+        for c_event, e_event in zip(calculated, expected):
+            assert type(c_event) is type(e_event)
+            assert abs(
+                event_start(c_event) - event_start(e_event)
+            ) < dt.timedelta(seconds=1)
+            assert event_start(c_event).utcoffset() == (
+                event_start(e_event).utcoffset()
+            )
+
+
+def test_compute_precision():
+    """With minute precision, the events happen in the same minutes as with the exact calculation."""
+    berlin = location_of(latitude=52.52, longitude=13.41)
+    start, end = dt.date(2023, 1, 1), dt.date(2023, 4, 30)
+    exact = compute(EVENT_KINDS, berlin, start, end)
+    table = compute(EVENT_KINDS, berlin, start, end, precision='minute')
+
+    assert len(table) == len(exact)
+    for column in ['kind', 'date', 'phase_idx']:
+        assert np.array_equal(getattr(table, column), getattr(exact, column))
+    for column in ['start', 'end']:
+        times, exact_times = getattr(table, column), getattr(exact, column)
+        assert np.array_equal(
+            times.astype('datetime64[m]'), exact_times.astype('datetime64[m]')
+        )
+        assert np.abs(times - exact_times).max() <= np.timedelta64(30, 's')
+
+
+def test_compute_table():
+    berlin = location_of(latitude=52.520008, longitude=13.404954)
+    assert berlin.timezone == 'Europe/Berlin'
+
+    table = compute(
+        ['sunrise', 'golden_hour_evening'], [berlin], from_date, to_date
+    )
+    n_days = (to_date - from_date).days + 1
+
+    assert len(table) == 2 * n_days
+    assert table.start.dtype == np.dtype('datetime64[us]')
+    assert table.date.dtype == np.dtype('datetime64[D]')
+    sunrise = table.select('sunrise')
+    assert np.array_equal(sunrise.start, sunrise.end)
+    assert np.all(sunrise.phase_idx == -1)
+    golden_hour = table.select('golden_hour_evening')
+    assert np.all(golden_hour.end > golden_hour.start)
+    assert np.array_equal(
+        golden_hour.date,
+        np.arange(
+            np.datetime64(from_date),
+            np.datetime64(to_date + dt.timedelta(days=1)),
+        ),
+    )
+
+
+def test_compute_shares_searches():
+    berlin = location_of(latitude=52.520008, longitude=13.404954)
+    table = compute(EVENT_KINDS, berlin, from_date, to_date)
+
+    # events that share a search (e.g. sunrise and sunset) are the same as when calculated separately
+    for event in EVENT_KINDS:
+        separate = compute(event, berlin, from_date, to_date)
+        selected = table.select(event)
+        assert np.array_equal(selected.date, separate.date)
+        assert np.array_equal(selected.start, separate.start)
+        assert np.array_equal(selected.end, separate.end)
+
+
+def test_compute_no_events():
+    # no moon phase in the middle of a lunar quarter
+    location = location_of(latitude=0, longitude=0, timezone='UTC')
+    table = compute(
+        'moonphase', location, dt.date(2023, 3, 1), dt.date(2023, 3, 3)
+    )
+
+    assert len(table) == 0
+    assert list(table.celestial_events()) == []
+
+
+def test_to_arrow():
+    pa = pytest.importorskip('pyarrow')
+    berlin = location_of(latitude=52.520008, longitude=13.404954)
+    table = compute(['sunrise', 'moonphase'], berlin, from_date, to_date)
+    arrow_table = table.to_arrow()
+
+    assert arrow_table.num_rows == len(table)
+    assert arrow_table.schema.field('start').type == pa.timestamp(
+        'us', tz='UTC'
+    )
+    assert pa.types.is_dictionary(arrow_table.schema.field('kind').type)
+    assert arrow_table.column('kind').to_pylist() == [
+        EVENT_KINDS[k] for k in table.kind
+    ]
+    assert arrow_table.column('timezone').to_pylist() == [
+        'Europe/Berlin'
+    ] * len(table)
+    # phase_idx is only set for moon phases
+    assert arrow_table.column('phase_idx').null_count == len(
+        table.select('sunrise')
+    )
+    assert np.array_equal(
+        arrow_table.column('start').to_numpy().astype('datetime64[us]'),
+        table.start,
+    )
+
+
+def test_optional_dependencies_are_imported_on_use():
+    script = (
+        "import sys, suncal.models.astro; "
+        "print(sorted({'pandas', 'pyarrow'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == '[]'
+
+
+def test_to_pandas():
+    pd = pytest.importorskip('pandas')
+    locations = [
+        location_of(latitude=52.520008, longitude=13.404954),
+        location_of(latitude=37.4848, longitude=-122.2281),
+    ]
+    table = compute('sunset', locations, from_date, to_date)
+    df = table.to_pandas()
+
+    assert len(df) == len(table)
+    assert isinstance(df['kind'].dtype, pd.CategoricalDtype)
+    assert str(df['start'].dt.tz) == 'UTC'
+    assert list(df['timezone'].cat.categories) == [
+        'America/Los_Angeles',
+        'Europe/Berlin',
+    ]
+    assert (
+        df.loc[df['location_idx'] == 1, 'timezone'] == 'America/Los_Angeles'
+    ).all()
+    assert df['phase_idx'].isna().all()
+    # local times can be derived per timezone
+    berlin = df[df['timezone'] == 'Europe/Berlin']
+    assert (
+        berlin['start'].dt.tz_convert('Europe/Berlin').dt.date.to_numpy()
+        == table.date[table.location_idx == 0].astype(dt.date)
+    ).all()
@@ -0,0 +1,55 @@
+import json
+
+from click.testing import CliRunner
+
+from suncal.bench import Scenario
+from suncal.bench import bench_locations
+from suncal.bench import run_scenario
+from suncal.bench import scenarios
+from suncal.suncal import suncal
+
+
+def test_scenarios():
+    scenario_list = scenarios(
+        ['sunrise', 'all'], [7], [1, 4], ['per_day', 'batch'], [1, 2], ['exact']
+    )
+    # no scenarios with more workers than locations
+    assert len(scenario_list) == 2 * 3 * 2
+    assert scenario_list[0].name == 'per_day/sunrise/7d/1loc/1w/exact'
+
+    locations = bench_locations(12)
+    assert len(locations) == 12
+    assert locations[0].timezone == 'Europe/Berlin'
+
+
+def test_run_scenario():
+    """Both engines calculate and render the same events."""
+    locations = bench_locations(2)
+    runs = [
+        run_scenario(
+            Scenario(event_set='all', days=3, locations=2, engine=engine),
+            locations,
+        )
+        for engine in ['per_day', 'batch']
+    ]
+    assert runs[0].events == runs[1].events > 20
+    assert runs[0].ics_bytes == runs[1].ics_bytes
+    assert len(runs[0].latencies) == 2 * 3 * 9
+    assert len(runs[1].latencies) == 2
+
+
+def test_bench_cli(tmp_path):
+    filename = str(tmp_path / 'bench.json')
+    args = ['bench', '--event-set', 'sunrise', '--days', '2']
+    args += ['--locations', '1', '--engine', 'batch', '--workers', '1']
+    result = CliRunner().invoke(suncal, [*args, '--output', filename])
+    assert result.exit_code == 0, result.output
+    with open(filename) as f:
+        report = json.load(f)
+    assert report['machine']['cpus'] >= 1
+    (scenario,) = report['scenarios']
+    assert scenario['name'] == 'batch/sunrise/2d/1loc/1w/exact'
+    assert scenario['events'] == 2
+    assert scenario['days_per_second'] > 0
+    assert scenario['cold_seconds'] > 0
+    assert scenario['latency_unit'] == 'location'
@@ -0,0 +1,97 @@
+import datetime as dt
+
+import pytest
+from pydantic import ValidationError
+
+from suncal.models.astro import CelestialBody
+from suncal.models.astro import Location
+from suncal.models.astro import MagicHour
+from suncal.models.astro import MoonPhase
+from suncal.models.astro import RiseSet
+from suncal.models.calendar import CalendarEvent
+from suncal.models.googlecal import GoogleCalEvent
+from suncal.models.icalendar import VEvent
+from suncal.utils import tz_aware_dt
+
+time_zone = 'Europe/Berlin'
+location = Location(timezone=time_zone, longitude=13.4, latitude=52.5)
+event_time = tz_aware_dt(dt.datetime(2023, 3, 18, 6, 30), timezone=time_zone)
+
+
+def test_calendar_event_from_celestial_event():
+    sunset = CalendarEvent.from_celestial_event(
+        RiseSet(
+            location=location,
+            event_time=event_time,
+            body=CelestialBody.SUN,
+            rise=False,
+        )
+    )
+    assert sunset.summary == '🌞↓ at 06:30 AM'
+    assert sunset.start == sunset.end == event_time
+    assert not sunset.all_day
+    assert sunset.key() == '2023-03-18'
+
+    full_moon = CalendarEvent.from_celestial_event(
+        MoonPhase(timezone=time_zone, event_time=event_time, phase_idx=2)
+    )
+    assert full_moon.all_day
+    assert full_moon.start == dt.date(2023, 3, 18)
+    assert full_moon.end == dt.date(2023, 3, 19)
+    assert full_moon.timezone == time_zone
+    assert 'Full Moon' in full_moon.summary
+
+    golden_hour = CalendarEvent.from_celestial_event(
+        MagicHour(
+            color='golden',
+            start=event_time,
+            end=event_time + dt.timedelta(minutes=40),
+            morning=True,
+        )
+    )
+    assert golden_hour.summary == '🌇 Golden Hour'
+    assert golden_hour.end - golden_hour.start == dt.timedelta(minutes=40)
+
+    with pytest.raises(ValidationError):
+        CalendarEvent(start=event_time, end=event_time.date(), summary='bla')
+    with pytest.raises(ValidationError):
+        CalendarEvent(
+            start=event_time.replace(tzinfo=None),
+            end=event_time.replace(tzinfo=None),
+            summary='bla',
+        )
+    with pytest.raises(ValidationError):
+        CalendarEvent(
+            start=full_moon.start,
+            end=full_moon.start,
+            summary='bla',
+            timezone=time_zone,
+        )
+
+
+def test_sinks_convert_calendar_events():
+    now = dt.datetime.now(dt.timezone.utc)
+    timed = CalendarEvent(start=event_time, end=event_time, summary='timed')
+    all_day = CalendarEvent(
+        start=dt.date(2023, 3, 18),
+        end=dt.date(2023, 3, 19),
+        summary='all day',
+        timezone=time_zone,
+        transparent=False,
+    )
+
+    gcal_event = GoogleCalEvent.from_calendar_event(timed)
+    assert gcal_event.start.datetime == event_time
+    assert gcal_event.start.date is None
+    assert gcal_event.transparency == 'transparent'
+    gcal_event = GoogleCalEvent.from_calendar_event(all_day)
+    assert gcal_event.start.date == dt.date(2023, 3, 18)
+    assert gcal_event.end.timezone == time_zone
+    assert gcal_event.transparency == 'opaque'
+
+    vevent = VEvent.from_calendar_event(timed, dtstamp=now)
+    assert vevent.dtstart == event_time
+    assert vevent.transp == 'transparent'
+    vevent = VEvent.from_calendar_event(all_day, dtstamp=now)
+    assert vevent.dtend == dt.date(2023, 3, 19)
+    assert vevent.transp == 'opaque'
@@ -54,3 +54,100 @@ def test_timezone_parsing():
         ],
     )
     assert result.exit_code == 2
+
+
+def test_ephem_build(tmp_path):
+    """Integration test. The ephemeris excerpt is written to the provided filename."""
+    filename = str(tmp_path / "excerpt.bsp")
+    runner = CliRunner()
+    result = runner.invoke(
+        suncal,
+        [
+            "ephem",
+            "build",
+            "--from",
+            "2025-01-01",
+            "--to",
+            "2025-12-31",
+            "--filename",
+            filename,
+        ],
+    )
+    assert result.exit_code == 0
+    assert filename in result.output
+
+    # the last date must not be before the first date
+    result = runner.invoke(
+        suncal,
+        ["ephem", "build", "--from", "2025-01-01", "--to", "2024-12-31"],
+    )
+    assert result.exit_code == 2
+
+
+def test_ics_export(tmp_path):
+    """Integration test. Events are streamed from the calculation into the ics file."""
+    filename = str(tmp_path / "sunrise.ics")
+    runner = CliRunner()
+    result = runner.invoke(
+        suncal,
+        [
+            "ics",
+            "--event",
+            "sunrise",
+            "--from",
+            "2023-03-01",
+            "--to",
+            "2023-03-10",
+            "--lat",
+            "52.52",
+            "--long",
+            "13.41",
+            "--filename",
+            filename,
+        ],
+    )
+    assert result.exit_code == 0
+
+    with open(filename) as f:
+        lines = f.read().splitlines()
+
+    assert lines[0] == "BEGIN:VCALENDAR"
+    assert lines[-1] == "END:VCALENDAR"
+    assert lines.count("BEGIN:VEVENT") == 10
+
+
+def test_ics_shard_options(tmp_path):
+    args = [
+        "ics",
+        "--event",
+        "sunrise",
+        "--from",
+        "2023-03-01",
+        "--to",
+        "2023-03-10",
+        "--lat",
+        "52.52",
+        "--long",
+        "13.41",
+        "--filename",
+        str(tmp_path / "shards"),
+    ]
+    runner = CliRunner()
+
+    result = runner.invoke(suncal, [*args, "--workers", "2"])
+    assert result.exit_code == 2
+    assert "--shard-by" in result.output
+
+    # a location is a single shard, several workers would be silently unused
+    result = runner.invoke(
+        suncal, [*args, "--shard-by", "location", "--workers", "2"]
+    )
+    assert result.exit_code == 2
+    assert "--shard-by year" in result.output
+    assert not (tmp_path / "shards").exists()
+
+    result = runner.invoke(suncal, [*args, "--shard-by", "location"])
+    assert result.exit_code == 0
+    assert [path.name for path in (tmp_path / "shards").iterdir()] == [
+        "Sunrise_52.5200_13.4100.ics"
+    ]
@@ -0,0 +1,141 @@
+import datetime as dt
+
+import pytest
+from click.testing import CliRunner
+
+from suncal.dates import DateSelection
+from suncal.dates import Recurrence
+from suncal.dates import parse_weekdays
+from suncal.events import create_calendar_events
+from suncal.models.astro import CALC
+from suncal.models.astro import Location
+from suncal.suncal import suncal
+
+berlin = Location(timezone='Europe/Berlin', latitude=52.52, longitude=13.41)
+
+
+def occurrences(rule: str, from_date: dt.date, to_date: dt.date) -> list[str]:
+    selection = DateSelection(rule=Recurrence.from_rrule(rule))
+    return [str(date) for date in selection.iter_dates(from_date, to_date)]
+
+
+def test_recurrence():
+    jan, mar = dt.date(2025, 1, 1), dt.date(2025, 3, 31)
+
+    assert occurrences('FREQ=MONTHLY;BYMONTHDAY=1,-1', jan, mar) == [
+        '2025-01-01',
+        '2025-01-31',
+        '2025-02-01',
+        '2025-02-28',
+        '2025-03-01',
+        '2025-03-31',
+    ]
+    # first Saturday and last Sunday of the month
+    assert occurrences('RRULE:FREQ=MONTHLY;BYDAY=1SA,-1SU', jan, mar) == [
+        '2025-01-04',
+        '2025-01-26',
+        '2025-02-01',
+        '2025-02-23',
+        '2025-03-01',
+        '2025-03-30',
+    ]
+    # every other week, the weekday of the first date (Wednesday)
+    assert occurrences('FREQ=WEEKLY;INTERVAL=2', jan, dt.date(2025, 2, 1)) == [
+        '2025-01-01',
+        '2025-01-15',
+        '2025-01-29',
+    ]
+    assert occurrences(
+        'freq=yearly;bymonth=6;byday=-1fr', jan, dt.date(2027, 1, 1)
+    ) == ['2025-06-27', '2026-06-26']
+    assert occurrences('FREQ=DAILY;INTERVAL=10', jan, dt.date(2025, 1, 25)) == [
+        '2025-01-01',
+        '2025-01-11',
+        '2025-01-21',
+    ]
+
+    for rule in [
+        'FREQ=HOURLY',
+        'BYDAY=SA',
+        'FREQ=DAILY;COUNT=3',
+        'FREQ=MONTHLY;BYMONTHDAY=0',
+        'FREQ=MONTHLY;BYMONTHDAY=-32',
+        'FREQ=YEARLY;BYMONTH=13',
+    ]:
+        with pytest.raises(ValueError):
+            Recurrence.from_rrule(rule)
+    with pytest.raises(ValueError):
+        Recurrence.from_rrule('FREQ=WEEKLY;BYDAY=1SA')
+
+
+def test_date_selection(tmp_path):
+    assert parse_weekdays('sa,Sun') == {5, 6}
+    with pytest.raises(ValueError):
+        parse_weekdays('sa,xx')
+
+    dates_file = tmp_path / 'dates.txt'
+    dates_file.write_text('# eclipses\n2025-03-29\n\n2025-09-21\n2026-08-12\n')
+    selection = DateSelection.from_options(
+        weekdays={5, 6}, dates_file=str(dates_file)
+    )
+    assert selection is not None
+    assert list(
+        selection.iter_dates(dt.date(2025, 1, 1), dt.date(2025, 12, 31))
+    ) == [dt.date(2025, 3, 29), dt.date(2025, 9, 21)]
+    assert DateSelection.from_options() is None
+
+    dates_file.write_text('2025-03-29\n29.03.2025\n')
+    with pytest.raises(ValueError, match='line 2'):
+        DateSelection.from_options(dates_file=str(dates_file))
+
+
+def test_selection_is_applied_before_calculation(monkeypatch):
+    """Only the selected dates are calculated, the events are the same as those of the full range."""
+    from_date, to_date = dt.date(2025, 1, 1), dt.date(2025, 12, 31)
+    all_events = create_calendar_events('sunrise', from_date, to_date, berlin)
+
+    calculated: list[dt.date] = []
+    calc = CALC['sunrise']
+
+    def counting_calc(
+        date: dt.date, location: Location, precision: str | None = None
+    ):
+        calculated.append(date)
+        return calc(date, location, precision)
+
+    monkeypatch.setitem(CALC, 'sunrise', counting_calc)
+    selection = DateSelection.from_options(rrule='FREQ=MONTHLY;BYMONTHDAY=1')
+    events = create_calendar_events(
+        'sunrise', from_date, to_date, berlin, selection
+    )
+
+    assert calculated == [dt.date(2025, month, 1) for month in range(1, 13)]
+    assert events == [event for event in all_events if event.date.day == 1]
+
+
+def test_cli_date_selection(tmp_path):
+    filename = str(tmp_path / 'sunset.ics')
+    args = [
+        'ics',
+        '--event',
+        'sunset',
+        '--from',
+        '2025-03-01',
+        '--to',
+        '2025-03-31',
+        '--lat',
+        '52.52',
+        '--long',
+        '13.41',
+        '--filename',
+        filename,
+    ]
+    runner = CliRunner()
+    result = runner.invoke(suncal, [*args, '--weekdays', 'sa,su'])
+    assert result.exit_code == 0
+    with open(filename) as f:
+        assert f.read().count('BEGIN:VEVENT') == 10
+
+    result = runner.invoke(suncal, [*args, '--rrule', 'FREQ=SOMETIMES'])
+    assert result.exit_code == 2
+    assert 'FREQ' in result.output
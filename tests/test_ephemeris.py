@@ -0,0 +1,101 @@
+import datetime as dt
+
+import pytest
+
+from suncal import ephemeris
+from suncal.ephemeris import FULL_EPHEMERIS
+from suncal.ephemeris import REQUIRED_TARGETS
+from suncal.ephemeris import build_trimmed_ephemeris
+from suncal.ephemeris import covers
+from suncal.ephemeris import kernel_for_date
+from suncal.ephemeris import load_ephemeris
+from suncal.ephemeris import load_kernel
+from suncal.ephemeris import split_by_kernel
+from suncal.models.astro import CALC
+from suncal.models.astro import Location
+
+from_date = dt.date(2023, 3, 1)
+to_date = dt.date(2023, 3, 31)
+
+
+def test_build_trimmed_ephemeris(tmp_path):
+    filename = build_trimmed_ephemeris(
+        from_date, to_date, filename=str(tmp_path / 'excerpt.bsp')
+    )
+    kernel = load_kernel(filename)
+
+    # only the segments of Earth, Sun and Moon are kept
+    assert sorted(s.target for s in kernel.spk.segments) == sorted(
+        REQUIRED_TARGETS
+    )
+    assert covers(filename, from_date, to_date)
+    assert not covers(filename, from_date, dt.date(2023, 6, 1))
+    assert not covers(filename, dt.date(2022, 12, 1), to_date)
+
+
+def test_trimmed_ephemeris_preferred(tmp_path, monkeypatch):
+    filename = build_trimmed_ephemeris(
+        from_date, to_date, filename=str(tmp_path / 'excerpt.bsp')
+    )
+    monkeypatch.setattr(ephemeris, 'TRIMMED_EPHEMERIS', filename)
+
+    assert load_ephemeris(from_date, to_date) is load_kernel(filename)
+    # fall back to the full kernel outside of the excerpt
+    assert load_ephemeris(dt.date(2024, 1, 1)) is load_kernel(FULL_EPHEMERIS)
+
+
+def test_trimmed_ephemeris_results(tmp_path, monkeypatch):
+    location = Location(
+        timezone='Europe/Berlin', longitude=13.404954, latitude=52.520008
+    )
+    date = dt.date(2023, 3, 18)
+    expected = {
+        event: CALC[event](date, location)
+        for event in ['sunrise', 'moonset', 'moonphase', 'blue_hour_evening']
+    }
+
+    filename = build_trimmed_ephemeris(
+        from_date, to_date, filename=str(tmp_path / 'excerpt.bsp')
+    )
+    monkeypatch.setattr(ephemeris, 'TRIMMED_EPHEMERIS', filename)
+
+    for event, celestial_event in expected.items():
+        assert CALC[event](date, location) == celestial_event
+
+
+def test_kernel_for_date():
+    assert kernel_for_date(dt.date(2025, 1, 1)).filename == FULL_EPHEMERIS
+    assert kernel_for_date(dt.date(2100, 1, 1)).filename == 'de440s.bsp'
+    assert kernel_for_date(dt.date(1500, 1, 1)).filename == 'de441_part-1.bsp'
+    assert kernel_for_date(dt.date(3000, 1, 1)).filename == 'de441_part-2.bsp'
+
+    with pytest.raises(ValueError):
+        kernel_for_date(dt.date(1, 1, 1))
+
+
+def test_split_by_kernel():
+    chunks = split_by_kernel(dt.date(1800, 6, 1), dt.date(2200, 6, 1))
+
+    assert chunks == [
+        (dt.date(1800, 6, 1), dt.date(1849, 12, 31), 'de441_part-1.bsp'),
+        (dt.date(1850, 1, 1), dt.date(1899, 12, 31), 'de440s.bsp'),
+        (dt.date(1900, 1, 1), dt.date(2050, 12, 31), FULL_EPHEMERIS),
+        (dt.date(2051, 1, 1), dt.date(2149, 12, 31), 'de440s.bsp'),
+        (dt.date(2150, 1, 1), dt.date(2200, 6, 1), 'de441_part-2.bsp'),
+    ]
+    # every date of a chunk is calculated with the kernel of the chunk
+    for chunk_from, chunk_to, filename in chunks:
+        assert kernel_for_date(chunk_from).filename == filename
+        assert kernel_for_date(chunk_to).filename == filename
+    assert split_by_kernel(dt.date(1850, 6, 1), dt.date(1900, 6, 1)) == [
+        (dt.date(1850, 6, 1), dt.date(1899, 12, 31), 'de440s.bsp'),
+        (dt.date(1900, 1, 1), dt.date(1900, 6, 1), FULL_EPHEMERIS),
+    ]
+    # ranges within one kernel are not split
+    assert split_by_kernel(from_date, to_date) == [
+        (from_date, to_date, FULL_EPHEMERIS)
+    ]
+
+    # one kernel cannot be used for the whole range
+    with pytest.raises(ValueError):
+        load_ephemeris(dt.date(1000, 1, 1), dt.date(3000, 1, 1))
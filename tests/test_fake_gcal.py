@@ -0,0 +1,255 @@
+import datetime as dt
+import time
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+from suncal import auth
+from suncal import journal
+from suncal.dates import DateSelection
+from suncal.events import create_calendar_events
+from suncal.models import googlecal
+from suncal.models.astro import Location
+from suncal.models.googlecal import API_ENDPOINT_ENV_VAR
+from suncal.models.googlecal import delete_marked_events
+from suncal.models.googlecal import export_events_to_google_calendar
+from suncal.models.googlecal import export_marker
+from suncal.models.googlecal import get_sun_calendar_id
+from suncal.models.googlecal import replace_in_google_calendar
+from suncal.models.googlecal import request_calendars
+from suncal.ratelimit import RateLimiter
+from suncal.suncal import suncal_main
+from suncal.utils import tz_aware_dt
+from tests.fake_gcal import FakeCalendarServer
+from tests.fake_gcal import FakeServerConfig
+
+time_zone = "Europe/Berlin"
+location = Location(timezone=time_zone, longitude=13.4, latitude=52.5)
+creds = Credentials(token='fake')
+
+
+@pytest.fixture
+def server(request, monkeypatch):
+    config = getattr(request, 'param', FakeServerConfig())
+    with FakeCalendarServer(config) as server:
+        monkeypatch.setenv(API_ENDPOINT_ENV_VAR, server.endpoint)
+        yield server
+
+
+def fast_limiter() -> RateLimiter:
+    # backoff of 10ms instead of 1s
+    return RateLimiter(
+        user_rate=1000, sleep=lambda seconds: time.sleep(seconds / 100)
+    )
+
+
+def test_calendars_via_http(server):
+    for title in ['Work', 'Sunrise'] + [f"Other {i}" for i in range(250)]:
+        server.api.calendars[title] = {'id': title, 'summary': title}
+        server.api.events[title] = {}
+
+    # the calendar list has several pages
+    assert len(request_calendars(creds)) == 252
+    assert server.api.stats['calendarList.list'] == 3
+
+    assert get_sun_calendar_id('Sunrise', time_zone, creds, None) == 'Sunrise'
+    new_id = get_sun_calendar_id('Sunset', time_zone, creds, None)
+    assert server.api.calendars[new_id]['summary'] == 'Sunset'
+
+
+def test_export_and_replace_via_http(server):
+    gcal_id = get_sun_calendar_id('Sun', time_zone, creds, None)
+    events = create_calendar_events(
+        'sunrise', dt.date(2025, 1, 1), dt.date(2025, 3, 31), location
+    )
+
+    metrics = export_events_to_google_calendar(
+        gcal_id, events, creds, marker='sunrise', limiter=fast_limiter()
+    )
+    assert metrics.succeeded == len(events) == 90
+    assert metrics.batches == 2
+    assert len(server.api.events[gcal_id]) == 90
+
+    metrics = delete_marked_events(
+        gcal_id,
+        'sunrise',
+        tz_aware_dt(dt.datetime(2025, 2, 1), time_zone),
+        tz_aware_dt(dt.datetime(2025, 3, 1), time_zone),
+        creds,
+        limiter=fast_limiter(),
+    )
+    assert metrics.succeeded == 28
+    assert len(server.api.events[gcal_id]) == 62
+
+
+@pytest.mark.parametrize(
+    'server',
+    [FakeServerConfig(quota_rate=200, quota_burst=20, error_rate=0.1)],
+    indirect=True,
+)
+def test_export_retries_quota_and_server_errors(server):
+    gcal_id = get_sun_calendar_id('Sun', time_zone, creds, None)
+    events = create_calendar_events(
+        'sunrise', dt.date(2025, 1, 1), dt.date(2025, 3, 31), location
+    )
+
+    metrics = export_events_to_google_calendar(
+        gcal_id, events, creds, limiter=fast_limiter()
+    )
+
+    # all events arrive exactly once despite the errors
+    assert metrics.succeeded == 90
+    assert metrics.failed == 0
+    assert metrics.rate_limited > 0
+    assert metrics.server_errors > 0
+    assert metrics.requests == 90 + metrics.rate_limited + metrics.server_errors
+    assert sorted(
+        event['start']['dateTime'][:10]
+        for event in server.api.events[gcal_id].values()
+    ) == [event.key() for event in events]
+
+
+@pytest.mark.parametrize(
+    'server', [FakeServerConfig(lost_insert_response_rate=0.2)], indirect=True
+)
+def test_retried_inserts_do_not_duplicate_events(server):
+    gcal_id = get_sun_calendar_id('Sun', time_zone, creds, None)
+    events = create_calendar_events(
+        'sunrise', dt.date(2025, 1, 1), dt.date(2025, 3, 31), location
+    )
+
+    metrics = export_events_to_google_calendar(
+        gcal_id, events, creds, limiter=fast_limiter()
+    )
+
+    # the events behind the lost responses were created on the first attempt, their retries are rejected as duplicates
+    assert server.api.stats['lost_responses'] > 0
+    assert server.api.stats['duplicates'] == server.api.stats['lost_responses']
+    assert metrics.succeeded == 90
+    assert metrics.failed == 0
+    assert sorted(
+        event['start']['dateTime'][:10]
+        for event in server.api.events[gcal_id].values()
+    ) == [event.key() for event in events]
+
+
+def test_replace_keeps_other_locations(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, 'JOURNAL_DIRECTORY', str(tmp_path))
+    gcal_id = get_sun_calendar_id('Sun', time_zone, creds, None)
+    munich = Location(timezone=time_zone, longitude=11.58, latitude=48.14)
+    from_date, to_date = dt.date(2025, 1, 1), dt.date(2025, 1, 10)
+
+    for _ in range(2):
+        for place in [location, munich]:
+            replace_in_google_calendar(
+                gcal_id,
+                'sunrise',
+                create_calendar_events('sunrise', from_date, to_date, place),
+                from_date,
+                to_date,
+                place,
+                creds,
+                replace=True,
+                limiter=fast_limiter(),
+            )
+
+    # every location replaces only its own events
+    events = server.api.events[gcal_id].values()
+    assert len(events) == 20
+    assert {
+        event['extendedProperties']['private']['suncal'] for event in events
+    } == {export_marker('sunrise', location), export_marker('sunrise', munich)}
+
+
+def test_resume_replace_after_crash_during_deletion(
+    server, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(journal, 'JOURNAL_DIRECTORY', str(tmp_path))
+    gcal_id = get_sun_calendar_id('Sun', time_zone, creds, None)
+    from_date, to_date = dt.date(2025, 1, 1), dt.date(2025, 1, 10)
+    events = create_calendar_events('sunrise', from_date, to_date, location)
+
+    def replace(resume: bool) -> None:
+        replace_in_google_calendar(
+            gcal_id,
+            'sunrise',
+            events,
+            from_date,
+            to_date,
+            location,
+            creds,
+            replace=True,
+            resume=resume,
+            limiter=fast_limiter(),
+        )
+
+    # a complete export leaves its journal behind
+    replace(resume=False)
+
+    def crashing_delete(*args, **kwargs):
+        for event_id in list(server.api.events[gcal_id])[:4]:
+            del server.api.events[gcal_id][event_id]
+        raise ConnectionError()
+
+    with monkeypatch.context() as m:
+        m.setattr(googlecal, 'delete_marked_events', crashing_delete)
+        with pytest.raises(ConnectionError):
+            replace(resume=False)
+    assert len(server.api.events[gcal_id]) == 6
+
+    # the resumed replace repeats the deletion and sends all events again
+    replace(resume=True)
+    assert len(server.api.events[gcal_id]) == 10
+    assert server.api.stats['events.insert'] == 20
+
+    # a crash after the deletion (the journal is cut after the deletion and 3 inserts) is resumed without deleting
+    # again, only the events that are missing in the journal are sent
+    deletes = server.api.stats['events.delete']
+    journal_file = journal.Journal.for_export(
+        gcal_id, export_marker('sunrise', location)
+    )
+    with open(journal_file.filename) as f:
+        lines = f.readlines()
+    with open(journal_file.filename, 'w') as f:
+        f.writelines(lines[:4])
+    replace(resume=True)
+    assert server.api.stats['events.delete'] == deletes
+    assert server.api.stats['events.insert'] == 27
+
+
+def test_replace_without_new_events_deletes_old_ones(
+    server, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(journal, 'JOURNAL_DIRECTORY', str(tmp_path))
+    monkeypatch.setattr(auth, 'get_credentials', lambda scopes: creds)
+    get_calendar_id = googlecal.get_sun_calendar_id
+    monkeypatch.setattr(
+        googlecal,
+        'get_sun_calendar_id',
+        lambda title, timezone, creds: get_calendar_id(
+            title, timezone, creds, cache_file=None
+        ),
+    )
+
+    def export(dates: DateSelection | None) -> None:
+        suncal_main(
+            from_date=dt.date(2025, 1, 1),
+            to_date=dt.date(2025, 1, 10),
+            event_name='sunrise',
+            longitude=location.longitude,
+            latitude=location.latitude,
+            timezone=time_zone,
+            return_val='api',
+            calendar_title='Sun',
+            replace=True,
+            limiter=fast_limiter(),
+            dates=dates,
+        )
+
+    export(None)
+    (gcal_id,) = server.api.events
+    assert len(server.api.events[gcal_id]) == 10
+
+    # no date of the range is selected: nothing is inserted, but the old events are deleted
+    export(DateSelection(dates={dt.date(2025, 2, 1)}))
+    assert server.api.events[gcal_id] == {}
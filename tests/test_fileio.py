@@ -1,6 +1,46 @@
+import csv
 import datetime as dt
+import gzip
+import json
+import os
 
+import pytest
+
+from suncal.fileio import export_events_to_ics_shards
+from suncal.fileio import export_records
 from suncal.fileio import ics_filename
+from suncal.fileio import iter_year_shards
+from suncal.fileio import write_csv
+from suncal.fileio import write_ndjson
+from suncal.fileio import write_parquet
+from suncal.models.astro import Location
+from suncal.models.astro import MoonPhase
+from suncal.models.calendar import CalendarEvent
+from suncal.models.records import RECORD_FIELDS
+from suncal.models.records import EventRecord
+from suncal.utils import tz_aware_dt
+
+location = Location(timezone='Europe/Berlin', longitude=13.4, latitude=52.5)
+moon_phases = [
+    MoonPhase(
+        timezone='Europe/Berlin',
+        event_time=tz_aware_dt(
+            dt.datetime(2023, 3, 7 + 7 * i, 13, 40), 'Europe/Berlin'
+        ),
+        phase_idx=i,
+    )
+    for i in range(3)
+]
+year_end_moon_phases = [
+    MoonPhase(
+        timezone='Europe/Berlin',
+        event_time=tz_aware_dt(dt.datetime(*date, 12), 'Europe/Berlin'),
+        phase_idx=phase_idx,
+    )
+    for phase_idx, date in enumerate(
+        [(2023, 12, 12), (2023, 12, 19), (2024, 1, 4)]
+    )
+]
 
 
 def test_ics_filename():
@@ -9,3 +49,126 @@ def test_ics_filename():
         local_time_now=dt.datetime(2021, 5, 10, 10, 0, 0),
     )
     assert name == "Golden-Hour-Morning_20210510_100000.ics"
+
+
+def test_record_writers(tmp_path):
+    records = [
+        EventRecord.from_celestial_event('moonphase', moon_phase, location)
+        for moon_phase in moon_phases
+    ]
+
+    # ndjson: one json object per line
+    filename = str(tmp_path / "events.ndjson")
+    assert write_ndjson(iter(records), filename) == 3
+    with open(filename) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[1])['phase_idx'] == 1
+
+    # csv: header line + one line per record
+    filename = str(tmp_path / "events.csv")
+    assert write_csv(iter(records), filename) == 3
+    with open(filename, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == RECORD_FIELDS
+    assert rows[2]['start_local'] == records[2].start_local.isoformat()
+
+
+def test_write_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    records = [
+        EventRecord.from_celestial_event('moonphase', moon_phase, location)
+        for moon_phase in moon_phases
+    ]
+
+    filename = str(tmp_path / "events.parquet")
+    assert write_parquet(iter(records), filename, row_group_size=2) == 3
+
+    parquet_file = pq.ParquetFile(filename)
+    # records are written in row groups
+    assert parquet_file.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column('phase_idx').to_pylist() == [0, 1, 2]
+    assert table.column('start_utc').to_pylist()[0] == records[0].start_utc
+
+
+def test_export_records(tmp_path):
+    record = EventRecord.from_celestial_event(
+        'moonphase', moon_phases[0], location
+    )
+    filename = str(tmp_path / "events")
+
+    export_records([record], 'moonphase', filename, 'csv')
+
+    # the file ending is added
+    with open(filename + '.csv') as f:
+        assert len(f.read().splitlines()) == 2
+
+
+def test_iter_year_shards():
+    events = [
+        CalendarEvent.from_celestial_event(moon_phase)
+        for moon_phase in year_end_moon_phases
+    ]
+
+    shards = list(iter_year_shards(iter(events)))
+
+    assert [shard_name for shard_name, _ in shards] == ['2023', '2024']
+    assert [len(shard) for _, shard in shards] == [2, 1]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_export_events_to_ics_shards(tmp_path, workers):
+    events = [
+        CalendarEvent.from_celestial_event(moon_phase)
+        for moon_phase in year_end_moon_phases
+    ]
+    directory = str(tmp_path / "shards")
+
+    filenames = export_events_to_ics_shards(
+        iter_year_shards(events),
+        event_name='moonphase',
+        directory=directory,
+        workers=workers,
+        compress=True,
+        write_index=True,
+    )
+
+    assert [os.path.basename(f) for f in filenames] == [
+        'Moonphase_2023.ics.gz',
+        'Moonphase_2024.ics.gz',
+    ]
+    # every shard is a complete calendar
+    with gzip.open(filenames[0], 'rt') as f:
+        lines = f.read().splitlines()
+    assert lines[0] == 'BEGIN:VCALENDAR'
+    assert lines[-1] == 'END:VCALENDAR'
+    assert lines.count('BEGIN:VEVENT') == 2
+
+    with open(os.path.join(directory, 'index.json')) as f:
+        index = json.load(f)
+    assert index[1] == {
+        'shard': '2024',
+        'filename': 'Moonphase_2024.ics.gz',
+        'events': 1,
+    }
+
+
+def test_export_streamed_shard(tmp_path):
+    # the shard of a location is a generator that is consumed while the file is written
+    events = (
+        CalendarEvent.from_celestial_event(moon_phase)
+        for moon_phase in year_end_moon_phases
+    )
+
+    export_events_to_ics_shards(
+        iter([('52.5000_13.4000', events)]),
+        event_name='moonphase',
+        directory=str(tmp_path),
+        write_index=True,
+    )
+
+    with open(tmp_path / 'index.json') as f:
+        assert json.load(f)[0]['events'] == 3
+    with open(tmp_path / 'Moonphase_52.5000_13.4000.ics') as f:
+        assert f.read().count('BEGIN:VEVENT') == 3
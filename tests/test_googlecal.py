@@ -1,15 +1,27 @@
 import datetime as dt
+import json
+from types import SimpleNamespace
 
 import pytest
+from google.oauth2.credentials import Credentials
+from googleapiclient.errors import HttpError
 from pydantic import ValidationError
 
+from suncal.events import create_calendar_events
+from suncal.journal import Journal
+from suncal.models import googlecal
 from suncal.models.astro import CelestialBody
 from suncal.models.astro import Location
 from suncal.models.astro import MoonPhase
 from suncal.models.astro import RiseSet
+from suncal.models.calendar import CalendarEvent
 from suncal.models.googlecal import GoogleCalEvent
 from suncal.models.googlecal import GoogleCalTime
-from suncal.suncal import create_calendar_events
+from suncal.models.googlecal import delete_marked_events
+from suncal.models.googlecal import export_events_to_google_calendar
+from suncal.models.googlecal import get_sun_calendar_id
+from suncal.ratelimit import SERVER_ERROR_DELAY
+from suncal.ratelimit import RateLimiter
 from suncal.utils import tz_aware_dt
 
 now = dt.datetime.now()
@@ -175,7 +187,7 @@ def test_create_calendar_events():
 
     assert len(gcal_event_list) == 3
     assert all(
-        isinstance(cal_event, GoogleCalEvent) for cal_event in gcal_event_list
+        isinstance(cal_event, CalendarEvent) for cal_event in gcal_event_list
     )
 
     # use the North Pole as example for coordinates in which we don't expect a sunrise in May
@@ -194,3 +206,335 @@ def test_create_calendar_events():
     )
 
     assert len(gcal_event_list) == 0
+
+
+class Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        result = self.result() if callable(self.result) else self.result
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def http_error(status: int, reason: str = '') -> HttpError:
+    content = json.dumps({'error': {'errors': [{'reason': reason}]}})
+    return HttpError(
+        SimpleNamespace(status=status, reason=reason), content.encode()
+    )
+
+
+class FakeCalendarService:
+    """Minimal stand-in for the calendar resources of the Google API client, counts the requests."""
+
+    def __init__(
+        self,
+        calendars: dict[str, str],
+        events: list[dict] | None = None,
+        rate_limited_inserts: int = 0,
+        lost_connection_after: int | None = None,
+        failing_inserts: int = 0,
+    ):
+        self.calendars_by_id = calendars
+        self.events_by_id = {
+            str(i): event for i, event in enumerate(events or [])
+        }
+        # number of event inserts that are answered with a rate limit error
+        self.rate_limited_inserts = rate_limited_inserts
+        # number of event inserts that are answered with a server error
+        self.failing_inserts = failing_inserts
+        # number of successful event inserts after which the connection is lost
+        self.lost_connection_after = lost_connection_after
+        self.requests: list[str] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def calendarList(self):
+        def list_calendars(pageToken=None):
+            self.requests.append('calendarList.list')
+            items = [
+                {'id': gcal_id, 'summary': summary}
+                for gcal_id, summary in self.calendars_by_id.items()
+            ]
+            return Request({'items': items})
+
+        return SimpleNamespace(list=list_calendars)
+
+    def calendars(self):
+        def get(calendarId):
+            self.requests.append('calendars.get')
+            if calendarId not in self.calendars_by_id:
+                return Request(http_error(404))
+            return Request(
+                {'id': calendarId, 'summary': self.calendars_by_id[calendarId]}
+            )
+
+        def insert(body):
+            self.requests.append('calendars.insert')
+            gcal_id = 'new'
+            self.calendars_by_id[gcal_id] = body['summary']
+            return Request({'id': gcal_id})
+
+        return SimpleNamespace(get=get, insert=insert)
+
+    def events(self):
+        def list_events(
+            calendarId, privateExtendedProperty, timeMin, timeMax, **kwargs
+        ):
+            self.requests.append('events.list')
+            key, value = privateExtendedProperty.split('=')
+            items = [
+                {'id': event_id}
+                for event_id, event in self.events_by_id.items()
+                if event.get('extendedProperties', {})
+                .get('private', {})
+                .get(key)
+                == value
+                and event['start']['dateTime'] < timeMax
+                and event['end']['dateTime'] > timeMin
+            ]
+            return Request({'items': items})
+
+        def delete(calendarId, eventId):
+            return Request(lambda: self.events_by_id.pop(eventId, None) or {})
+
+        def insert(calendarId, body):
+            def execute():
+                if self.lost_connection_after is not None:
+                    if self.lost_connection_after == 0:
+                        raise ConnectionError()
+                    self.lost_connection_after -= 1
+                if self.rate_limited_inserts > 0:
+                    self.rate_limited_inserts -= 1
+                    return http_error(403, 'rateLimitExceeded')
+                if self.failing_inserts > 0:
+                    self.failing_inserts -= 1
+                    return http_error(503)
+                event_id = body.get('id') or str(len(self.events_by_id) + 100)
+                self.events_by_id[event_id] = body
+                return {'id': event_id, **body}
+
+            return Request(execute)
+
+        return SimpleNamespace(list=list_events, delete=delete, insert=insert)
+
+    def new_batch_http_request(self, callback):
+        requests: list = []
+
+        def add(request, request_id):
+            requests.append((request_id, request))
+
+        def execute():
+            self.requests.append(f'batch({len(requests)})')
+            for request_id, request in requests:
+                try:
+                    callback(request_id, request.execute(), None)
+                except HttpError as e:
+                    callback(request_id, None, e)
+
+        return SimpleNamespace(add=add, execute=execute)
+
+
+def test_calendar_id_cache(tmp_path, monkeypatch):
+    service = FakeCalendarService({'cal0': 'Work', 'cal1': 'Sunrise'})
+    monkeypatch.setattr(googlecal, 'build', lambda *args, **kwargs: service)
+    creds = Credentials(token='token', refresh_token='refresh', client_id='id')
+    cache_file = str(tmp_path / 'calendars.json')
+
+    # first run: all calendars are listed
+    assert (
+        get_sun_calendar_id('Sunrise', time_zone, creds, cache_file) == 'cal1'
+    )
+    assert service.requests == ['calendarList.list']
+    with open(cache_file) as f:
+        assert list(json.load(f).values()) == [{'Sunrise': 'cal1'}]
+
+    # second run: the cached id is only checked
+    service.requests.clear()
+    assert (
+        get_sun_calendar_id('Sunrise', time_zone, creds, cache_file) == 'cal1'
+    )
+    assert service.requests == ['calendars.get']
+
+    # stale id: fall back to the full listing (and create the calendar)
+    del service.calendars_by_id['cal1']
+    service.requests.clear()
+    assert get_sun_calendar_id('Sunrise', time_zone, creds, cache_file) == 'new'
+    assert service.requests == [
+        'calendars.get',
+        'calendarList.list',
+        'calendars.insert',
+    ]
+
+
+def test_replace_marked_events(monkeypatch):
+    def event(day: int, marker: str | None) -> dict:
+        body: dict = {
+            'start': {'dateTime': f'2025-01-{day:02}T08:00:00+01:00'},
+            'end': {'dateTime': f'2025-01-{day:02}T08:00:00+01:00'},
+        }
+        if marker:
+            body['extendedProperties'] = {'private': {'suncal': marker}}
+        return body
+
+    service = FakeCalendarService(
+        {'cal0': 'Sun'},
+        [event(day, 'sunrise') for day in range(1, 11)]
+        + [event(5, 'sunset'), event(5, None)],
+    )
+    monkeypatch.setattr(googlecal, 'build', lambda *args, **kwargs: service)
+    creds = Credentials(token='token')
+
+    metrics = delete_marked_events(
+        'cal0',
+        'sunrise',
+        tz_aware_dt(dt.datetime(2025, 1, 3), time_zone),
+        tz_aware_dt(dt.datetime(2025, 1, 8), time_zone),
+        creds,
+        limiter=RateLimiter(max_batch_size=3, sleep=lambda seconds: None),
+    )
+
+    # only the sunrise events created by suncal within the window are deleted, in batches of max 3
+    assert metrics.succeeded == 5
+    assert service.requests == [
+        'events.list',
+        'batch(3)',
+        'batch(2)',
+    ]
+    assert len(service.events_by_id) == 7
+
+    location = Location(timezone=time_zone, longitude=13.4, latitude=52.5)
+    export_events_to_google_calendar(
+        'cal0',
+        create_calendar_events(
+            'sunrise', dt.date(2025, 1, 3), dt.date(2025, 1, 7), location
+        ),
+        creds,
+        marker='sunrise',
+    )
+    assert len(service.events_by_id) == 12
+    assert (
+        sum(
+            event.get('extendedProperties', {}).get('private')
+            == {'suncal': 'sunrise'}
+            for event in service.events_by_id.values()
+        )
+        == 10
+    )
+
+
+def test_export_retries_rate_limited_events(monkeypatch):
+    service = FakeCalendarService({'cal0': 'Sun'}, rate_limited_inserts=5)
+    monkeypatch.setattr(googlecal, 'build', lambda *args, **kwargs: service)
+    waits: list[float] = []
+    limiter = RateLimiter(max_batch_size=8, sleep=waits.append)
+
+    location = Location(timezone=time_zone, longitude=13.4, latitude=52.5)
+    metrics = export_events_to_google_calendar(
+        'cal0',
+        create_calendar_events(
+            'sunrise', dt.date(2025, 1, 1), dt.date(2025, 1, 20), location
+        ),
+        Credentials(token='token'),
+        limiter=limiter,
+    )
+
+    # all events arrive exactly once
+    assert len(service.events_by_id) == 20
+    assert metrics.succeeded == 20
+    assert metrics.failed == 0
+    assert metrics.rate_limited == 5
+    assert metrics.requests == 25
+    # the first batch is rate limited: shrink to 4 and back off for 1s, then grow again
+    assert service.requests[:2] == ['batch(8)', 'batch(4)']
+    assert 1.0 in waits
+    assert metrics.batch_size == 8
+
+
+def test_export_retries_server_errors_without_backoff(monkeypatch):
+    service = FakeCalendarService({'cal0': 'Sun'}, failing_inserts=5)
+    monkeypatch.setattr(googlecal, 'build', lambda *args, **kwargs: service)
+    waits: list[float] = []
+    location = Location(timezone=time_zone, longitude=13.4, latitude=52.5)
+    events = create_calendar_events(
+        'sunrise', dt.date(2025, 1, 1), dt.date(2025, 1, 20), location
+    )
+
+    metrics = export_events_to_google_calendar(
+        'cal0',
+        events,
+        Credentials(token='token'),
+        limiter=RateLimiter(max_batch_size=8, sleep=waits.append),
+    )
+
+    # the failed events are retried in the next batch after a short delay, the batch size is kept
+    assert len(service.events_by_id) == 20
+    assert metrics.server_errors == 5
+    assert metrics.failed == 0
+    assert service.requests == ['batch(8)', 'batch(8)', 'batch(8)', 'batch(1)']
+    assert len(waits) == 1 and waits[0] <= SERVER_ERROR_DELAY
+
+    # after max_attempts, the events are given up and counted as failed
+    service = FakeCalendarService({'cal0': 'Sun'}, failing_inserts=3)
+    monkeypatch.setattr(googlecal, 'build', lambda *args, **kwargs: service)
+    metrics = export_events_to_google_calendar(
+        'cal0',
+        events,
+        Credentials(token='token'),
+        limiter=RateLimiter(max_attempts=1, sleep=waits.append),
+    )
+    assert metrics.failed == 3
+    assert metrics.succeeded == len(service.events_by_id) == 17
+
+
+def test_resume_export(tmp_path, monkeypatch):
+    service = FakeCalendarService({'cal0': 'Sun'}, lost_connection_after=13)
+    monkeypatch.setattr(googlecal, 'build', lambda *args, **kwargs: service)
+    location = Location(timezone=time_zone, longitude=13.4, latitude=52.5)
+    events = create_calendar_events(
+        'sunrise', dt.date(2025, 1, 1), dt.date(2025, 1, 30), location
+    )
+    journal = Journal.for_export('cal0', 'sunrise', directory=str(tmp_path))
+    limiter = RateLimiter(max_batch_size=5)
+
+    with pytest.raises(ConnectionError):
+        export_events_to_google_calendar(
+            'cal0',
+            events,
+            Credentials(token='token'),
+            limiter=limiter,
+            journal=journal,
+        )
+    assert len(service.events_by_id) == 13
+    assert len(journal.confirmed_keys()) == 13
+
+    service.lost_connection_after = None
+    metrics = export_events_to_google_calendar(
+        'cal0',
+        events,
+        Credentials(token='token'),
+        limiter=limiter,
+        journal=journal,
+        resume=True,
+    )
+
+    # only the missing events are sent, no duplicates
+    assert metrics.succeeded == 17
+    assert len(service.events_by_id) == 30
+    assert sorted(
+        event['start']['dateTime'][:10]
+        for event in service.events_by_id.values()
+    ) == [event.key() for event in events]
+    assert journal.confirmed_keys() == {event.key() for event in events}
+
+    # without resume, the journal starts from scratch
+    export_events_to_google_calendar(
+        'cal0', events[:2], Credentials(token='token'), journal=journal
+    )
+    assert len(journal.confirmed_keys()) == 2
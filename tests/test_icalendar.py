@@ -3,11 +3,11 @@ import datetime as dt
 import pytest
 from pydantic import ValidationError
 
-from suncal.models.googlecal import GoogleCalEvent
-from suncal.models.googlecal import GoogleCalTime
+from suncal.models.calendar import CalendarEvent
 from suncal.models.icalendar import VCalendar
 from suncal.models.icalendar import VEvent
 from suncal.models.icalendar import create_ics_content
+from suncal.models.icalendar import iter_ics_content
 from suncal.utils import tz_aware_dt
 
 start_datetime = tz_aware_dt(
@@ -20,16 +20,9 @@ end_datetime = tz_aware_dt(
     timezone="Europe/Berlin",
 )
 
-start_time = GoogleCalTime(datetime=start_datetime)
-end_time = GoogleCalTime(datetime=end_datetime)
 now = dt.datetime.now(dt.timezone.utc)
 timezone = 'Europe/Berlin'
 
-start_date = GoogleCalTime(date=start_datetime.date(), timezone=timezone)
-end_date = GoogleCalTime(
-    date=start_datetime.date() + dt.timedelta(days=1), timezone=timezone
-)
-
 
 def test_vcalendar():
     vcal = VCalendar()
@@ -48,17 +41,17 @@ def test_vcalendar():
 
 def test_vevent():
 
-    # test creation of VEvent from GoogleCalTime with dateTime in start and end
+    # test creation of VEvent from a timed CalendarEvent
 
-    gcal_event = GoogleCalEvent(
-        start=start_time, end=end_time, summary="event_summary"
+    cal_event = CalendarEvent(
+        start=start_datetime, end=end_datetime, summary="event_summary"
     )
 
-    vevent = VEvent.fromGoogleCalEvent(ge=gcal_event, dtstamp=now)
+    vevent = VEvent.from_calendar_event(cal_event, dtstamp=now)
 
-    assert vevent.dtend == gcal_event.end.datetime
-    assert vevent.dtstart == gcal_event.start.datetime
-    assert vevent.summary == gcal_event.summary
+    assert vevent.dtend == cal_event.end
+    assert vevent.dtstart == cal_event.start
+    assert vevent.summary == cal_event.summary
     assert "itsalwaysbeen.photography" in vevent.uid
     assert vevent.transp == "transparent"
     assert vevent.dtstamp == now
@@ -70,7 +63,7 @@ def test_vevent():
     assert ics_export[0] == 'BEGIN:VEVENT'
     assert ics_export[-1] == 'END:VEVENT'
     assert ics_export[-2] == 'TRANSP:TRANSPARENT'
-    assert ics_export[-3] == f'SUMMARY:{gcal_event.summary}'
+    assert ics_export[-3] == f'SUMMARY:{cal_event.summary}'
     assert ics_export[1] == "DTSTART:20210228T153000Z"
 
     # test timezone-awareness validator
@@ -85,35 +78,36 @@ def test_vevent():
             transp="transparent",
         )
 
-    # test VEVENT from GoogleCalTime with date in start and end time (all-day events)
-    gcal_all_day_event = GoogleCalEvent(
-        start=start_date, end=end_date, summary="event_summary"
-    )
-    vevent_all_day = VEvent.fromGoogleCalEvent(
-        ge=gcal_all_day_event, dtstamp=now
+    # test VEVENT from an all-day CalendarEvent
+    all_day_event = CalendarEvent(
+        start=start_datetime.date(),
+        end=start_datetime.date() + dt.timedelta(days=1),
+        summary="event_summary",
+        timezone=timezone,
     )
+    vevent_all_day = VEvent.from_calendar_event(all_day_event, dtstamp=now)
     ics = vevent_all_day.to_ics()
 
     assert isinstance(ics, list)
     assert ics[0] == 'BEGIN:VEVENT'
     assert ics[-1] == 'END:VEVENT'
     assert ics[-2] == 'TRANSP:TRANSPARENT'
-    assert ics[-3] == f'SUMMARY:{gcal_all_day_event.summary}'
+    assert ics[-3] == f'SUMMARY:{all_day_event.summary}'
     assert ics[1] == "DTSTART;VALUE=DATE:20210228"
 
 
 def test_ics_content():
     calendar_name = "Sonne"
     timezone = "Europe/Berlin"
-    gcal_event1 = GoogleCalEvent(
-        start=start_time, end=end_time, summary="event1"
+    event1 = CalendarEvent(
+        start=start_datetime, end=end_datetime, summary="event1"
     )
-    gcal_event2 = GoogleCalEvent(
-        start=start_time, end=end_time, summary="event2"
+    event2 = CalendarEvent(
+        start=start_datetime, end=end_datetime, summary="event2"
     )
-    events = [gcal_event1, gcal_event2]
+    events = [event1, event2]
 
-    ics_content = create_ics_content(gcal_events=events)
+    ics_content = create_ics_content(events=events)
 
     assert isinstance(ics_content, list)
     # test number of lines: header 5 lines, footer 1 line, per event 8 --> 22 lines in total
@@ -126,3 +120,20 @@ def test_ics_content():
     dtstamps = [line for line in ics_content if "DTSTAMP" in line]
     assert len(dtstamps) == 2
     assert dtstamps[0] == dtstamps[1]
+
+
+def test_iter_ics_content():
+    events = (
+        CalendarEvent(
+            start=start_datetime, end=end_datetime, summary=f"event{i}"
+        )
+        for i in range(3)
+    )
+
+    ics_content = iter_ics_content(events)
+
+    # lines are created lazily: the header comes first, events are only rendered on demand
+    assert next(ics_content) == "BEGIN:VCALENDAR"
+    lines = list(ics_content)
+    assert len(lines) == 4 + 3 * 8 + 1
+    assert lines[-1] == "END:VCALENDAR"
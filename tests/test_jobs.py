@@ -0,0 +1,237 @@
+import datetime as dt
+import json
+
+import pytest
+from click.testing import CliRunner
+from google.oauth2.credentials import Credentials
+
+from suncal import jobs
+from suncal import journal
+from suncal.events import create_calendar_events
+from suncal.jobs import Job
+from suncal.jobs import build_plan
+from suncal.jobs import load_job
+from suncal.jobs import run_plan
+from suncal.models import googlecal
+from suncal.models.astro import CALC
+from suncal.models.astro import Location
+from suncal.models.astro import MagicHour
+from suncal.models.googlecal import API_ENDPOINT_ENV_VAR
+from suncal.suncal import suncal
+from tests.fake_gcal import FakeCalendarServer
+
+berlin = {'latitude': 52.52, 'longitude': 13.41}
+munich = {'latitude': 48.14, 'longitude': 11.58}
+JOB = {
+    'tasks': [
+        {
+            'events': ['sunrise', 'sunset', 'moonphase'],
+            'locations': [berlin, munich],
+            'from': '2025-01-01',
+            'to': '2025-01-20',
+            'sinks': [{'type': 'ics', 'filename': '{event}_{location}'}],
+        },
+        {
+            'events': ['sunrise', 'golden_hour_morning'],
+            'locations': [berlin],
+            'from': '2025-01-15',
+            'to': '2025-01-31',
+            'sinks': [{'type': 'ndjson', 'filename': '{event}_{location}'}],
+        },
+        {
+            'events': ['sunset'],
+            'locations': [berlin],
+            'from': '2025-03-01',
+            'to': '2025-03-05',
+            'sinks': [{'type': 'csv', 'filename': '{event}_{location}_march'}],
+        },
+    ]
+}
+
+
+def test_build_plan():
+    plan = build_plan(Job.model_validate(JOB))
+
+    computations = [
+        (c.location.latitude, c.events, c.from_date, c.to_date)
+        for c in plan.computations
+    ]
+    assert computations == [
+        # only overlapping ranges of the same event are merged, events are calculated together if their ranges are
+        # the same
+        (52.52, ['sunset'], dt.date(2025, 1, 1), dt.date(2025, 1, 20)),
+        (52.52, ['sunrise'], dt.date(2025, 1, 1), dt.date(2025, 1, 31)),
+        (
+            52.52,
+            ['golden_hour_morning'],
+            dt.date(2025, 1, 15),
+            dt.date(2025, 1, 31),
+        ),
+        (52.52, ['sunset'], dt.date(2025, 3, 1), dt.date(2025, 3, 5)),
+        # moon phases are calculated once per timezone
+        (52.52, ['moonphase'], dt.date(2025, 1, 1), dt.date(2025, 1, 20)),
+        (
+            48.14,
+            ['sunrise', 'sunset'],
+            dt.date(2025, 1, 1),
+            dt.date(2025, 1, 20),
+        ),
+    ]
+    # exact times for the bulk export formats, minute precision if all sinks are calendars
+    assert [c.precision for c in plan.computations] == [
+        'minute',
+        'exact',
+        'exact',
+        'exact',
+        'minute',
+        'minute',
+    ]
+    assert len(plan.outputs) == 9
+    assert plan.requested == 9
+    assert {
+        output.filename(): output.computation_idx
+        for output in plan.outputs
+        if output.event == 'moonphase'
+    } == {'moonphase_52.5200_13.4100': 4, 'moonphase_48.1400_11.5800': 4}
+
+
+def test_build_plan_rejects_shared_files():
+    job = json.loads(json.dumps(JOB))
+    job['tasks'][0]['sinks'][0]['filename'] = 'sun'
+    with pytest.raises(ValueError, match='same files'):
+        build_plan(Job.model_validate(job))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_run_plan(tmp_path, workers):
+    job = json.loads(json.dumps(JOB))
+    for task in job['tasks']:
+        for sink in task['sinks']:
+            sink['filename'] = str(tmp_path / sink['filename'])
+    job['workers'] = workers
+    job_model = Job.model_validate(job)
+    run_plan(job_model, build_plan(job_model))
+
+    assert len(list(tmp_path.iterdir())) == 9
+    location = Location(timezone='Europe/Berlin', **berlin)
+    with open(tmp_path / 'sunrise_52.5200_13.4100.ics') as f:
+        assert f.read().count('BEGIN:VEVENT') == len(
+            create_calendar_events(
+                'sunrise', dt.date(2025, 1, 1), dt.date(2025, 1, 20), location
+            )
+        )
+    with open(tmp_path / 'golden_hour_morning_52.5200_13.4100.ndjson') as f:
+        records = [json.loads(line) for line in f]
+    expected = CALC['golden_hour_morning'](dt.date(2025, 1, 15), location)
+    assert isinstance(expected, MagicHour)
+    assert len(records) == 17
+    assert abs(
+        dt.datetime.fromisoformat(records[0]['start_local']) - expected.start
+    ) < dt.timedelta(seconds=1)
+    with open(tmp_path / 'sunset_52.5200_13.4100_march.csv') as f:
+        assert len(f.readlines()) == 6
+
+
+def test_run_plan_again_replaces_files(tmp_path):
+    job = json.loads(json.dumps(JOB))
+    for task in job['tasks']:
+        for sink in task['sinks']:
+            sink['filename'] = str(tmp_path / sink['filename'])
+    job_model = Job.model_validate(job)
+
+    def line_counts() -> dict[str, int]:
+        return {
+            path.name: len(path.read_text().splitlines())
+            for path in tmp_path.iterdir()
+        }
+
+    run_plan(job_model, build_plan(job_model))
+    first_run = line_counts()
+    run_plan(job_model, build_plan(job_model))
+
+    # the uids and timestamps of the ics files differ, but every file has the same lines as after the first run
+    assert line_counts() == first_run
+    with open(tmp_path / 'sunrise_52.5200_13.4100.ics') as f:
+        assert f.read().count('BEGIN:VCALENDAR') == 1
+
+
+def test_run_plan_replaces_every_location(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        jobs, 'get_credentials', lambda scopes: Credentials('fake')
+    )
+    monkeypatch.setattr(
+        jobs,
+        'get_sun_calendar_id',
+        lambda title, timezone, creds: googlecal.get_sun_calendar_id(
+            title, timezone, creds, cache_file=None
+        ),
+    )
+    monkeypatch.setattr(journal, 'JOURNAL_DIRECTORY', str(tmp_path))
+    sink = {'type': 'api', 'calendar': 'Sun', 'replace': True}
+    job = Job.model_validate(
+        {
+            'tasks': [
+                {
+                    'events': ['sunrise'],
+                    'locations': [berlin, munich],
+                    'from': '2025-01-01',
+                    'to': '2025-01-10',
+                    'sinks': [sink],
+                }
+            ]
+        }
+    )
+
+    with FakeCalendarServer() as server:
+        monkeypatch.setenv(API_ENDPOINT_ENV_VAR, server.endpoint)
+        run_plan(job, build_plan(job))
+        (gcal_id,) = server.api.calendars
+        assert len(server.api.events[gcal_id]) == 20
+
+        # replaced again: the old events of both locations are deleted, none of the other location
+        run_plan(job, build_plan(job))
+        assert len(server.api.events[gcal_id]) == 20
+        assert server.api.stats['events.delete'] == 20
+
+        # resumed: the journal of each location is complete, nothing is sent again
+        sink['resume'] = True
+        job = Job.model_validate(
+            {
+                'tasks': [
+                    {**job.tasks[0].model_dump(by_alias=True), 'sinks': [sink]}
+                ]
+            }
+        )
+        run_plan(job, build_plan(job))
+        assert server.api.stats['events.insert'] == 40
+
+
+def test_load_job(tmp_path):
+    yaml = pytest.importorskip('yaml')
+    with open(tmp_path / 'job.json', 'w') as f:
+        json.dump(JOB, f)
+    with open(tmp_path / 'job.yaml', 'w') as f:
+        yaml.safe_dump(JOB, f)
+
+    assert load_job(str(tmp_path / 'job.json')) == load_job(
+        str(tmp_path / 'job.yaml')
+    )
+
+
+def test_run_dry_run(tmp_path):
+    with open(tmp_path / 'job.json', 'w') as f:
+        json.dump(JOB, f)
+
+    result = CliRunner().invoke(
+        suncal, ['run', str(tmp_path / 'job.json'), '--dry-run']
+    )
+    assert result.exit_code == 0
+    assert result.output.startswith('9 outputs from 6 computations')
+    assert list(tmp_path.iterdir()) == [tmp_path / 'job.json']
+
+    JOB_INVALID = {'tasks': [{**JOB['tasks'][0], 'events': ['sunshine']}]}
+    with open(tmp_path / 'job.json', 'w') as f:
+        json.dump(JOB_INVALID, f)
+    result = CliRunner().invoke(suncal, ['run', str(tmp_path / 'job.json')])
+    assert result.exit_code == 2
+    assert 'sunshine' in result.output
@@ -0,0 +1,22 @@
+from suncal.journal import Journal
+
+
+def test_journal(tmp_path):
+    journal = Journal.for_export('cal@group', 'sunset', directory=str(tmp_path))
+    assert journal.start(resume=True) == set()
+    journal.record('2025-01-01', 'id1')
+    journal.record('2025-01-02', 'id2')
+    journal.close()
+
+    # a line that was only partially written before a crash is ignored
+    with open(journal.filename, 'a') as f:
+        f.write('{"key": "2025-01-0')
+
+    assert journal.start(resume=True) == {'2025-01-01', '2025-01-02'}
+    journal.record('2025-01-03', 'id3')
+    journal.close()
+    assert len(journal.confirmed_keys()) == 3
+
+    assert journal.start(resume=False) == set()
+    journal.close()
+    assert journal.confirmed_keys() == set()
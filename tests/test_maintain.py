@@ -0,0 +1,224 @@
+import datetime as dt
+import json
+
+from google.oauth2.credentials import Credentials
+
+from suncal import auth
+from suncal.journal import Journal
+from suncal.maintain import Watermark
+from suncal.maintain import load_watermarks
+from suncal.maintain import plan_maintenance
+from suncal.models import googlecal
+from suncal.models.googlecal import API_ENDPOINT_ENV_VAR
+from suncal.suncal import suncal_maintain
+from tests.fake_gcal import FakeCalendarServer
+
+today = dt.date(2025, 1, 10)
+
+
+def test_plan_maintenance():
+    # first run: the whole window
+    maintenance = plan_maintenance(None, today, days=365, prune=True)
+    assert maintenance.fresh
+    assert (maintenance.new_from, maintenance.new_to) == (
+        today,
+        dt.date(2026, 1, 9),
+    )
+    assert maintenance.prune_from is None
+
+    # next day: only one new day, the day before is pruned
+    watermark = maintenance.watermark
+    maintenance = plan_maintenance(
+        watermark, today + dt.timedelta(days=1), days=365, prune=True
+    )
+    assert not maintenance.fresh
+    assert maintenance.new_from == maintenance.new_to == dt.date(2026, 1, 10)
+    assert maintenance.prune_from == maintenance.prune_to == today
+    assert maintenance.watermark == Watermark(
+        from_date=dt.date(2025, 1, 11), to_date=dt.date(2026, 1, 10)
+    )
+
+    # without pruning, the calendar keeps the old days
+    maintenance = plan_maintenance(
+        watermark, today + dt.timedelta(days=3), days=365, prune=False
+    )
+    assert maintenance.new_from == dt.date(2026, 1, 10)
+    assert maintenance.new_to == dt.date(2026, 1, 12)
+    assert maintenance.watermark.from_date == today
+
+    # same day again: nothing to do
+    maintenance = plan_maintenance(watermark, today, days=365, prune=True)
+    assert maintenance.new_from is None and maintenance.prune_from is None
+    assert maintenance.summary() == "Calendar is up to date."
+
+    # the watermark is too old: start from scratch
+    maintenance = plan_maintenance(
+        watermark, dt.date(2027, 1, 1), days=365, prune=True
+    )
+    assert maintenance.fresh
+    assert maintenance.new_from == dt.date(2027, 1, 1)
+    assert (maintenance.prune_from, maintenance.prune_to) == (
+        watermark.from_date,
+        watermark.to_date,
+    )
+
+
+def test_maintain_ics(tmp_path):
+    filename = str(tmp_path / 'sunrise.ics')
+    state_file = str(tmp_path / 'maintain.json')
+
+    def maintain(day: dt.date, prune: bool = True):
+        return suncal_maintain(
+            'sunrise',
+            sink='ics',
+            days=10,
+            prune=prune,
+            state_file=state_file,
+            filename=filename,
+            today=day,
+            latitude=52.52,
+            longitude=13.41,
+        )
+
+    def event_starts() -> list[str]:
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        assert lines[0] == 'BEGIN:VCALENDAR' and lines[-1] == 'END:VCALENDAR'
+        return [line[8:16] for line in lines if line.startswith('DTSTART')]
+
+    maintain(today)
+    assert event_starts() == [f'202501{day:02}' for day in range(10, 20)]
+
+    # two days later: two days added, two days pruned
+    maintenance = maintain(today + dt.timedelta(days=2))
+    assert (maintenance.new_from, maintenance.new_to) == (
+        dt.date(2025, 1, 20),
+        dt.date(2025, 1, 21),
+    )
+    assert event_starts() == [f'202501{day:02}' for day in range(12, 22)]
+
+    maintain(today + dt.timedelta(days=3), prune=False)
+    assert event_starts() == [f'202501{day:02}' for day in range(12, 23)]
+    with open(state_file) as f:
+        assert json.load(f) == {
+            f'ics:{filename}:sunrise:52.5200_13.4100': {
+                'from_date': '2025-01-12',
+                'to_date': '2025-01-22',
+            }
+        }
+
+
+def test_maintain_several_events_in_one_ics_file(tmp_path):
+    filename = str(tmp_path / 'sun.ics')
+    state_file = str(tmp_path / 'maintain.json')
+
+    def maintain(event_name: str, day: dt.date, latitude: float = 52.52):
+        return suncal_maintain(
+            event_name,
+            sink='ics',
+            days=5,
+            prune=True,
+            state_file=state_file,
+            filename=filename,
+            today=day,
+            latitude=latitude,
+            longitude=13.41,
+        )
+
+    def summaries() -> list[str]:
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        assert lines.count('BEGIN:VCALENDAR') == 1
+        return [line[8:10] for line in lines if line.startswith('SUMMARY')]
+
+    maintain('sunrise', today)
+    # the first runs of another event and location do not remove the events of the first one
+    assert maintain('sunset', today).fresh
+    assert maintain('sunrise', today, latitude=48.14).fresh
+    assert summaries().count('🌞↑') == 10
+    assert summaries().count('🌞↓') == 5
+
+    # the next day, every event and location is moved by one day
+    for event_name, latitude in [
+        ('sunrise', 52.52),
+        ('sunset', 52.52),
+        ('sunrise', 48.14),
+    ]:
+        maintenance = maintain(
+            event_name, today + dt.timedelta(days=1), latitude
+        )
+        assert (maintenance.new_from, maintenance.prune_from) == (
+            dt.date(2025, 1, 15),
+            today,
+        )
+    assert summaries().count('🌞↑') == 10
+    assert summaries().count('🌞↓') == 5
+    with open(filename) as f:
+        starts = [line[8:16] for line in f if line.startswith('DTSTART')]
+    assert sorted(set(starts)) == [f'202501{day:02}' for day in range(11, 16)]
+
+
+def test_maintain_google_calendar(tmp_path, monkeypatch):
+    get_sun_calendar_id = googlecal.get_sun_calendar_id
+    monkeypatch.setattr(
+        auth, 'get_credentials', lambda scopes: Credentials('fake')
+    )
+    monkeypatch.setattr(
+        googlecal,
+        'get_sun_calendar_id',
+        lambda title, timezone, creds: get_sun_calendar_id(
+            title, timezone, creds, cache_file=None
+        ),
+    )
+    monkeypatch.setattr(
+        googlecal.Journal,
+        'for_export',
+        lambda calendar_id, marker: Journal(str(tmp_path / 'journal')),
+    )
+    state_file = str(tmp_path / 'maintain.json')
+
+    with FakeCalendarServer() as server:
+        monkeypatch.setenv(API_ENDPOINT_ENV_VAR, server.endpoint)
+        for day in range(5):
+            suncal_maintain(
+                'sunrise',
+                sink='api',
+                days=30,
+                prune=True,
+                state_file=state_file,
+                calendar_title='Sun',
+                today=today + dt.timedelta(days=day),
+                latitude=52.52,
+                longitude=13.41,
+            )
+
+        # 30 days for the first run, then one new and one pruned day per run
+        assert server.api.stats['events.insert'] == 34
+        assert server.api.stats['events.delete'] == 4
+        (events,) = server.api.events.values()
+        assert sorted(
+            event['start']['dateTime'][:10] for event in events.values()
+        ) == [str(today + dt.timedelta(days=day)) for day in range(4, 34)]
+
+        # another location in the same calendar has its own watermark and starts with the whole window
+        maintenance = suncal_maintain(
+            'sunrise',
+            sink='api',
+            days=30,
+            state_file=state_file,
+            calendar_title='Sun',
+            today=today + dt.timedelta(days=4),
+            latitude=48.14,
+            longitude=11.58,
+        )
+        assert maintenance.fresh
+        assert len(events) == 60
+
+    (gcal_id,) = server.api.events
+    watermarks = load_watermarks(state_file)
+    assert watermarks[f'api:{gcal_id}:sunrise:52.5200_13.4100'] == Watermark(
+        from_date=dt.date(2025, 1, 14), to_date=dt.date(2025, 2, 12)
+    )
+    assert watermarks[f'api:{gcal_id}:sunrise:48.1400_11.5800'] == Watermark(
+        from_date=dt.date(2025, 1, 14), to_date=dt.date(2025, 2, 12)
+    )
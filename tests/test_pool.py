@@ -0,0 +1,38 @@
+import datetime as dt
+import os
+
+import numpy as np
+
+from suncal import compute
+from suncal import location_of
+from suncal.pool import WarmPool
+
+
+def worker_pid(task: int) -> tuple[int, int]:
+    return task, os.getpid()
+
+
+def test_warm_pool():
+    with WarmPool(2, dt.date(2025, 1, 1), dt.date(2025, 1, 31)) as pool:
+        results = list(pool.map(worker_pid, range(10)))
+
+    # results come in the order of the tasks and are calculated by the workers
+    assert [task for task, _ in results] == list(range(10))
+    assert os.getpid() not in {pid for _, pid in results}
+
+
+def test_compute_with_workers():
+    locations = [
+        location_of(latitude=52.52, longitude=13.41),
+        location_of(latitude=48.14, longitude=11.58),
+        location_of(latitude=-33.87, longitude=151.21),
+    ]
+    start, end = dt.date(2025, 1, 1), dt.date(2025, 1, 31)
+    serial = compute(['sunrise', 'moonphase'], locations, start, end)
+    parallel = compute(
+        ['sunrise', 'moonphase'], locations, start, end, workers=2
+    )
+
+    assert np.array_equal(serial.location_idx, parallel.location_idx)
+    assert np.array_equal(serial.start, parallel.start)
+    assert np.array_equal(serial.phase_idx, parallel.phase_idx)
@@ -0,0 +1,95 @@
+import datetime as dt
+import io
+
+from click.testing import CliRunner
+
+from suncal import compute
+from suncal.models.astro import Location
+from suncal.progress import ConsoleReporter
+from suncal.progress import Progress
+from suncal.progress import ProgressSnapshot
+from suncal.suncal import suncal
+
+tromso = Location(timezone='Europe/Oslo', latitude=69.65, longitude=18.96)
+
+
+class Terminal(io.StringIO):
+    def isatty(self) -> bool:
+        return True
+
+
+def test_progress():
+    now = [0.0]
+    snapshots: list[ProgressSnapshot] = []
+    progress = Progress(
+        total_days=100,
+        callback=snapshots.append,
+        interval=1.0,
+        clock=lambda: now[0],
+    )
+    for _ in range(10):
+        now[0] += 0.25
+        progress.add_days(1, 2)
+    # reported at most once per interval
+    assert len(snapshots) == 2
+    assert snapshots[-1].days == 8
+    assert snapshots[-1].days_per_second == 4.0
+    assert snapshots[-1].eta_seconds == 23.0
+
+    progress.add_uploaded(5)
+    progress.no_event('sunset', dt.date(2025, 6, 2))
+    progress.no_event('sunset', dt.date(2025, 5, 20))
+    snapshot = progress.finish()
+    assert snapshots[-1] == snapshot
+    assert (snapshot.days, snapshot.events, snapshot.uploaded) == (10, 20, 5)
+    assert snapshot.line() == (
+        '10/100 days (10%), 20 events, 5 uploaded, 4.0 days/s, 8.0 events/s, done in 0:00:02'
+    )
+    assert progress.missing_summary() == [
+        'No sunset on 2 of 100 days (the first on 2025-05-20, the last on 2025-06-02).'
+    ]
+
+
+def test_console_reporter():
+    snapshot = ProgressSnapshot(days=1, total_days=2, eta_seconds=1.0)
+    terminal = Terminal()
+    reporter = ConsoleReporter(terminal)
+    reporter(snapshot)
+    reporter(snapshot.model_copy(update={'days': 2, 'finished': True}))
+    assert terminal.getvalue().startswith('\r1/2 days (50%), 0 events')
+    assert terminal.getvalue().endswith('\n')
+    assert terminal.getvalue().count('\r') == 2
+
+    # silent when piped
+    pipe = io.StringIO()
+    ConsoleReporter(pipe)(snapshot)
+    assert pipe.getvalue() == ''
+
+
+def test_compute_progress():
+    snapshots: list[ProgressSnapshot] = []
+    table = compute(
+        'sunrise',
+        [tromso, tromso],
+        dt.date(2025, 1, 1),
+        dt.date(2025, 1, 31),
+        progress=snapshots.append,
+    )
+    assert snapshots[-1].finished
+    assert snapshots[-1].days == snapshots[-1].total_days == 62
+    assert snapshots[-1].events == len(table)
+
+
+def test_days_without_event_are_summarized(tmp_path):
+    """Instead of one line per day of the midnight sun, there is one summary."""
+    args = ['ics', '--event', 'sunset', '--from', '2025-05-15']
+    args += ['--to', '2025-06-15', '--lat', '69.65', '--long', '18.96']
+    result = CliRunner().invoke(
+        suncal, [*args, '--filename', str(tmp_path / 'sunset.ics')]
+    )
+    assert result.exit_code == 0
+    assert 'does not' not in result.output
+    assert (
+        'No sunset on 30 of 32 days (the first on 2025-05-16, the last on 2025-06-15).'
+        in result.output
+    )
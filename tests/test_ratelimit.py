@@ -0,0 +1,69 @@
+from suncal.ratelimit import AdaptiveBatchSize
+from suncal.ratelimit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=20, clock=clock, sleep=clock.sleep)
+
+    # the full bucket allows a burst
+    assert bucket.acquire(20) == 0
+    # then requests are limited to the rate
+    assert bucket.acquire(5) == 0.5
+    assert clock.now == 1000.5
+    # requests larger than the bucket are served in parts
+    assert bucket.acquire(30) == 3.0
+
+
+def test_token_bucket_shared_state(tmp_path):
+    clock = FakeClock()
+    state_file = str(tmp_path / 'quota.json')
+    bucket_1 = TokenBucket(
+        rate=1,
+        capacity=10,
+        state_file=state_file,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+    bucket_2 = TokenBucket(
+        rate=1,
+        capacity=10,
+        state_file=state_file,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+
+    assert bucket_1.acquire(6) == 0
+    # the second bucket (e.g. in another process) sees the tokens taken by the first one
+    assert bucket_2.acquire(6) == 2.0
+    assert bucket_1.acquire(1) == 1.0
+
+
+def test_adaptive_batch_size():
+    batch_size = AdaptiveBatchSize(initial=50, max_size=50)
+
+    batch_size.shrink()
+    batch_size.shrink()
+    assert batch_size.size == 12
+    for _ in range(3):
+        batch_size.shrink()
+    assert batch_size.size == 1
+    batch_size.shrink()
+    assert batch_size.size == 1
+
+    batch_size.grow()
+    assert batch_size.size == 2
+    for _ in range(20):
+        batch_size.grow()
+    assert batch_size.size == 50
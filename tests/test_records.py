@@ -0,0 +1,66 @@
+import datetime as dt
+
+from suncal.models.astro import CelestialBody
+from suncal.models.astro import Location
+from suncal.models.astro import MagicHour
+from suncal.models.astro import MoonPhase
+from suncal.models.astro import RiseSet
+from suncal.models.records import RECORD_FIELDS
+from suncal.models.records import EventRecord
+from suncal.utils import tz_aware_dt
+
+time_zone = 'Europe/Berlin'
+location = Location(timezone=time_zone, longitude=13.4, latitude=52.5)
+event_time = tz_aware_dt(dt.datetime(2023, 3, 18, 6, 30), timezone=time_zone)
+
+
+def test_record_from_rise_set():
+    sunrise = RiseSet(
+        location=location,
+        event_time=event_time,
+        body=CelestialBody.SUN,
+        rise=True,
+    )
+    record = EventRecord.from_celestial_event('sunrise', sunrise, location)
+
+    assert record.kind == 'sunrise'
+    assert record.start_local == event_time
+    assert record.start_utc == event_time
+    assert record.start_utc.utcoffset() == dt.timedelta(0)
+    assert record.end_utc is None
+    assert record.phase_idx is None
+    assert record.latitude == 52.5
+
+
+def test_record_from_moon_phase_and_magic_hour():
+    moon_phase = MoonPhase(
+        timezone=time_zone, event_time=event_time, phase_idx=2
+    )
+    record = EventRecord.from_celestial_event('moonphase', moon_phase, location)
+    assert record.phase_idx == 2
+
+    magic_hour = MagicHour(
+        color='golden',
+        start=event_time,
+        end=event_time + dt.timedelta(hours=1),
+        morning=True,
+    )
+    record = EventRecord.from_celestial_event(
+        'golden_hour_morning', magic_hour, location
+    )
+    assert record.end_local == event_time + dt.timedelta(hours=1)
+    assert record.end_utc is not None
+    assert record.end_utc.isoformat() == '2023-03-18T06:30:00+00:00'
+
+
+def test_record_row():
+    moon_phase = MoonPhase(
+        timezone=time_zone, event_time=event_time, phase_idx=2
+    )
+    row = EventRecord.from_celestial_event(
+        'moonphase', moon_phase, location
+    ).row()
+
+    assert list(row) == RECORD_FIELDS
+    assert row['start_utc'] == '2023-03-18T05:30:00+00:00'
+    assert row['start_local'] == '2023-03-18T06:30:00+01:00'
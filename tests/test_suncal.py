@@ -1,5 +1,24 @@
+import subprocess
+import sys
+
 from suncal import __version__
 
 
 def test_version():
     assert __version__ == "0.1.0"
+
+
+def test_cli_imports_google_and_jobs_on_use():
+    script = (
+        "import sys, suncal.suncal; "
+        "print(sorted(name for name in sys.modules if name.split('.')[0] in "
+        "('google', 'googleapiclient', 'pandas', 'pyarrow') or name in "
+        "('suncal.auth', 'suncal.jobs', 'suncal.models.googlecal', 'suncal.worker')))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == '[]'
@@ -1,9 +1,27 @@
 import datetime as dt
+from typing import Any
 
+import numpy as np
+import pytest
+from pydantic import BaseModel  # pylint: disable=E0611
+from pydantic import ValidationError
+
+from suncal import utils
+from suncal.ephemeris import load_timescale
+from suncal.models.astro import MoonPhase
+from suncal.models.calendar import CalendarEvent
 from suncal.utils import aware_datetime_to_ical_date_with_utc_time
 from suncal.utils import create_batches
 from suncal.utils import date_range
+from suncal.utils import day_boundaries
+from suncal.utils import get_timezone
+from suncal.utils import iter_batches
+from suncal.utils import iter_date_range
+from suncal.utils import peek
+from suncal.utils import set_validation
 from suncal.utils import time_range_of_date
+from suncal.utils import times_to_local_datetimes
+from suncal.utils import trusted
 from suncal.utils import tz_aware_dt
 
 
@@ -91,3 +109,127 @@ def test_create_batches():
     batches = create_batches(mylist, batch_size=3)
 
     assert batches == [[0, 1, 2], [3, 4, 5], [6, 7]]
+
+
+def test_day_boundaries():
+    timezone = 'Europe/Berlin'
+    boundaries = day_boundaries(
+        dt.date(2023, 3, 25), dt.date(2023, 3, 27), timezone
+    )
+
+    # one boundary more than dates: the beginning of the day after the last date
+    assert len(boundaries) == 4
+    assert boundaries[0] == np.datetime64('2023-03-24T23:00:00')
+    # DST starts on 26.3.2023: the day only lasts 23 hours
+    assert np.diff(boundaries).astype('timedelta64[h]').tolist() == [
+        dt.timedelta(hours=24),
+        dt.timedelta(hours=23),
+        dt.timedelta(hours=24),
+    ]
+
+    # DST ends on 29.10.2023: the day lasts 25 hours
+    start, end = time_range_of_date(dt.date(2023, 10, 29), timezone)
+    assert end - start == dt.timedelta(hours=25, microseconds=-1)
+
+    # in Santiago de Chile, clocks jumped from 0:00 to 1:00 on 14.8.2016
+    start, _ = time_range_of_date(dt.date(2016, 8, 14), 'America/Santiago')
+    assert start == tz_aware_dt(dt.datetime(2016, 8, 14, 1), 'America/Santiago')
+
+
+def test_times_to_local_datetimes():
+    timezone = 'Europe/Berlin'
+    ts = load_timescale()
+    # times around the DST transition on 26.3.2023
+    t = ts.utc(2023, 3, 26, np.arange(0, 4, 0.25))
+
+    local = times_to_local_datetimes(t, timezone)
+
+    assert list(local) == list(t.astimezone(get_timezone(timezone)))
+    assert local[0].tzname() == 'CET'
+    assert local[-1].tzname() == 'CEST'
+    # scalar times are converted to an array with one element
+    assert times_to_local_datetimes(t[0], timezone).item() == local[0]
+
+
+def test_get_timezone():
+    assert get_timezone('Europe/Berlin') is get_timezone('Europe/Berlin')
+
+
+def test_iter_date_range():
+    dates = iter_date_range(dt.date(2020, 12, 30), dt.date(2021, 1, 2))
+
+    # dates are created lazily
+    assert next(dates) == dt.date(2020, 12, 30)
+    assert list(dates) == date_range(dt.date(2020, 12, 31), dt.date(2021, 1, 2))
+
+
+def test_iter_batches():
+    # works on generators and yields the same batches as create_batches
+    batches = iter_batches((i for i in range(8)), batch_size=3)
+
+    assert next(batches) == [0, 1, 2]
+    assert list(batches) == [[3, 4, 5], [6, 7]]
+    assert list(iter_batches([], batch_size=3)) == []
+
+
+def test_peek():
+    first, iterator = peek(i for i in range(3))
+    assert first == 0
+    assert list(iterator) == [0, 1, 2]
+
+    first, iterator = peek([])
+    assert first is None
+    assert list(iterator) == []
+
+
+def test_trusted(monkeypatch):
+    # set_validation exports the setting, monkeypatch restores the environment and the module state afterwards
+    monkeypatch.setenv(utils.VALIDATE_ENV_VAR, '0')
+    monkeypatch.setattr(utils, '_validate', False)
+    event_time = tz_aware_dt(dt.datetime(2023, 3, 7, 13, 40), 'Europe/Berlin')
+
+    moon_phase = trusted(
+        MoonPhase,
+        timezone='Europe/Berlin',
+        event_time=event_time,
+        phase_idx=2,
+    )
+    assert moon_phase == MoonPhase(
+        timezone='Europe/Berlin', event_time=event_time, phase_idx=2
+    )
+    # validators are skipped for trusted input
+    trusted(
+        MoonPhase,
+        timezone='Europe/Berlin',
+        event_time=event_time,
+        phase_idx=7,
+    )
+
+    # ... unless validation is enabled for debugging
+    set_validation(True)
+    with pytest.raises(ValidationError):
+        trusted(
+            MoonPhase,
+            timezone='Europe/Berlin',
+            event_time=event_time,
+            phase_idx=7,
+        )
+
+
+@pytest.mark.parametrize('fast_construct', [True, False])
+def test_trusted_matches_model_construct(monkeypatch, fast_construct):
+    # guard against changes of the internals of pydantic model instances, which the fast path of trusted sets directly
+    assert tuple(BaseModel.__slots__) == utils.PYDANTIC_SLOTS
+    monkeypatch.setattr(utils, '_validate', False)
+    monkeypatch.setattr(utils, '_fast_construct', fast_construct)
+    start = tz_aware_dt(dt.datetime(2023, 3, 7, 13, 40), 'Europe/Berlin')
+    fields: dict[str, Any] = {'start': start, 'end': start, 'summary': 'bla'}
+
+    event = trusted(CalendarEvent, **fields)
+    expected = CalendarEvent.model_construct(**fields)
+
+    for slot in utils.PYDANTIC_SLOTS:
+        assert getattr(event, slot) == getattr(expected, slot)
+    assert event == CalendarEvent(**fields)
+    assert event.model_dump() == expected.model_dump()
+    assert event.model_copy(update={'summary': 'new'}).summary == 'new'
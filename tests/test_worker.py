@@ -0,0 +1,92 @@
+import io
+import json
+
+from click.testing import CliRunner
+
+from suncal.suncal import suncal
+from suncal.worker import handle_request
+from suncal.worker import run_worker
+
+berlin = {'longitude': 13.4, 'latitude': 52.5}
+
+
+def request(rid: int | str, **params) -> str:
+    return json.dumps(
+        {
+            'id': rid,
+            'event': 'sunrise',
+            'from': '2025-01-01',
+            'to': '2025-01-07',
+            **berlin,
+            **params,
+        }
+    )
+
+
+def test_handle_request():
+    response = json.loads(handle_request(request(1)))
+    assert response['id'] == 1
+    assert response['ok'] is True
+    assert response['events'] == 7
+    assert response['ics'].startswith('BEGIN:VCALENDAR\n')
+    assert response['ics'].count('BEGIN:VEVENT') == 7
+
+    response = json.loads(
+        handle_request(
+            request('records', return_val='ndjson', weekdays='sa,su')
+        )
+    )
+    assert response['events'] == 2
+    assert [record['kind'] for record in response['records']] == ['sunrise'] * 2
+    assert 'ics' not in response
+
+    # errors are answered, with the id if the request is json
+    response = json.loads(handle_request(request(2, event='sunshine')))
+    assert response == {
+        'id': 2,
+        'ok': False,
+        'events': 0,
+        'error': response['error'],
+        'seconds': response['seconds'],
+    }
+    assert 'Unknown event' in response['error']
+    response = json.loads(handle_request('{"id": 3, "event":'))
+    assert response['ok'] is False and 'id' not in response
+    response = json.loads(handle_request(request(4, timezone='Mars/Olympus')))
+    assert response['id'] == 4 and response['ok'] is False
+
+
+def test_run_worker_answers_all_requests():
+    requests = io.StringIO(
+        '\n'.join(
+            [request(1), '', request(2, event='sunshine'), request(3, to='')]
+            + [request(i, event='sunset') for i in range(4, 8)]
+        )
+        + '\n'
+    )
+    responses = io.StringIO()
+
+    assert run_worker(requests, responses, workers=2) == 7
+
+    answers = {
+        answer['id']: answer
+        for answer in map(json.loads, responses.getvalue().splitlines())
+    }
+    assert sorted(answers) == list(range(1, 8))
+    assert sorted(
+        rid for rid, answer in answers.items() if not answer['ok']
+    ) == [2, 3]
+    assert all(answers[i]['events'] == 7 for i in [1, 4, 5, 6, 7])
+
+
+def test_cli_worker():
+    result = CliRunner().invoke(
+        suncal, ['worker'], input=request('a') + '\n' + request('b') + '\n'
+    )
+
+    assert result.exit_code == 0, result.output
+    assert [json.loads(line)['id'] for line in result.stdout.splitlines()] == [
+        'a',
+        'b',
+    ]
+    assert 'Answered 2 requests.' in result.stderr